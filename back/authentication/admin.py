@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import UserProfile, EmailVerification, PasswordResetToken
+from .models import UserProfile, EmailVerification, PasswordResetToken, AuditEntry
 
 
 @admin.register(UserProfile)
@@ -189,4 +189,19 @@ class PasswordResetTokenAdmin(admin.ModelAdmin):
     def invalidate_tokens(self, request, queryset):
         """Action para invalidar tokens de reset"""
         count = queryset.filter(is_used=False).update(is_used=True)
-        self.message_user(request, f'{count} tokens invalidados.')
\ No newline at end of file
+        self.message_user(request, f'{count} tokens invalidados.')
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    """Admin somente leitura do registro de auditoria"""
+    list_display = ('created_at', 'username', 'action', 'entity_type', 'entity_id', 'ip_address')
+    list_filter = ('action', 'entity_type', 'created_at')
+    search_fields = ('username', 'entity_id', 'ip_address')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,115 @@
+"""
+Gravação em lote do registro de auditoria (``AuditEntry``).
+
+``log_user_activity`` apenas monta a entrada e a entrega ao buffer após o commit
+da transação atual (ações desfeitas não são auditadas). O buffer grava com
+``bulk_create`` a cada ``AUDIT_LOG_BATCH_SIZE`` entradas ou
+``AUDIT_LOG_FLUSH_INTERVAL_MS`` milissegundos, na thread de ``core.flusher``, de
+modo que a requisição não espera pelo banco. Com ``AUDIT_LOG_WRITER = 'celery'`` o
+lote é enviado a uma tarefa Celery em vez de gravado no processo.
+
+Se o lote é rejeitado pelo banco (ex.: usuário excluído depois de a entrada ser
+enfileirada), as entradas são gravadas uma a uma; a que ainda falhar é gravada
+sem o vínculo com o usuário (o ``username`` é mantido), como faria o
+``on_delete=SET_NULL``.
+"""
+import logging
+import threading
+
+from celery import shared_task
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from core.flusher import get_flusher, on_shutdown
+
+logger = logging.getLogger(__name__)
+
+
+def _write_entries(entries):
+    from .models import AuditEntry
+
+    try:
+        with transaction.atomic():
+            AuditEntry.objects.bulk_create(
+                [AuditEntry(**entry) for entry in entries],
+                batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100)
+            )
+        return
+    except IntegrityError:
+        logger.warning("Lote de %s entrada(s) de auditoria rejeitado; gravando uma a uma", len(entries))
+
+    for entry in entries:
+        try:
+            with transaction.atomic():
+                AuditEntry.objects.create(**entry)
+        except IntegrityError:
+            AuditEntry.objects.create(**{**entry, 'user_id': None})
+
+
+@shared_task
+def write_audit_entries(entries):
+    """Tarefa Celery que grava um lote de entradas (datas em ISO 8601)."""
+    for entry in entries:
+        entry['created_at'] = parse_datetime(entry['created_at'])
+    _write_entries(entries)
+    return len(entries)
+
+
+class AuditBuffer:
+    """Acumula entradas e as grava em lote por tamanho ou por tempo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._flush_key = ('audit', id(self))
+
+    def add(self, entry):
+        batch_size = getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100)
+        interval = getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL_MS', 1000) / 1000
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) >= batch_size:
+                # Lote cheio: grava já, mas fora da thread da requisição
+                get_flusher().schedule(self._flush_key, 0, self._flush_in_thread)
+            elif len(self._entries) == 1:
+                get_flusher().schedule(self._flush_key, interval, self._flush_in_thread)
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """Grava as entradas pendentes; retorna quantas foram enviadas."""
+        with self._lock:
+            entries, self._entries = self._entries, []
+            get_flusher().cancel(self._flush_key)
+        if not entries:
+            return 0
+
+        try:
+            if getattr(settings, 'AUDIT_LOG_WRITER', 'database') == 'celery':
+                write_audit_entries.delay([
+                    {**entry, 'created_at': entry['created_at'].isoformat()} for entry in entries
+                ])
+            else:
+                _write_entries(entries)
+        except Exception:
+            logger.exception("Falha ao gravar %s entrada(s) de auditoria", len(entries))
+            return 0
+        return len(entries)
+
+    def pending(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_buffer = AuditBuffer()
+# Grava o que restar ao encerrar o processo
+on_shutdown(_buffer.flush)
+
+
+def get_audit_buffer():
+    return _buffer
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 23:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_add_role_to_userprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(help_text='Usuário no momento da ação', max_length=150)),
+                ('action', models.CharField(max_length=50)),
+                ('entity_type', models.CharField(blank=True, default='', max_length=50)),
+                ('entity_id', models.CharField(blank=True, default='', max_length=64)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='audit_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'audit_entries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='audit_user_idx'), models.Index(fields=['entity_type', 'entity_id', '-created_at'], name='audit_entity_idx'), models.Index(fields=['action', '-created_at'], name='audit_action_idx')],
+            },
+        ),
+    ]
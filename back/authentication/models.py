@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
@@ -133,6 +133,41 @@ class UserProfile(models.Model):
         db_table = 'user_profiles'
 
 
+class AuditEntry(models.Model):
+    """
+    Registro de auditoria das ações dos usuários (login, alterações de cadastro etc.).
+
+    Gravado em lote por ``authentication.audit`` fora do caminho da requisição.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='audit_entries'
+    )
+    username = models.CharField(max_length=150, help_text='Usuário no momento da ação')
+    action = models.CharField(max_length=50)
+    entity_type = models.CharField(max_length=50, blank=True, default='')
+    entity_id = models.CharField(max_length=64, blank=True, default='')
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    details = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.username} - {self.action} ({self.created_at:%Y-%m-%d %H:%M:%S})"
+
+    class Meta:
+        db_table = 'audit_entries'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='audit_user_idx'),
+            models.Index(fields=['entity_type', 'entity_id', '-created_at'], name='audit_entity_idx'),
+            models.Index(fields=['action', '-created_at'], name='audit_action_idx'),
+        ]
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """
@@ -146,4 +181,18 @@ def create_user_profile(sender, instance, created, **kwargs):
             )
             EmailVerification.objects.create(user=instance)
         except Exception as e:
-            logger.error(f"Falha ao criar perfil/verificação para o usuário {instance.username}: {e}")
\ No newline at end of file
+            logger.error(f"Falha ao criar perfil/verificação para o usuário {instance.username}: {e}")
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_websocket_user_cache(sender, instance, **kwargs):
+    """
+    Remove o usuário do cache de autenticação de WebSockets ao alterar
+    dados do usuário (ex.: desativação), o papel no perfil ou ao excluí-los.
+    """
+    from .websocket_auth import invalidate_cached_user
+
+    user_id = instance.pk if sender is User else instance.user_id
+    invalidate_cached_user(user_id)
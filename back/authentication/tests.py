@@ -4,15 +4,25 @@ Testes unitários e de integração para o app authentication.
 Cobre models, serializers e todos os endpoints REST.
 """
 
-from django.test import TestCase
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
 from django.conf import settings
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 from datetime import timedelta
 
-from .models import UserProfile, EmailVerification, PasswordResetToken
+from monitoring.testing import NPlusOneTestCase
+from .audit import AuditBuffer, get_audit_buffer
+from .models import AuditEntry, UserProfile, EmailVerification, PasswordResetToken
+from .utils import get_client_ip, log_user_activity
+from .websocket_auth import JWTCookieAuthMiddleware, resolve_user_from_token
 from .serializers import (
     UserRegistrationSerializer,
     EmailVerificationSerializer,
@@ -286,7 +296,7 @@ class AccountDeleteTests(TestCase):
         response = self.client.delete('/api/auth/account/delete/', {})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-class UserManagementTests(TestCase):
+class UserManagementTests(NPlusOneTestCase):
     def setUp(self):
         self.client = APIClient()
         self.admin = make_admin()
@@ -298,6 +308,14 @@ class UserManagementTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('results', response.data)
 
+    def test_listar_usuarios_sem_consultas_por_item(self):
+        for index in range(3):
+            make_user(username=f'extra{index}', email=f'extra{index}@example.com')
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/auth/users/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+
     def test_listar_usuarios_viewer_retorna_403(self):
         self.client.force_authenticate(user=self.viewer)
         response = self.client.get('/api/auth/users/')
@@ -675,3 +693,176 @@ class UtilityFunctionsTest(TestCase):
 
         self.assertGreater(result['email_tokens_deleted'], 0)
         self.assertGreater(result['password_tokens_deleted'], 0)
+
+
+class WebSocketJWTCookieAuthTests(TransactionTestCase):
+    """
+    Autenticação de WebSockets pelo cookie JWT 'access' com cache de usuário.
+
+    O middleware resolve o usuário com ``database_sync_to_async``, que fecha
+    conexões antigas: fora de um TransactionTestCase fecharia a transação do teste.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(username='wsuser', email='ws@example.com', role='approver')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def _scope_user(self, cookie):
+        captured = {}
+
+        async def app(scope, receive, send):
+            captured['user'] = scope['user']
+
+        headers = [(b'cookie', cookie.encode())] if cookie else []
+        async_to_sync(JWTCookieAuthMiddleware(app))({'type': 'websocket', 'headers': headers}, None, None)
+        return captured['user']
+
+    def test_cookie_valido_autentica_usuario(self):
+        user = self._scope_user(f'access={self.token}')
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.profile.role, 'approver')
+
+    def test_sem_cookie_retorna_anonimo(self):
+        self.assertFalse(self._scope_user(None).is_authenticated)
+
+    def test_token_invalido_retorna_anonimo(self):
+        self.assertFalse(self._scope_user('access=token-invalido').is_authenticated)
+
+    def test_usuario_inativo_retorna_anonimo(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(resolve_user_from_token(self.token).is_authenticated)
+
+    def test_segunda_resolucao_usa_cache(self):
+        resolve_user_from_token(self.token)
+        with self.assertNumQueries(0):
+            user = resolve_user_from_token(self.token)
+            self.assertEqual(user.profile.role, 'approver')
+
+    def test_alterar_papel_invalida_cache(self):
+        resolve_user_from_token(self.token)
+        profile = self.user.profile
+        profile.role = 'viewer'
+        profile.save()
+        self.assertEqual(resolve_user_from_token(self.token).profile.role, 'viewer')
+
+    def test_excluir_usuario_invalida_cache(self):
+        resolve_user_from_token(self.token)
+        self.user.delete()
+        self.assertFalse(resolve_user_from_token(self.token).is_authenticated)
+
+    def test_cache_nao_guarda_senha_do_usuario(self):
+        resolve_user_from_token(self.token)
+        cached = cache.get(f'auth:user:{self.user.pk}')
+        self.assertNotIn(self.user.password, repr(cached))
+        self.assertEqual(cached, (self.user.pk, True, False, self.user.profile.pk, 'approver'))
+
+    def test_demais_campos_sao_carregados_sob_demanda(self):
+        resolve_user_from_token(self.token)
+        user = resolve_user_from_token(self.token)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.get_username(), 'wsuser')
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL_MS=60000)
+class AuditLogTests(TestCase):
+    """
+    Registro de auditoria em lote: entrada após o commit e gravação com bulk_create.
+    """
+
+    def setUp(self):
+        get_audit_buffer().flush()
+        self.user = make_user(username='audituser', email='audit@example.com')
+
+    def test_entrada_gravada_apos_commit_e_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            log_user_activity(self.user, 'login', ip_address='10.0.0.1', details={'user_agent': 'test'})
+        self.assertEqual(AuditEntry.objects.count(), 0)
+        self.assertEqual(get_audit_buffer().pending(), 1)
+
+        self.assertEqual(get_audit_buffer().flush(), 1)
+        entry = AuditEntry.objects.get()
+        self.assertEqual((entry.user, entry.username, entry.action), (self.user, 'audituser', 'login'))
+        self.assertEqual(entry.ip_address, '10.0.0.1')
+        self.assertEqual(entry.details, {'user_agent': 'test'})
+
+    def test_transacao_desfeita_nao_gera_entrada(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            log_user_activity(self.user, 'login')
+        self.assertEqual(get_audit_buffer().pending(), 0)
+
+    @override_settings(AUDIT_LOG_BATCH_SIZE=2)
+    def test_lote_cheio_grava_fora_da_thread_da_requisicao(self):
+        buffer = AuditBuffer()
+        flushed = threading.Event()
+        flush_threads = []
+
+        def fake_flush():
+            flush_threads.append(threading.get_ident())
+            flushed.set()
+
+        with mock.patch.object(buffer, 'flush', side_effect=fake_flush):
+            buffer.add({'username': 'a'})
+            self.assertFalse(flushed.is_set())
+            buffer.add({'username': 'b'})
+            self.assertTrue(flushed.wait(5))
+
+        self.assertNotEqual(flush_threads, [threading.get_ident()])
+
+    @override_settings(AUDIT_LOG_WRITER='celery')
+    def test_writer_celery_envia_lote_serializado(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            log_user_activity(self.user, 'logout', entity_type='user', entity_id=self.user.id)
+        with mock.patch('authentication.audit.write_audit_entries.delay') as delay:
+            get_audit_buffer().flush()
+        entries = delay.call_args[0][0]
+        self.assertEqual(entries[0]['action'], 'logout')
+        self.assertEqual(entries[0]['entity_id'], str(self.user.id))
+        self.assertIsInstance(entries[0]['created_at'], str)
+        self.assertEqual(AuditEntry.objects.count(), 0)
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL_MS=60000)
+class AuditDeletedUserTests(TransactionTestCase):
+    """
+    Usuário excluído com entradas pendentes: o lote não é perdido (a chave
+    estrangeira só é verificada no commit, daí o TransactionTestCase).
+    """
+
+    def setUp(self):
+        get_audit_buffer().flush()
+        self.user = make_user(username='fica', email='fica@example.com')
+        self.deleted = make_user(username='sai', email='sai@example.com')
+
+    def test_usuario_excluido_nao_descarta_o_lote(self):
+        log_user_activity(self.user, 'login')
+        log_user_activity(self.deleted, 'login')
+        self.deleted.delete()
+
+        self.assertEqual(get_audit_buffer().flush(), 2)
+        entries = {entry.username: entry.user_id for entry in AuditEntry.objects.all()}
+        self.assertEqual(entries, {'fica': self.user.pk, 'sai': None})
+
+    def test_exclusao_da_conta_fica_registrada(self):
+        self.deleted.set_password('Deletar123!')
+        self.deleted.save()
+        client = APIClient()
+        client.force_authenticate(user=self.deleted)
+        response = client.delete('/api/auth/account/delete/', {'password': 'Deletar123!'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(get_audit_buffer().flush(), 1)
+        entry = AuditEntry.objects.get()
+        self.assertEqual((entry.username, entry.action, entry.user_id), ('sai', 'account_deletion', None))
+
+
+class ClientIpTests(TestCase):
+    def test_x_forwarded_for_do_cliente_e_ignorado(self):
+        from django.test import RequestFactory
+        from rest_framework.throttling import AnonRateThrottle
+
+        request = RequestFactory().get('/', REMOTE_ADDR='203.0.113.7', HTTP_X_FORWARDED_FOR='127.0.0.1')
+
+        self.assertEqual(get_client_ip(request), '203.0.113.7')
+        self.assertEqual(AnonRateThrottle().get_ident(request), '203.0.113.7')
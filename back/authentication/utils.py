@@ -3,22 +3,24 @@ from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
 from celery import shared_task
 import logging
 
+from .audit import get_audit_buffer
+
 logger = logging.getLogger(__name__)
 
 
 def get_client_ip(request):
     """
     Retorna o endereço IP do cliente a partir da requisição.
+
+    O servidor ASGI já resolve X-Forwarded-For dos proxies confiáveis
+    (``FORWARDED_ALLOW_IPS``) em ``REMOTE_ADDR``; o cabeçalho bruto pode ser
+    forjado pelo cliente e não é usado.
     """
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+    return request.META.get('REMOTE_ADDR')
 
 
 def get_user_agent(request):
@@ -247,19 +249,30 @@ def generate_unique_username(email):
     return username
 
 
-def log_user_activity(user, action, ip_address=None, details=None):
+def log_user_activity(user, action, ip_address=None, details=None, entity_type='', entity_id='', link_user=True):
     """
     Registra atividade do usuário para fins de segurança e auditoria.
+
+    A entrada vai para o ``AuditEntry`` em lote, após o commit da transação
+    atual (ver ``authentication.audit``); a requisição não espera a gravação.
+    Com ``link_user=False`` guarda apenas o ``username`` (ex.: exclusão da
+    conta, em que o usuário não existe mais quando o lote é gravado).
     """
     log_entry = {
-        'user': user.username,
-        'user_id': user.id,
+        'user_id': user.id if link_user else None,
+        'username': user.username,
         'action': action,
-        'timestamp': timezone.now().isoformat(),
+        'entity_type': entity_type,
+        'entity_id': str(entity_id) if entity_id not in (None, '') else '',
         'ip_address': ip_address,
-        'details': details or {}
+        'details': details or {},
+        'created_at': timezone.now(),
     }
-    
-    logger.info(f"User activity: {log_entry}")
-    
-    return log_entry
\ No newline at end of file
+
+    # Formatação preguiçosa: os detalhes só viram texto se o nível INFO estiver ativo
+    logger.info("User activity: %s by %s (%s)", action, user.username, log_entry['details'])
+
+    buffer = get_audit_buffer()
+    transaction.on_commit(lambda: buffer.add(log_entry))
+
+    return log_entry
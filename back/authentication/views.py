@@ -580,7 +580,8 @@ def delete_account(request):
             user=user,
             action='account_deletion',
             ip_address=get_client_ip(request),
-            details={'user_agent': get_user_agent(request)}
+            details={'user_agent': get_user_agent(request)},
+            link_user=False
         )
 
         user.delete()
@@ -0,0 +1,143 @@
+"""
+Autenticação de WebSockets e views assíncronas pelo mesmo cookie JWT ('access')
+usado pela API.
+
+O token é validado localmente (assinatura e expiração) e o usuário, com o
+perfil, é resolvido por um cache de curta duração. Assim uma onda de
+reconexões (ex.: após um deploy) não consulta sessões nem a tabela de
+usuários a cada conexão.
+
+O cache guarda apenas o necessário para autorizar a conexão (``is_active``,
+``is_superuser`` e o papel), nunca o ``User`` serializado com o hash da senha.
+Os demais campos do usuário são adiados e carregados do banco no primeiro acesso.
+
+Nas views HTTP a resolução usa ``sync_to_async``; ``database_sync_to_async``
+(que chama ``close_old_connections`` a cada chamada) fica restrito ao
+middleware dos consumers, fora do ciclo de requisição do Django.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http.cookie import parse_cookie
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_KEY = 'auth:user:{user_id}'
+
+
+def _user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id=user_id)
+
+
+def get_cached_user(user_id):
+    """
+    Retorna o usuário (com ``profile`` já carregado) pelo ID, via cache.
+
+    Só ``id``, ``is_active``, ``is_superuser`` e ``profile.role`` vêm do cache;
+    os demais campos são consultados sob demanda. Retorna None se o usuário
+    não existir.
+    """
+    key = _user_cache_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = (
+            User.objects.filter(pk=user_id)
+            .values_list('id', 'is_active', 'is_superuser', 'profile__id', 'profile__role')
+            .first()
+        )
+        if state is None:
+            return None
+        cache.set(key, state, getattr(settings, 'WEBSOCKET_AUTH_USER_CACHE_TIMEOUT', 60))
+
+    user_id, is_active, is_superuser, profile_id, role = state
+    user = _partial_instance(User, id=user_id, is_active=is_active, is_superuser=is_superuser)
+    if profile_id is not None:
+        user.profile = _partial_instance(UserProfile, id=profile_id, user_id=user_id, role=role)
+    return user
+
+
+def _partial_instance(model, **values):
+    """Instância como se lida do banco só com ``values``; os demais campos ficam adiados."""
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
+def invalidate_cached_user(user_id):
+    """Remove o usuário do cache (chamado ao salvar User ou UserProfile)."""
+    cache.delete(_user_cache_key(user_id))
+
+
+def resolve_user_from_token(raw_token):
+    """
+    Valida o JWT de acesso e retorna o usuário correspondente.
+
+    Retorna ``AnonymousUser`` para token ausente, inválido, expirado ou de
+    usuário inativo.
+    """
+    if not raw_token:
+        return AnonymousUser()
+
+    try:
+        token = AccessToken(raw_token)
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return AnonymousUser()
+
+    user = get_cached_user(user_id)
+    if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+        return AnonymousUser()
+    return user
+
+
+def get_access_token_from_scope(scope):
+    """Extrai o cookie 'access' dos headers do scope ASGI."""
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            return parse_cookie(value.decode('latin1')).get('access')
+    return None
+
+
+def get_access_token_from_request(request):
+    """
+    Token JWT de uma requisição HTTP: cookie 'access' ou cabeçalho
+    ``Authorization: Bearer``. Usado pelas views assíncronas, fora do DRF.
+    """
+    token = request.COOKIES.get('access')
+    if token:
+        return token
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):]
+    return None
+
+
+async def aget_request_user(request):
+    """Usuário autenticado pelo JWT da requisição (AnonymousUser se inválido)."""
+    token = get_access_token_from_request(request)
+    if not token:
+        return AnonymousUser()
+    return await sync_to_async(resolve_user_from_token)(token)
+
+
+class JWTCookieAuthMiddleware(BaseMiddleware):
+    """
+    Middleware do Channels que popula ``scope['user']`` a partir do cookie JWT.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope['user'] = await database_sync_to_async(resolve_user_from_token)(
+            get_access_token_from_scope(scope)
+        )
+        return await super().__call__(scope, receive, send)
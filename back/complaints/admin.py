@@ -1,7 +1,13 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from core.protocol_lookup import invalidate_protocol
+from core.realtime import broadcast_counters
+from dashboard.models import ActivityEvent
+from dashboard.signals import activity_event_for
 from .models import Complaint
 
 
@@ -190,18 +196,44 @@ class ComplaintAdmin(admin.ModelAdmin):
     created_at_formatted.admin_order_field = 'created_at'
 
     # Ações em lote
+    def _update_status(self, request, queryset, status, **fields):
+        """
+        Atualiza as denúncias selecionadas com um único UPDATE.
+
+        O ``update()`` não dispara ``post_save``: a projeção pública dos
+        protocolos é invalidada aqui, e as mudanças de status geram os eventos
+        de atividade e a publicação dos contadores, como no save.
+        """
+        with transaction.atomic():
+            complaints = list(queryset.select_for_update())
+            updated = queryset.update(status=status, updated_at=timezone.now(), **fields)
+
+            events = []
+            for complaint in complaints:
+                invalidate_protocol(complaint.protocol)
+                if complaint.status != status:
+                    previous_status, complaint.status = complaint.status, status
+                    events.append(activity_event_for(
+                        complaint, 'status_changed', previous_status=previous_status, actor_id=request.user.pk
+                    ))
+            ActivityEvent.objects.bulk_create(events)
+            if events:
+                broadcast_counters()
+        return updated
+
     def mark_as_proposed(self, request, queryset):
         """Marca denúncias selecionadas como propostas"""
-        updated = queryset.update(status='proposto')
+        updated = self._update_status(request, queryset, 'proposto')
         self.message_user(request, f'{updated} denúncia(s) marcada(s) como proposto.')
 
     mark_as_proposed.short_description = 'Marcar como Proposto'
 
     def mark_as_in_analysis(self, request, queryset):
         """Marca denúncias selecionadas como em análise"""
-        from django.utils import timezone
-        updated = queryset.update(
-            status='em_analise',
+        updated = self._update_status(
+            request,
+            queryset,
+            'em_analise',
             reviewed_by=request.user,
             reviewed_at=timezone.now()
         )
@@ -211,9 +243,10 @@ class ComplaintAdmin(admin.ModelAdmin):
 
     def mark_as_concluded(self, request, queryset):
         """Marca denúncias selecionadas como concluídas"""
-        from django.utils import timezone
-        updated = queryset.update(
-            status='concluido',
+        updated = self._update_status(
+            request,
+            queryset,
+            'concluido',
             reviewed_by=request.user,
             reviewed_at=timezone.now()
         )
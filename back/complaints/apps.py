@@ -5,3 +5,9 @@ class ComplaintsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'complaints'
     verbose_name = 'Denúncias'
+
+    def ready(self):
+        """
+        Importa os signals quando o app está pronto.
+        """
+        import complaints.signals  # noqa
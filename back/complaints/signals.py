@@ -0,0 +1,54 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.protocol_lookup import invalidate_protocol
+from core.realtime import broadcast_counters, group_send_on_commit, topic_group
+from dashboard.signals import status_changed
+from .models import Complaint
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def invalidate_complaint_protocol_cache(sender, instance, **kwargs):
+    """
+    Invalida a projeção pública do protocolo sempre que a denúncia muda
+    (status, revisão, notas) ou é removida.
+    """
+    invalidate_protocol(instance.protocol)
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def push_complaint_counters(sender, instance, **kwargs):
+    """
+    Publica os contadores de pendências via WebSocket quando uma denúncia
+    é criada, muda de status ou é removida.
+    """
+    if kwargs.get('signal') is post_save and not kwargs['created'] and not status_changed(instance):
+        return
+    broadcast_counters()
+
+
+@receiver(post_save, sender=Complaint)
+def push_complaint_event(sender, instance, created, **kwargs):
+    """
+    Publica a denúncia no tópico ``complaints`` quando é criada ou muda de status.
+    Dados do denunciante não são enviados.
+    """
+    if not created and not status_changed(instance):
+        return
+
+    group_send_on_commit(topic_group('complaints'), {
+        'type': 'complaint.created' if created else 'complaint.updated',
+        'complaint': {
+            'id': instance.id,
+            'protocol': instance.protocol,
+            'vehicle_plate': instance.vehicle_plate,
+            'complaint_type': instance.complaint_type,
+            'complaint_type_display': instance.get_complaint_type_display(),
+            'status': instance.status,
+            'status_display': instance.get_status_display(),
+            'priority': instance.priority,
+            'created_at': instance.created_at.isoformat() if instance.created_at else None,
+        },
+    })
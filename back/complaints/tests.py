@@ -4,15 +4,20 @@ Testes abrangentes para o app complaints.
 Cobre o ViewSet completo, endpoints públicos (autocomplete, types, check-protocol)
 e as actions (change_status, change_priority, mark_as_resolved, statistics).
 """
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from .models import Complaint
+from .models import Complaint, ComplaintPhoto
+from core.protocol_lookup import get_public_projection
+from dashboard.models import ActivityEvent
 from vehicles.models import Vehicle
 from authentication.models import UserProfile
+from monitoring.testing import NPlusOneTestMixin
 
 def make_user(username='complaintuser', password='ComplaintPass123!', email='complaint@example.com', role='viewer'):
     user = User.objects.create_user(username=username, password=password, email=email)
@@ -142,7 +147,7 @@ class ComplaintCreateTests(APITestCase):
         response = self.client.post('/api/complaints/', data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-class ComplaintListTests(APITestCase):
+class ComplaintListTests(NPlusOneTestMixin, APITestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = make_user()
@@ -159,6 +164,17 @@ class ComplaintListTests(APITestCase):
         response = self.client.get('/api/complaints/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_listar_denuncias_revisadas_sem_consultas_por_item(self):
+        reviewer = make_approver()
+        for plate in ('NPO1111', 'NPO2222', 'NPO3333'):
+            complaint = make_complaint(vehicle_plate=plate)
+            complaint.reviewed_by = reviewer
+            complaint.save()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/complaints/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+
     def test_filtrar_denuncias_por_status(self):
         make_complaint(vehicle_plate='TST3333', status='em_analise')
         self.client.force_authenticate(user=self.user)
@@ -166,6 +182,97 @@ class ComplaintListTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['count'], 1)
 
+class ComplaintConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=make_user())
+        self.vehicle = Vehicle.objects.create(
+            plate='CND1234', brand='Fiat', model='Uno', year=2020, color='Branco',
+            chassis_number='CHASSISCND1234', renavam='RENAVAMCND1234', fuel_type='flex', category='Carro'
+        )
+        self.complaint = make_complaint(vehicle_plate='CND1234', vehicle=self.vehicle)
+
+    def test_listagem_com_etag_atual_retorna_304(self):
+        etag = self.client.get('/api/complaints/')['ETag']
+
+        response = self.client.get('/api/complaints/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_304_com_uma_consulta(self):
+        etag = self.client.get('/api/complaints/')['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/complaints/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_foto_nova_muda_o_etag_da_listagem_e_do_detalhe(self):
+        list_etag = self.client.get('/api/complaints/')['ETag']
+        detail_etag = self.client.get(f'/api/complaints/{self.complaint.pk}/')['ETag']
+
+        ComplaintPhoto.objects.create(complaint=self.complaint, photo='complaints/photos/foto.jpg')
+
+        response = self.client.get('/api/complaints/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(f'/api/complaints/{self.complaint.pk}/', HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['photos']), 1)
+
+    def test_veiculo_alterado_muda_o_etag(self):
+        etag = self.client.get('/api/complaints/')['ETag']
+
+        self.vehicle.color = 'Preto'
+        self.vehicle.save()
+
+        response = self.client.get('/api/complaints/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_acao_em_lote_do_admin_muda_o_etag(self):
+        from django.contrib.admin.sites import site
+
+        etag = self.client.get('/api/complaints/')['ETag']
+        request = mock.Mock(user=make_approver())
+        admin = site._registry[Complaint]
+        with mock.patch.object(admin, 'message_user'):
+            admin.mark_as_proposed(request, Complaint.objects.all())
+
+        response = self.client.get('/api/complaints/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class ComplaintAdminActionTests(TestCase):
+    """Ações em lote do admin (``queryset.update``) e os efeitos dos signals de save."""
+
+    def setUp(self):
+        from django.contrib.admin.sites import site
+
+        self.admin = site._registry[Complaint]
+        self.request = mock.Mock(user=make_approver())
+        self.complaint = make_complaint(vehicle_plate='ADM1234')
+
+    def _run(self, action):
+        with mock.patch.object(self.admin, 'message_user'):
+            with self.captureOnCommitCallbacks(execute=True):
+                getattr(self.admin, action)(self.request, Complaint.objects.all())
+
+    def test_acao_em_lote_atualiza_consulta_publica_do_protocolo(self):
+        self.assertEqual(get_public_projection(self.complaint.protocol)['status'], 'proposto')
+        self._run('mark_as_concluded')
+        self.assertEqual(get_public_projection(self.complaint.protocol)['status'], 'concluido')
+
+    def test_acao_em_lote_registra_atividade_e_publica_contadores(self):
+        unchanged = make_complaint(vehicle_plate='ADM5678', status='concluido')
+        with mock.patch('complaints.admin.broadcast_counters') as broadcast:
+            self._run('mark_as_concluded')
+
+        event = ActivityEvent.objects.get(entity_type='complaint', action='status_changed')
+        self.assertEqual(event.entity_id, self.complaint.pk)
+        self.assertEqual((event.previous_status, event.status), ('proposto', 'concluido'))
+        self.assertEqual(event.actor_id, self.request.user.pk)
+        self.assertFalse(ActivityEvent.objects.filter(entity_id=unchanged.pk, action='status_changed').exists())
+        broadcast.assert_called_once_with()
+
+
 class ComplaintChangeStatusTests(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -308,10 +415,10 @@ class ComplaintPublicEndpointsTests(APITestCase):
     def test_tipos_denuncia_retorna_200(self):
         response = self.client.get('/api/complaints/_types/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIsInstance(response.data, list)
-        self.assertEqual(len(response.data), 10)
-        self.assertIn('value', response.data[0])
-        self.assertIn('label', response.data[0])
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 10)
+        self.assertIn('value', response.json()[0])
+        self.assertIn('label', response.json()[0])
 
     def test_verificar_protocolo_sem_protocolo_retorna_400(self):
         response = self.client.get('/api/complaints/_check-protocol/')
@@ -325,7 +432,83 @@ class ComplaintPublicEndpointsTests(APITestCase):
         complaint = make_complaint(vehicle_plate='PRO1234')
         response = self.client.get(f'/api/complaints/_check-protocol/?protocol={complaint.protocol}')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['protocol'], complaint.protocol)
+        self.assertEqual(response.json()['protocol'], complaint.protocol)
+
+    def test_verificar_protocolo_sem_hifen_retorna_200(self):
+        complaint = make_complaint(vehicle_plate='PRO1234')
+        protocol_sem_hifen = complaint.protocol.replace('-', '').lower()
+        response = self.client.get(f'/api/complaints/_check-protocol/?protocol={protocol_sem_hifen}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['protocol'], complaint.protocol)
+
+    def test_verificar_protocolo_mesmo_payload_da_consulta_unificada(self):
+        complaint = make_complaint(vehicle_plate='PRO1234')
+        response = self.client.get(f'/api/complaints/_check-protocol/?protocol={complaint.protocol}')
+        unified = self.client.get(f'/api/protocols/{complaint.protocol}/')
+        self.assertEqual(response.content, unified.content)
+
+    def test_verificar_protocolo_servido_do_cache(self):
+        complaint = make_complaint(vehicle_plate='PRO1234')
+        self.client.get(f'/api/complaints/_check-protocol/?protocol={complaint.protocol}')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/complaints/_check-protocol/?protocol={complaint.protocol}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class ProtocolLookupTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.approver = make_approver()
+
+    def test_consulta_unificada_denuncia_retorna_200(self):
+        complaint = make_complaint(vehicle_plate='UNI1234')
+        response = self.client.get(f'/api/protocols/{complaint.protocol}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['protocol_type'], 'complaint')
+        self.assertEqual(response.data['status'], 'proposto')
+        self.assertNotIn('complainant_name', response.data)
+
+    def test_consulta_unificada_protocolo_invalido_retorna_400(self):
+        response = self.client.get('/api/protocols/XYZ-123/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_consulta_unificada_inexistente_retorna_404(self):
+        response = self.client.get('/api/protocols/CMP-20260999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_consulta_repetida_usa_cache(self):
+        complaint = make_complaint(vehicle_plate='UNI1234')
+        self.client.get(f'/api/protocols/{complaint.protocol}/')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/protocols/{complaint.protocol}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_resultado_negativo_cacheado_e_invalidado_na_criacao(self):
+        response = self.client.get('/api/protocols/CMP-00000001/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.client.get('/api/protocols/CMP-00000001/')
+
+        complaint = make_complaint(vehicle_plate='UNI1234')
+        Complaint.objects.filter(pk=complaint.pk).update(protocol='CMP-00000001')
+        complaint.refresh_from_db()
+        complaint.save()
+
+        response = self.client.get('/api/protocols/CMP-00000001/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_mudanca_de_status_invalida_cache(self):
+        complaint = make_complaint(vehicle_plate='UNI1234')
+        self.client.get(f'/api/protocols/{complaint.protocol}/')
+
+        self.client.force_authenticate(user=self.approver)
+        complaint.status = 'em_analise'
+        complaint.save()
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(f'/api/protocols/{complaint.protocol}/')
+        self.assertEqual(response.data['status'], 'em_analise')
 
 class ComplaintValidationTest(TestCase):
     def test_descricao_curta_levanta_validacao(self):
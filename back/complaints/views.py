@@ -4,10 +4,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.utils import timezone
 from django.db.models import Q, Count
+from django.views.decorators.http import require_safe
 from django_filters.rest_framework import DjangoFilterBackend
 
 from authentication.permissions import IsApproverOrAdmin
-from core.throttling import PublicWriteThrottle
+from core.async_api import json_response
+from core.conditional import ConditionalGetMixin
+from core.throttling import PublicWriteThrottle, AsyncAnonRateThrottle, AsyncUserRateThrottle, athrottle_classes
+from core.protocol_lookup import normalize_protocol, get_protocol_prefix, aget_public_projection
 from .models import Complaint, ComplaintPhoto
 from .serializers import (
     ComplaintCreateSerializer,
@@ -20,7 +24,7 @@ from .serializers import (
 from vehicles.models import Vehicle
 
 
-class ComplaintViewSet(viewsets.ModelViewSet):
+class ComplaintViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar denúncias.
 
@@ -28,6 +32,7 @@ class ComplaintViewSet(viewsets.ModelViewSet):
     """
 
     queryset = Complaint.objects.select_related('vehicle', 'reviewed_by').prefetch_related('photos').all()
+    conditional_related = {'vehicle': 'updated_at', 'photos': 'uploaded_at'}
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'complaint_type', 'is_anonymous']
     search_fields = ['vehicle_plate', 'description', 'complainant_name', 'occurrence_location']
@@ -242,66 +247,47 @@ def vehicle_autocomplete(request):
     return Response(results)
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def complaint_types(request):
+@require_safe
+@athrottle_classes([AsyncAnonRateThrottle, AsyncUserRateThrottle])
+async def complaint_types(request):
     """Retorna a lista de tipos de denúncia disponíveis."""
     types = [
         {'value': key, 'label': label}
         for key, label in Complaint.TYPE_CHOICES
     ]
 
-    return Response(types)
+    return json_response(types)
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def check_complaint_by_protocol(request):
+@require_safe
+@athrottle_classes([AsyncAnonRateThrottle, AsyncUserRateThrottle])
+async def check_complaint_by_protocol(request):
     """
     Consulta pública de denúncia pelo número de protocolo.
     Retorna apenas dados básicos, sem expor informações do denunciante.
+    Mantida por compatibilidade; a consulta unificada fica em /api/protocols/<protocolo>/.
     """
-    protocol = request.query_params.get('protocol', '').strip()
+    protocol = request.GET.get('protocol', '').strip()
 
     if not protocol:
-        return Response(
+        return json_response(
             {'error': 'O número do protocolo é obrigatório.'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    protocol = protocol.upper().replace(' ', '').replace('-', '')
+    normalized = normalize_protocol(protocol)
+    data = None
+    if normalized and get_protocol_prefix(normalized) == 'CMP':
+        data = await aget_public_projection(normalized)
 
-    try:
-        complaint = Complaint.objects.select_related('vehicle').get(protocol=protocol)
-    except Complaint.DoesNotExist:
-        return Response(
+    if data is None:
+        return json_response(
             {
                 'error': 'Protocolo não encontrado.',
                 'message': 'Não foi possível localizar uma denúncia com o protocolo informado. Verifique se o número está correto.',
-                'protocol_searched': protocol
+                'protocol_searched': normalized or protocol.upper().replace(' ', '')
             },
             status=status.HTTP_404_NOT_FOUND
         )
 
-    data = {
-        'protocol': complaint.protocol,
-        'status': complaint.status,
-        'status_display': complaint.get_status_display(),
-        'complaint_type': complaint.complaint_type,
-        'complaint_type_display': complaint.get_complaint_type_display(),
-        'vehicle_plate': complaint.vehicle_plate,
-        'occurrence_date': complaint.occurrence_date,
-        'occurrence_location': complaint.occurrence_location,
-        'created_at': complaint.created_at,
-        'updated_at': complaint.updated_at,
-    }
-
-    if complaint.vehicle:
-        data['vehicle'] = {
-            'brand': complaint.vehicle.brand,
-            'model': complaint.vehicle.model,
-            'year': complaint.vehicle.year,
-            'color': complaint.vehicle.color,
-        }
-
-    return Response(data)
+    return json_response(data)
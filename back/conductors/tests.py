@@ -4,6 +4,8 @@ Testes abrangentes para o app conductors.
 Cobre todos os endpoints: listar, criar, detalhar, atualizar, deletar,
 buscar, estatísticas, verificação de duplicatas e desativação em massa.
 """
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
@@ -11,7 +13,8 @@ from rest_framework import status
 from django.utils import timezone
 
 from .models import Conductor
-from authentication.models import UserProfile
+from authentication.audit import get_audit_buffer
+from authentication.models import AuditEntry, UserProfile
 
 def make_user(username='testuser', password='TestPass123!', email='test@example.com', role='viewer'):
     user = User.objects.create_user(username=username, password=password, email=email)
@@ -153,6 +156,17 @@ class ConductorDetailTests(TestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_patch_condutor_gera_entrada_de_auditoria(self):
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/conductors/{self.conductor.pk}/', {'name': 'Nome Atualizado'})
+        get_audit_buffer().flush()
+
+        entry = AuditEntry.objects.get(action='conductor_update')
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual((entry.entity_type, entry.entity_id), ('conductor', str(self.conductor.pk)))
+        self.assertEqual(entry.details['updated_fields'], ['name'])
+
     def test_put_condutor_autenticado_retorna_200(self):
         self.client.force_authenticate(user=self.user)
         data = {
@@ -266,6 +280,55 @@ class CheckDuplicateTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertFalse(response.data['exists'])
 
+class ConductorConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user()
+        self.client.force_authenticate(user=self.user)
+        self.conductor = make_conductor(created_by=self.user)
+
+    def test_listagem_com_etag_atual_retorna_304(self):
+        etag = self.client.get('/api/conductors/')['ETag']
+
+        response = self.client.get('/api/conductors/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_desativacao_em_massa_muda_o_etag(self):
+        etag = self.client.get('/api/conductors/')['ETag']
+
+        self.client.post('/api/conductors/bulk/deactivate/', {'conductor_ids': [self.conductor.pk]}, format='json')
+
+        response = self.client.get('/api/conductors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['results'][0]['is_active'])
+
+    def test_veiculo_vinculado_muda_o_etag_do_detalhe(self):
+        from vehicles.models import Vehicle
+
+        etag = self.client.get(f'/api/conductors/{self.conductor.pk}/')['ETag']
+        vehicle = Vehicle.objects.create(
+            plate='CND4321', brand='Fiat', model='Uno', year=2020, color='Branco',
+            chassis_number='CHASSISCND4321', renavam='RENAVAMCND4321', fuel_type='flex', category='Carro'
+        )
+        vehicle.conductors.add(self.conductor)
+
+        response = self.client.get(f'/api/conductors/{self.conductor.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['vehicles']), 1)
+
+        response = self.client.get(f'/api/conductors/{self.conductor.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_muda_com_a_data(self):
+        etag = self.client.get('/api/conductors/')['ETag']
+
+        tomorrow = timezone.localdate() + timezone.timedelta(days=1)
+        with mock.patch('core.conditional.timezone.localdate', return_value=tomorrow):
+            response = self.client.get('/api/conductors/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 class BulkDeactivateTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -288,6 +351,34 @@ class BulkDeactivateTests(TestCase):
         self.c1.refresh_from_db()
         self.assertFalse(self.c1.is_active)
 
+    def test_desativar_em_massa_audita_cada_condutor(self):
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/conductors/bulk/deactivate/', {
+                'conductor_ids': [self.c1.pk, self.c2.pk]
+            }, format='json')
+        get_audit_buffer().flush()
+
+        entries = AuditEntry.objects.filter(action='conductors_bulk_deactivate')
+        self.assertEqual(
+            sorted(entries.values_list('entity_id', flat=True)),
+            sorted([str(self.c1.pk), str(self.c2.pk)])
+        )
+
+    def test_desativar_audita_apenas_condutores_alterados(self):
+        self.c2.is_active = False
+        self.c2.save()
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/conductors/bulk/deactivate/', {
+                'conductor_ids': [self.c1.pk, self.c2.pk, 99999]
+            }, format='json')
+        get_audit_buffer().flush()
+
+        self.assertEqual(response.data['updated_count'], 1)
+        entries = AuditEntry.objects.filter(action='conductors_bulk_deactivate')
+        self.assertEqual(list(entries.values_list('entity_id', flat=True)), [str(self.c1.pk)])
+
     def test_desativar_sem_ids_retorna_400(self):
         self.client.force_authenticate(user=self.user)
         response = self.client.post('/api/conductors/bulk/deactivate/', {}, format='json')
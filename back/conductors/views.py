@@ -10,8 +10,9 @@ from django_filters import rest_framework as django_filters
 from django_filters import FilterSet, CharFilter, BooleanFilter, DateFilter
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 from .models import Conductor
 from .serializers import (
@@ -21,6 +22,8 @@ from .serializers import (
     ConductorListSerializer
 )
 from authentication.utils import get_client_ip, get_user_agent, log_user_activity
+from core.conditional import ConditionalGetMixin
+from core.db_router import replica_reads
 from core.exceptions import safe_error_response, get_error_message
 
 logger = logging.getLogger(__name__)
@@ -92,7 +95,7 @@ class ConductorFilter(FilterSet):
         ]
 
 
-class ConductorListCreateView(ListCreateAPIView):
+class ConductorListCreateView(ConditionalGetMixin, ListCreateAPIView):
     queryset = Conductor.objects.select_related(
         'created_by',
         'updated_by'
@@ -118,6 +121,8 @@ class ConductorListCreateView(ListCreateAPIView):
             user=self.request.user,
             action='conductor_create',
             ip_address=get_client_ip(self.request),
+            entity_type='conductor',
+            entity_id=conductor.id,
             details={
                 'conductor_id': conductor.id,
                 'conductor_name': conductor.name,
@@ -137,7 +142,7 @@ class ConductorListCreateView(ListCreateAPIView):
             )
 
 
-class ConductorDetailView(RetrieveUpdateDestroyAPIView):
+class ConductorDetailView(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     queryset = Conductor.objects.select_related(
         'created_by',
         'updated_by'
@@ -145,6 +150,8 @@ class ConductorDetailView(RetrieveUpdateDestroyAPIView):
         'vehicles'
     )
     permission_classes = [permissions.IsAuthenticated]
+    # ConductorSerializer inclui os veículos vinculados
+    conditional_related = {'vehicles': 'updated_at'}
 
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -158,6 +165,8 @@ class ConductorDetailView(RetrieveUpdateDestroyAPIView):
             user=self.request.user,
             action='conductor_update',
             ip_address=get_client_ip(self.request),
+            entity_type='conductor',
+            entity_id=conductor.id,
             details={
                 'conductor_id': conductor.id,
                 'conductor_name': conductor.name,
@@ -171,6 +180,8 @@ class ConductorDetailView(RetrieveUpdateDestroyAPIView):
             user=self.request.user,
             action='conductor_delete',
             ip_address=get_client_ip(self.request),
+            entity_type='conductor',
+            entity_id=instance.id,
             details={
                 'conductor_id': instance.id,
                 'conductor_name': instance.name,
@@ -235,10 +246,9 @@ class ConductorSearchView(APIView):
 class ConductorStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @replica_reads()
     def get(self, request):
         try:
-            from django.utils import timezone
-
             total_conductors = Conductor.objects.count()
             active_conductors = Conductor.objects.filter(is_active=True).count()
             inactive_conductors = total_conductors - active_conductors
@@ -374,20 +384,32 @@ class BulkDeactivateConductorsView(APIView):
                     'error': 'Lista de IDs de condutores é obrigatória'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            updated_count = Conductor.objects.filter(
-                id__in=conductor_ids
-            ).update(is_active=False)
-
-            log_user_activity(
-                user=request.user,
-                action='conductors_bulk_deactivate',
-                ip_address=get_client_ip(request),
-                details={
-                    'conductor_ids': conductor_ids,
-                    'updated_count': updated_count,
-                    'user_agent': get_user_agent(request)
-                }
-            )
+            # Apenas os condutores existentes e ainda ativos mudam (e entram na auditoria)
+            with transaction.atomic():
+                deactivated_ids = list(
+                    Conductor.objects.select_for_update()
+                    .filter(id__in=conductor_ids, is_active=True)
+                    .values_list('id', flat=True)
+                )
+                updated_count = Conductor.objects.filter(
+                    id__in=deactivated_ids
+                ).update(is_active=False, updated_at=timezone.now())
+
+            # Uma entrada por condutor, para o histórico de cada registro
+            ip_address = get_client_ip(request)
+            details = {
+                'updated_count': updated_count,
+                'user_agent': get_user_agent(request)
+            }
+            for conductor_id in deactivated_ids:
+                log_user_activity(
+                    user=request.user,
+                    action='conductors_bulk_deactivate',
+                    ip_address=ip_address,
+                    entity_type='conductor',
+                    entity_id=conductor_id,
+                    details=details
+                )
 
             return Response({
                 'message': f'{updated_count} condutores foram desativados com sucesso',
@@ -0,0 +1,35 @@
+"""
+Respostas JSON das views assíncronas do Django no mesmo formato da API DRF.
+
+As views públicas mais acessadas (placas, protocolo, tipos de denúncia e
+configuração do site) são ``async def`` e rodam no event loop de cada worker
+ASGI (``core.workers``), sem passar pelo ``APIView``. O ORM assíncrono e os
+backends de cache do Django ainda delegam ao ``sync_to_async``: as leituras
+de cache usam ``thread_sensitive=False`` (não esperam na thread única), e cada
+consulta ao banco em um cache miss custa um salto de thread.
+Estes helpers mantêm o corpo idêntico ao do ``JSONRenderer`` (datas com
+microssegundos, UTF-8 sem escapes) e o formato de erro de ``safe_error_response``.
+"""
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.exceptions import safe_error_response
+
+
+def json_response(data, status=200, headers=None):
+    """``JsonResponse`` com o encoder do DRF (aceita listas)."""
+    return JsonResponse(
+        data,
+        status=status,
+        headers=headers,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def error_response(message, exception=None, context=None, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR):
+    """``safe_error_response`` para views assíncronas."""
+    error = safe_error_response(message=message, exception=exception, context=context, status_code=status_code)
+    return json_response(error.data, status=error.status_code)
@@ -0,0 +1,88 @@
+"""
+Cache stale-while-revalidate para payloads caros e compartilhados.
+
+O valor é servido do cache imediatamente. Passados ``fresh_seconds`` ele
+continua sendo servido (até ``stale_seconds`` a mais) enquanto uma única
+thread em segundo plano o recalcula. Um lock em cache (``cache.add``) garante
+que N requisições simultâneas disparem um único recálculo, inclusive no cache
+frio: quem não obtém o lock aguarda o valor calculado pela outra requisição.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+LOCK_SUFFIX = ':lock'
+WAIT_INTERVAL = 0.05
+
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='swr-refresh')
+
+
+def _store(key, value, fresh_seconds, stale_seconds):
+    cache.set(
+        key,
+        {'value': value, 'computed_at': time.time()},
+        fresh_seconds + stale_seconds
+    )
+
+
+def _refresh(key, compute, fresh_seconds, stale_seconds):
+    """Recalcula e grava o valor; libera o lock ao final."""
+    try:
+        value = compute()
+        _store(key, value, fresh_seconds, stale_seconds)
+        return value
+    finally:
+        cache.delete(key + LOCK_SUFFIX)
+
+
+def _refresh_in_background(key, compute, fresh_seconds, stale_seconds):
+    try:
+        _refresh(key, compute, fresh_seconds, stale_seconds)
+    except Exception:
+        logger.exception("Falha ao recalcular o cache '%s' em segundo plano", key)
+    finally:
+        # Thread do pool: não manter conexão aberta entre recálculos esporádicos
+        connection.close()
+
+
+def get_or_refresh(key, compute, fresh_seconds, stale_seconds, lock_timeout=30):
+    """
+    Retorna o valor de ``key``, calculando-o com ``compute()`` quando necessário.
+
+    - fresco: servido do cache;
+    - vencido (dentro da janela stale): servido do cache e recalculado em
+      segundo plano por apenas uma requisição;
+    - ausente: calculado por uma requisição; as concorrentes aguardam até
+      ``lock_timeout`` segundos pelo resultado antes de calcular por conta própria.
+    """
+    lock_key = key + LOCK_SUFFIX
+    entry = cache.get(key)
+
+    if entry is not None:
+        if time.time() - entry['computed_at'] >= fresh_seconds and cache.add(lock_key, 1, lock_timeout):
+            if connection.in_atomic_block:
+                # Outra conexão não enxergaria os dados da transação atual
+                _refresh(key, compute, fresh_seconds, stale_seconds)
+            else:
+                _refresh_executor.submit(_refresh_in_background, key, compute, fresh_seconds, stale_seconds)
+        return entry['value']
+
+    if cache.add(lock_key, 1, lock_timeout):
+        return _refresh(key, compute, fresh_seconds, stale_seconds)
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value']
+        if cache.get(lock_key) is None:
+            break
+
+    entry = cache.get(key)
+    return entry['value'] if entry is not None else compute()
@@ -1,8 +1,38 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+# Registra os sinais de métricas e de rastreamento das tarefas (task_prerun/task_postrun)
+from core import metrics, tracing  # noqa: E402,F401
+
+
+@worker_process_init.connect(dispatch_uid='core.celery.reset_database_pools')
+def reset_database_pools(**kwargs):
+    """
+    Descarta os pools de conexões herdados do processo principal do worker:
+    as threads de manutenção do psycopg_pool não sobrevivem ao fork, e cada
+    processo filho abre o próprio pool na primeira consulta.
+    """
+    from django.db import connections
+
+    for conn in connections.all():
+        if conn.vendor == 'postgresql' and conn.settings_dict['OPTIONS'].get('pool'):
+            # Não usa conn.close_pool(): ele chama pool.close(), que encerra as
+            # conexões herdadas (os sockets são os mesmos do processo principal)
+            # e derrubaria as conexões dele. _connection_pools é privado do
+            # DatabaseWrapper; CeleryForkTests falha se ele mudar no Django.
+            conn._connection_pools.pop(conn.alias, None)
+
+
+@worker_process_shutdown.connect(dispatch_uid='core.celery.run_shutdown_hooks')
+def flush_on_shutdown(**kwargs):
+    """Envia os eventos e a auditoria pendentes antes de o processo filho sair."""
+    from core.flusher import run_shutdown_hooks
+
+    run_shutdown_hooks()
@@ -0,0 +1,57 @@
+"""
+Execução concorrente de consultas independentes ao banco.
+
+Cada consulta roda em uma thread do pool com a conexão daquela thread. Ao fim
+de cada tarefa a conexão é fechada, o que a devolve ao pool de conexões do
+processo: as threads são fixas e, de outro modo, reteriam até
+``QUERY_THREAD_POOL_SIZE`` conexões do pool enquanto o worker existir.
+Dentro de uma transação as consultas rodam em série na thread atual: outras
+conexões não enxergariam os dados ainda não confirmados (ex.: nos testes).
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection, connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_query_executor():
+    """Pool compartilhado, dimensionado por ``QUERY_THREAD_POOL_SIZE``."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'QUERY_THREAD_POOL_SIZE', 4),
+                    thread_name_prefix='db-query'
+                )
+    return _executor
+
+
+def _run_in_pool_thread(func):
+    try:
+        return func()
+    finally:
+        # Inclui as réplicas que o roteador tenha usado nesta thread
+        connections.close_all()
+
+
+def run_queries(queries):
+    """
+    Executa as consultas de ``queries`` (nome -> função sem argumentos) e
+    retorna um dicionário nome -> resultado.
+
+    Exceções de qualquer consulta são propagadas após o término das demais.
+    Cada consulta roda em uma cópia do contexto atual (métricas, logging).
+    """
+    if len(queries) < 2 or connection.in_atomic_block or getattr(settings, 'QUERY_THREAD_POOL_SIZE', 4) < 2:
+        return {name: func() for name, func in queries.items()}
+
+    executor = get_query_executor()
+    futures = {name: executor.submit(contextvars.copy_context().run, _run_in_pool_thread, func) for name, func in queries.items()}
+    wait(futures.values())
+    return {name: future.result() for name, future in futures.items()}
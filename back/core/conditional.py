@@ -0,0 +1,102 @@
+"""
+GET condicional (ETag/Last-Modified) para as listagens e detalhes da API.
+
+O painel consulta as listagens periodicamente; ``ConditionalGetMixin`` calcula
+um validador barato antes da serialização e responde 304 quando o cliente já
+tem a versão atual:
+
+- list: uma consulta agregada sobre o queryset filtrado, com ``MAX`` do campo
+  de atualização (``conditional_field``) e a contagem. A contagem cobre
+  exclusões; o ETag inclui a URL completa (filtros, busca, página e ordenação).
+  Só ETag: ``Last-Modified`` não perceberia uma exclusão.
+- retrieve: o próprio objeto (``get_object``, com as verificações de
+  permissão), com ETag e ``Last-Modified``.
+
+Relações exibidas pelo serializer entram em ``conditional_related``
+(``{'relação': 'campo de data do model relacionado'}``), somando o ``MAX`` e a
+contagem delas ao validador. O ETag também muda a cada dia, por causa de campos
+calculados com a data atual (ex.: ``is_license_expired``).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified e 304 nas ações ``list`` e ``retrieve`` de views genéricas."""
+
+    conditional_field = 'updated_at'
+    conditional_related = {}
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self._etag(self._list_validator(queryset))
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag)
+        return self._with_validators(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        validator = self._object_validator(instance)
+        etag = self._etag(validator)
+        last_modified = max((value for value in validator[1::2] if value is not None), default=None)
+        # Resolução de segundos, como no cabeçalho
+        last_modified = last_modified and int(last_modified.timestamp())
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag, last_modified)
+
+        serializer = self.get_serializer(instance)
+        return self._with_validators(Response(serializer.data), etag, last_modified)
+
+    def _list_validator(self, queryset):
+        aggregates = {
+            'count': Count('pk', distinct=True),
+            'last_modified': Max(self.conditional_field),
+        }
+        for relation, field in self.conditional_related.items():
+            aggregates[f'{relation}_count'] = Count(relation, distinct=True)
+            aggregates[f'{relation}_last_modified'] = Max(f'{relation}__{field}')
+        result = queryset.order_by().aggregate(**aggregates)
+        return [result[name] for name in aggregates]
+
+    def _object_validator(self, instance):
+        """Mesmo formato de ``_list_validator`` para um objeto (relações já carregadas)."""
+        validator = [instance.pk, getattr(instance, self.conditional_field)]
+        for relation, field in self.conditional_related.items():
+            model_field = instance._meta.get_field(relation)
+            if model_field.many_to_many or model_field.one_to_many:
+                related = list(getattr(instance, relation).all())
+            else:
+                related = [obj for obj in [getattr(instance, relation)] if obj is not None]
+            timestamps = [getattr(obj, field) for obj in related if getattr(obj, field) is not None]
+            validator += [len(related), max(timestamps, default=None)]
+        return validator
+
+    def _etag(self, validator):
+        request = self.request
+        parts = [
+            request.get_full_path(),
+            getattr(request.accepted_renderer, 'format', ''),
+            request.user.pk,
+            timezone.localdate(),
+            *validator,
+        ]
+        digest = hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()[:32]
+        # Fraco: o validador representa o estado dos registros, não os bytes da resposta
+        return f'W/"{digest}"'
+
+    def _with_validators(self, response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # Dados autenticados: só o navegador guarda, e sempre revalida
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,130 @@
+"""
+Roteamento de leituras para réplicas do banco (``DB_REPLICA_HOSTS``).
+
+- Requisições de métodos seguros (GET, HEAD, OPTIONS) leem de uma réplica;
+  as demais e todo código fora de requisição (Celery, consumers) usam o primário.
+- Leitura após escrita: depois de gravar, a requisição passa a ler do primário
+  e o cliente recebe o cookie ``DB_REPLICA_STICKY_COOKIE`` por
+  ``DB_REPLICA_STICKY_SECONDS`` segundos, período em que as leituras dele
+  também vão para o primário (o cookie vale entre workers e para anônimos, como
+  quem acabou de enviar uma solicitação pública).
+- ``replica_reads()`` força a réplica para consultas que toleram atraso de
+  replicação (agregados do dashboard e estatísticas), mesmo com o cookie.
+
+Dentro de uma transação do primário as leituras continuam no primário, que é o
+único que enxerga os dados ainda não confirmados. Sem réplicas configuradas
+tudo vai para ``default``.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = ContextVar('db_routing', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_cookie_name():
+    return getattr(settings, 'DB_REPLICA_STICKY_COOKIE', 'db_primary')
+
+
+@contextmanager
+def replica_reads():
+    """Leituras do bloco vão para uma réplica (também funciona como decorator)."""
+    outer = _routing.get()
+    state = {'replica': True, 'wrote': False}
+    token = _routing.set(state)
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+        if state['wrote'] and outer is not None:
+            outer['wrote'] = True
+
+
+class ReplicaRouter:
+    """Leituras na réplica quando o contexto permite; escritas sempre no primário."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state['replica'] or state['wrote']:
+            return PRIMARY
+        replicas = replica_aliases()
+        if not replicas or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state['wrote'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Réplicas recebem o schema pela replicação do primário
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Define o roteamento da requisição e marca o cliente após uma escrita."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(request, response, state)
+
+    async def __acall__(self, request):
+        state, token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(request, response, state)
+
+    def _begin(self, request):
+        state = {
+            'replica': request.method in SAFE_METHODS and sticky_cookie_name() not in request.COOKIES,
+            'wrote': False,
+        }
+        return state, _routing.set(state)
+
+    def _finish(self, request, response, state):
+        if state['wrote'] and replica_aliases():
+            response.set_cookie(
+                sticky_cookie_name(), '1',
+                max_age=getattr(settings, 'DB_REPLICA_STICKY_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
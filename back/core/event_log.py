@@ -0,0 +1,141 @@
+"""
+Registro limitado dos eventos enviados aos grupos do channel layer.
+
+Cada evento recebe um ID monotônico (formato ``<ms>-<seq>`` dos Redis Streams),
+permitindo que um cliente que reconectou peça apenas o que perdeu. Todos os
+grupos compartilham um único stream, para que os IDs sejam comparáveis entre
+os grupos de uma mesma conexão. Com o channel layer em Redis o stream é um
+Redis Stream (XADD com MAXLEN aproximado); com o ``InMemoryChannelLayer``
+(testes/desenvolvimento) o registro fica em memória no próprio processo.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = 'realtime:events'
+
+
+def parse_event_id(event_id):
+    """Converte ``'<ms>-<seq>'`` em tupla comparável; retorna None se inválido."""
+    try:
+        ms, _, seq = str(event_id).partition('-')
+        return int(ms), int(seq or 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _maxlen():
+    return getattr(settings, 'REALTIME_EVENT_LOG_MAXLEN', 1000)
+
+
+class InMemoryEventLog:
+    """Registro em memória, usado junto com o InMemoryChannelLayer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stream = deque(maxlen=_maxlen())
+        self._last_id = (0, 0)
+
+    def _next_id(self):
+        now = int(time.time() * 1000)
+        ms, seq = self._last_id
+        self._last_id = (now, 0) if now > ms else (ms, seq + 1)
+        return '%d-%d' % self._last_id
+
+    def append(self, group, message):
+        with self._lock:
+            event_id = self._next_id()
+            self._stream.append((event_id, group, json.loads(json.dumps(message))))
+            return event_id
+
+    def read_after(self, groups, last_event_id, count):
+        """
+        Eventos dos ``groups`` posteriores a ``last_event_id`` (no máximo ``count``).
+
+        Retorna ``(eventos, completo)``; ``completo`` é False quando eventos
+        posteriores ao ID informado já foram descartados ou excedem ``count``.
+        """
+        last = parse_event_id(last_event_id)
+        with self._lock:
+            stream = list(self._stream)
+
+        covered = not stream or parse_event_id(stream[0][0]) <= last
+        events = [
+            (event_id, message)
+            for event_id, group, message in stream
+            if group in groups and parse_event_id(event_id) > last
+        ]
+        return events[:count], covered and len(events) <= count
+
+    def clear(self):
+        with self._lock:
+            self._stream.clear()
+
+
+class RedisEventLog:
+    """Registro em Redis Streams, compartilhado por todos os workers."""
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_connect_timeout=2, socket_timeout=2)
+
+    def append(self, group, message):
+        return self._client.xadd(
+            STREAM_KEY,
+            {'group': group, 'data': json.dumps(message)},
+            maxlen=_maxlen(),
+            approximate=True,
+        ).decode()
+
+    def read_after(self, groups, last_event_id, count):
+        # O evento informado (ou um anterior) ainda está no stream: nada foi descartado
+        covered = bool(self._client.xrange(STREAM_KEY, min='-', max=last_event_id, count=1)) \
+            or not self._client.xlen(STREAM_KEY)
+
+        events = []
+        encoded_groups = {group.encode() for group in groups}
+        for event_id, fields in self._client.xrange(STREAM_KEY, min=f'({last_event_id}', max='+'):
+            if fields[b'group'] in encoded_groups:
+                events.append((event_id.decode(), json.loads(fields[b'data'])))
+        return events[:count], covered and len(events) <= count
+
+    def clear(self):
+        self._client.delete(STREAM_KEY)
+
+
+_event_log = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """Retorna o registro de eventos adequado ao channel layer configurado."""
+    global _event_log
+    if _event_log is None:
+        with _event_log_lock:
+            if _event_log is None:
+                backend = settings.CHANNEL_LAYERS.get('default', {}).get('BACKEND', '')
+                if 'InMemoryChannelLayer' in backend:
+                    _event_log = InMemoryEventLog()
+                else:
+                    _event_log = RedisEventLog(
+                        getattr(settings, 'REALTIME_EVENT_LOG_REDIS_URL', 'redis://localhost:6379/0')
+                    )
+    return _event_log
+
+
+def reset_event_log(**kwargs):
+    """Descarta a instância atual (ex.: quando CHANNEL_LAYERS muda nos testes)."""
+    global _event_log
+    if kwargs.get('setting') in (None, 'CHANNEL_LAYERS'):
+        _event_log = None
+
+
+setting_changed.connect(reset_event_log)
@@ -0,0 +1,125 @@
+"""
+Descargas adiadas em segundo plano e ganchos de encerramento do processo.
+
+``EventCoalescer`` (``core.realtime``) e ``AuditBuffer`` (``authentication.audit``)
+acumulam trabalho e o descarregam após um prazo. Os prazos ficam em um heap
+atendido por uma única thread daemon por processo, iniciada sob demanda (e
+recriada no processo filho após um fork), em vez de uma thread por janela.
+
+``on_shutdown`` registra descargas executadas ao encerrar o processo: pelo
+worker ASGI do gunicorn (``core.workers``) e pelo Celery
+(``worker_process_shutdown``), enquanto o event loop e os executors ainda estão
+ativos, e pelo ``atexit`` como último recurso (runserver, comandos).
+"""
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Flusher:
+    """Executa cada callback agendado no seu prazo, em uma thread compartilhada."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = []
+        self._scheduled = {}
+        self._sequence = itertools.count()
+        self._thread = None
+        self._pid = None
+
+    def schedule(self, key, delay, callback):
+        """
+        Agenda ``callback`` para daqui a ``delay`` segundos.
+
+        Se ``key`` já está agendada vale o prazo mais próximo (ex.: lote cheio
+        antecipa a descarga já marcada pela janela).
+        """
+        deadline = time.monotonic() + delay
+        with self._condition:
+            current = self._scheduled.get(key)
+            if current is not None and current[0] <= deadline:
+                return
+            self._scheduled[key] = (deadline, callback)
+            heapq.heappush(self._heap, (deadline, next(self._sequence), key))
+            self._ensure_thread()
+            self._condition.notify()
+
+    def cancel(self, key):
+        with self._condition:
+            self._scheduled.pop(key, None)
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='flusher', daemon=True)
+            self._thread.start()
+
+    def _next_due(self):
+        """Próximo callback vencido; espera no ``_condition`` até haver um."""
+        with self._condition:
+            while True:
+                # Entradas canceladas ou reagendadas ficam no heap e são descartadas aqui
+                while self._heap and self._scheduled.get(self._heap[0][2], (None,))[0] != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, _, key = self._heap[0]
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                heapq.heappop(self._heap)
+                return self._scheduled.pop(key)[1]
+
+    def _run(self):
+        while True:
+            callback = self._next_due()
+            try:
+                callback()
+            except Exception:
+                logger.exception("Falha na descarga em segundo plano %r", callback)
+
+    def _reset_after_fork(self):
+        # A thread não sobrevive ao fork; o filho começa sem prazos herdados
+        self._condition = threading.Condition()
+        self._heap = []
+        self._scheduled = {}
+        self._thread = None
+        self._pid = None
+
+
+_flusher = Flusher()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_flusher._reset_after_fork)
+
+
+def get_flusher():
+    return _flusher
+
+
+_shutdown_hooks = []
+
+
+def on_shutdown(callback):
+    """Registra uma descarga para o encerramento do processo."""
+    _shutdown_hooks.append(callback)
+    return callback
+
+
+def run_shutdown_hooks():
+    """Executa as descargas registradas (idempotentes; pode rodar mais de uma vez)."""
+    for callback in list(_shutdown_hooks):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Falha na descarga de encerramento %r", callback)
+
+
+atexit.register(run_shutdown_hooks)
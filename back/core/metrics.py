@@ -0,0 +1,535 @@
+"""
+Métricas de desempenho no formato de texto do Prometheus.
+
+Coleta, em memória e por processo:
+- HTTP (``MetricsMiddleware``): latência por rota, status, tamanho da resposta
+  e quantidade/tempo de consultas ao banco por requisição;
+- Channels (``InstrumentedConsumerMixin``): mensagens e tempo por tipo de evento;
+- Celery (sinais ``task_prerun``/``task_postrun``): tarefas e duração por estado;
+- contadores do agrupamento de eventos (``core.realtime``) e do logging.
+
+As consultas são medidas por um ``execute_wrapper`` instalado em cada conexão,
+que só faz algo quando há uma medição ativa no contexto (``contextvars``). O
+contexto acompanha ``sync_to_async`` e as threads de ``core.concurrency``, então
+consultas de views assíncronas também são contadas.
+
+Cada processo (workers web e Celery) publica periodicamente um snapshot no
+cache e se registra em um sorted set do Redis (``ZADD``, atômico, pontuado pelo
+horário da publicação). O endpoint ``/metrics`` expõe os snapshots de todos os
+processos ativos com o rótulo ``process``: o reinício de um worker aparece como
+o reset apenas das séries dele. Sem Redis (cache em memória) só o processo
+atual é exposto.
+"""
+import bisect
+import hmac
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseNotFound
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# nome -> (tipo, descrição, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requisições HTTP por rota, método e status.', None),
+    'http_request_duration_seconds': ('histogram', 'Latência das requisições HTTP.', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Tamanho do corpo das respostas HTTP.', SIZE_BUCKETS),
+    'http_request_db_queries': ('histogram', 'Consultas ao banco por requisição HTTP.', QUERY_COUNT_BUCKETS),
+    'http_request_db_duration_seconds': ('histogram', 'Tempo em consultas ao banco por requisição HTTP.', LATENCY_BUCKETS),
+    'channels_messages_total': ('counter', 'Mensagens tratadas pelos consumers do Channels.', None),
+    'channels_message_duration_seconds': ('histogram', 'Tempo de tratamento das mensagens dos consumers.', LATENCY_BUCKETS),
+    'channels_message_db_queries_total': ('counter', 'Consultas ao banco feitas pelos consumers.', None),
+    'channels_connections_active': ('gauge', 'Conexões WebSocket abertas.', None),
+    'celery_tasks_total': ('counter', 'Tarefas Celery executadas por estado.', None),
+    'celery_task_duration_seconds': ('histogram', 'Duração das tarefas Celery.', LATENCY_BUCKETS),
+    'celery_task_db_queries_total': ('counter', 'Consultas ao banco feitas pelas tarefas Celery.', None),
+    'realtime_coalescer_events_total': ('counter', 'Eventos recebidos pelo agrupador de tempo real.', None),
+    'realtime_coalescer_messages_total': ('counter', 'Mensagens enviadas ao channel layer pelo agrupador.', None),
+    'realtime_coalescer_frames_saved_total': ('counter', 'Frames economizados pelo agrupamento.', None),
+    'realtime_coalescer_send_errors_total': ('counter', 'Falhas de envio ao channel layer.', None),
+    'log_records_dropped_total': ('counter', 'Registros de log descartados com a fila cheia.', None),
+    'db_pool_connections': ('gauge', 'Conexões abertas nos pools de banco.', None),
+    'db_pool_available': ('gauge', 'Conexões livres nos pools de banco.', None),
+    'db_pool_requests_waiting': ('gauge', 'Pedidos aguardando uma conexão do pool.', None),
+}
+
+UNMATCHED_ROUTE = '<unmatched>'
+SNAPSHOT_KEY_PREFIX = 'metrics:process:'
+PROCESS_INDEX_KEY = 'metrics:processes'
+
+_query_stats = ContextVar('metrics_query_stats', default=None)
+# Consultas individuais, apenas enquanto uma requisição é perfilada (core.profiling)
+_query_timeline = ContextVar('metrics_query_timeline', default=None)
+
+
+class MetricsRegistry:
+    """Contadores, gauges e histogramas indexados por (nome, rótulos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._values[(name, labels)] = value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(buckets, value)] += 1
+            state[1] += value
+
+    def snapshot(self):
+        """Cópia serializável: lista de ``[nome, rótulos, valor]``."""
+        with self._lock:
+            return [
+                [name, [list(pair) for pair in labels], [list(value[0]), value[1]] if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+_registry = MetricsRegistry()
+_process = {'pid': None, 'publisher': None}
+_process_lock = threading.Lock()
+
+
+def get_registry():
+    return _registry
+
+
+def labels(**values):
+    return tuple(sorted((key, str(value)) for key, value in values.items()))
+
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def process_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _ensure_publisher():
+    """Inicia (uma vez por processo, inclusive após fork) a publicação do snapshot."""
+    if _process['pid'] == os.getpid():
+        return
+    with _process_lock:
+        if _process['pid'] == os.getpid():
+            return
+        if _process['pid'] is not None:
+            # Processo filho: os valores herdados pertencem ao processo pai
+            _registry.clear()
+        _process['pid'] = os.getpid()
+        interval = getattr(settings, 'METRICS_PUBLISH_SECONDS', 15)
+        if interval > 0:
+            publisher = threading.Thread(target=_publish_loop, args=(interval,), name='metrics-publisher', daemon=True)
+            _process['publisher'] = publisher
+            publisher.start()
+
+
+def _publish_loop(interval):
+    pid = os.getpid()
+    while _process['pid'] == pid:
+        time.sleep(interval)
+        try:
+            publish_snapshot(ttl=_snapshot_ttl())
+        except Exception:
+            logger.debug("Falha ao publicar o snapshot de métricas", exc_info=True)
+
+
+def collect_snapshot():
+    """Snapshot deste processo, incluindo contadores mantidos por outros módulos."""
+    from core.realtime import get_coalescer
+    from core.structured_logging import QueueListenerHandler
+
+    snapshot = _registry.snapshot()
+    for stat, value in get_coalescer().stats().items():
+        if stat != 'batches':
+            snapshot.append([f'realtime_coalescer_{stat}_total', [], value])
+
+    dropped = sum(
+        handler.dropped for handler in logging.getLogger().handlers
+        if isinstance(handler, QueueListenerHandler)
+    )
+    snapshot.append(['log_records_dropped_total', [], dropped])
+    snapshot.extend(_pool_snapshot())
+    return snapshot
+
+
+def _pool_snapshot():
+    """Ocupação dos pools de conexões (psycopg_pool) deste processo."""
+    samples = []
+    for conn in connections.all():
+        if conn.vendor != 'postgresql' or not conn.settings_dict['OPTIONS'].get('pool'):
+            continue
+        stats = conn.pool.get_stats()
+        alias = [['alias', conn.alias]]
+        samples.append(['db_pool_connections', alias, stats.get('pool_size', 0)])
+        samples.append(['db_pool_available', alias, stats.get('pool_available', 0)])
+        samples.append(['db_pool_requests_waiting', alias, stats.get('requests_waiting', 0)])
+    return samples
+
+
+_index_client = None
+_index_client_lock = threading.Lock()
+
+
+def _process_index():
+    """Cliente Redis do índice de processos; None quando o cache não é compartilhado."""
+    global _index_client
+    url = getattr(settings, 'CACHE_REDIS_URL', '')
+    if not url:
+        return None
+    if _index_client is None:
+        with _index_client_lock:
+            if _index_client is None:
+                import redis
+
+                _index_client = redis.Redis.from_url(url, socket_connect_timeout=2, socket_timeout=2)
+    return _index_client
+
+
+def _snapshot_ttl():
+    return getattr(settings, 'METRICS_PUBLISH_SECONDS', 15) * 3
+
+
+def publish_snapshot(ttl=45):
+    """Grava o snapshot deste processo no cache e o registra no índice de processos."""
+    ident = process_id()
+    cache.set(SNAPSHOT_KEY_PREFIX + ident, collect_snapshot(), ttl)
+    client = _process_index()
+    if client is None:
+        return
+    now = time.time()
+    key = cache.make_key(PROCESS_INDEX_KEY)
+    pipeline = client.pipeline()
+    pipeline.zadd(key, {ident: now})
+    pipeline.zremrangebyscore(key, '-inf', now - ttl)
+    pipeline.expire(key, ttl)
+    pipeline.execute()
+
+
+def gather_snapshots():
+    """Snapshots dos processos ativos (processo -> snapshot); o deste processo é o atual."""
+    ident = process_id()
+    snapshots = {}
+    client = _process_index()
+    if client is not None:
+        try:
+            members = client.zrangebyscore(cache.make_key(PROCESS_INDEX_KEY), time.time() - _snapshot_ttl(), '+inf')
+        except Exception:
+            logger.warning("Falha ao ler o índice de processos das métricas", exc_info=True)
+            members = []
+        keys = {SNAPSHOT_KEY_PREFIX + member.decode(): member.decode() for member in members}
+        keys.pop(SNAPSHOT_KEY_PREFIX + ident, None)
+        if keys:
+            snapshots = {keys[key]: snapshot for key, snapshot in cache.get_many(list(keys)).items()}
+    snapshots[ident] = collect_snapshot()
+    return snapshots
+
+
+def _format_labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshots):
+    """
+    Converte os snapshots (processo -> snapshot) no formato de texto do
+    Prometheus (0.0.4), com o rótulo ``process`` em cada série.
+    """
+    merged = {}
+    for process, snapshot in snapshots.items():
+        for name, pairs, value in snapshot:
+            if name not in METRICS:
+                continue
+            key = (name, tuple(sorted([tuple(pair) for pair in pairs] + [('process', process)])))
+            if isinstance(value, list):
+                current = merged.setdefault(key, [[0] * len(value[0]), 0.0])
+                current[0] = [a + b for a, b in zip(current[0], value[0])]
+                current[1] += value[1]
+            else:
+                merged[key] = merged.get(key, 0) + value
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((key[1], value) for key, value in merged.items() if key[0] == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for pairs, value in series:
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(pairs)} {_format_number(value)}')
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(list(buckets) + [float('inf')], counts):
+                cumulative += count
+                le = _format_number(bound) if bound != float('inf') else '+Inf'
+                lines.append(f'{name}_bucket{_format_labels(pairs, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(pairs)} {_format_number(total)}')
+            lines.append(f'{name}_count{_format_labels(pairs)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Consultas ao banco -------------------------------------------------------
+
+def _query_timer(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    timeline = _query_timeline.get()
+    if stats is None and timeline is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        if timeline is not None:
+            timeline.append({
+                'sql': sql,
+                'started': started,
+                'duration': elapsed,
+                'many': many,
+                'thread': threading.current_thread().name,
+            })
+
+
+def install_query_timer(conn):
+    if _query_timer not in conn.execute_wrappers:
+        conn.execute_wrappers.append(_query_timer)
+
+
+def _install_on_new_connection(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+connection_created.connect(_install_on_new_connection, dispatch_uid='core.metrics.query_timer')
+
+
+def start_query_measurement():
+    """Passa a contar as consultas do contexto atual; retorna ``(stats, token)``."""
+    install_query_timer(connection)
+    stats = [0, 0.0]
+    return stats, _query_stats.set(stats)
+
+
+def stop_query_measurement(token):
+    _query_stats.reset(token)
+
+
+def start_query_timeline():
+    """Passa a registrar cada consulta do contexto atual; retorna ``(timeline, token)``."""
+    install_query_timer(connection)
+    timeline = []
+    return timeline, _query_timeline.set(timeline)
+
+
+def stop_query_timeline(token):
+    _query_timeline.reset(token)
+
+
+# --- HTTP ---------------------------------------------------------------------
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.view_name
+
+
+def _response_size(response):
+    if getattr(response, 'streaming', False):
+        return None
+    length = response.get('Content-Length')
+    return int(length) if length else len(response.content)
+
+
+def record_request(request, response, duration, query_stats):
+    _ensure_publisher()
+    status = response.status_code if response is not None else 500
+    route = route_label(request)
+    _registry.inc('http_requests_total', labels(route=route, method=request.method, status=status))
+    route_labels = labels(route=route, method=request.method)
+    _registry.observe('http_request_duration_seconds', route_labels, duration)
+    _registry.observe('http_request_db_queries', route_labels, query_stats[0])
+    _registry.observe('http_request_db_duration_seconds', route_labels, query_stats[1])
+    size = _response_size(response) if response is not None else None
+    if size is not None:
+        _registry.observe('http_response_size_bytes', route_labels, size)
+
+
+class MetricsMiddleware:
+    """Mede latência, status, tamanho da resposta e consultas de cada requisição."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = metrics_enabled()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        started = time.perf_counter()
+        stats, token = start_query_measurement()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            stop_query_measurement(token)
+            record_request(request, response, time.perf_counter() - started, stats)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        stats, token = start_query_measurement()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            stop_query_measurement(token)
+            record_request(request, response, time.perf_counter() - started, stats)
+
+
+# --- Channels -----------------------------------------------------------------
+
+class InstrumentedConsumerMixin:
+    """Mede cada mensagem tratada pelo consumer (conexão, eventos de grupo, etc.)."""
+
+    async def dispatch(self, message):
+        if not metrics_enabled():
+            return await super().dispatch(message)
+        _ensure_publisher()
+        message_type = message.get('type', '')
+        consumer = type(self).__name__
+        if message_type == 'websocket.connect':
+            _registry.inc('channels_connections_active', labels(consumer=consumer))
+        elif message_type == 'websocket.disconnect':
+            _registry.inc('channels_connections_active', labels(consumer=consumer), -1)
+
+        started = time.perf_counter()
+        stats, token = start_query_measurement()
+        try:
+            return await super().dispatch(message)
+        finally:
+            stop_query_measurement(token)
+            message_labels = labels(consumer=consumer, type=message_type)
+            _registry.inc('channels_messages_total', message_labels)
+            _registry.observe('channels_message_duration_seconds', message_labels, time.perf_counter() - started)
+            if stats[0]:
+                _registry.inc('channels_message_db_queries_total', message_labels, stats[0])
+
+
+# --- Celery -------------------------------------------------------------------
+
+_running_tasks = {}
+
+
+@task_prerun.connect(dispatch_uid='core.metrics.task_prerun')
+def _task_started(task_id=None, task=None, **kwargs):
+    if not metrics_enabled():
+        return
+    _ensure_publisher()
+    stats, token = start_query_measurement()
+    _running_tasks[task_id] = (time.perf_counter(), stats, token)
+
+
+@task_postrun.connect(dispatch_uid='core.metrics.task_postrun')
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    running = _running_tasks.pop(task_id, None)
+    if running is None:
+        return
+    started, stats, token = running
+    try:
+        stop_query_measurement(token)
+    except ValueError:
+        # Sinal disparado em outro contexto (ex.: pool de threads do worker)
+        _query_stats.set(None)
+    task_name = getattr(task, 'name', 'unknown')
+    _registry.inc('celery_tasks_total', labels(task=task_name, state=state or 'UNKNOWN'))
+    _registry.observe('celery_task_duration_seconds', labels(task=task_name), time.perf_counter() - started)
+    if stats[0]:
+        _registry.inc('celery_task_db_queries_total', labels(task=task_name), stats[0])
+
+
+# --- Endpoint -----------------------------------------------------------------
+
+def _client_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    )
+
+
+def metrics_view(request):
+    """
+    Métricas de todos os processos no formato do Prometheus.
+
+    Endpoint interno: apenas IPs/redes de ``METRICS_ALLOWED_IPS`` ou quem envia
+    ``Authorization: Bearer <METRICS_TOKEN>``. Para os demais responde 404.
+    """
+    if not metrics_enabled() or not _client_allowed(request):
+        return HttpResponseNotFound()
+    return HttpResponse(
+        render_prometheus(gather_snapshots()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,239 @@
+"""
+Perfilamento sob demanda de uma requisição específica.
+
+Um administrador (``IsAdminRole``) ativa o perfil enviando o cabeçalho
+``X-Profile: 1`` ou o parâmetro ``?_profile=1``. A requisição é executada sob
+``cProfile``, com a linha do tempo das consultas SQL e um snapshot de alocações
+(``tracemalloc``); o resultado fica no cache por ``PROFILING_RESULT_TTL``
+segundos e o ID volta no cabeçalho ``X-Profile-ID`` da resposta.
+
+Sem o gatilho o middleware faz apenas duas consultas a ``request.META``. O
+gatilho de usuários que não são administradores é ignorado.
+"""
+import cProfile
+import io
+import linecache
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from django.utils import timezone
+
+from core.metrics import start_query_timeline, stop_query_timeline
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-ID'
+PROFILE_QUERY_PARAM = '_profile'
+RESULT_KEY = 'profiling:{profile_id}'
+INDEX_KEY = 'profiling:index'
+INDEX_SIZE = 50
+
+# cProfile (sys.monitoring no Python 3.12+) e tracemalloc são globais ao processo
+_profiler_lock = threading.Lock()
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def profiling_requested(request):
+    if request.META.get('HTTP_' + PROFILE_HEADER.upper().replace('-', '_')) == '1':
+        return True
+    query = request.META.get('QUERY_STRING', '')
+    # O teste de substring só evita o parse da query string na maioria das requisições
+    return PROFILE_QUERY_PARAM in query and QueryDict(query).get(PROFILE_QUERY_PARAM) == '1'
+
+
+def _profiling_user(request):
+    """Usuário admin que pediu o perfil (sessão ou JWT), ou None."""
+    from authentication.permissions import IsAdminRole
+    from authentication.websocket_auth import get_access_token_from_request, resolve_user_from_token
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        user = resolve_user_from_token(get_access_token_from_request(request))
+    if IsAdminRole().has_permission(SimpleNamespace(user=user), None):
+        return user
+    return None
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(getattr(settings, 'PROFILING_TRACEMALLOC_FRAMES', 1))
+        _tracemalloc_users += 1
+    tracemalloc.reset_peak()
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+def _stop_tracemalloc(before):
+    global _tracemalloc_users
+    after = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    _, peak = tracemalloc.get_traced_memory()
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+    limit = getattr(settings, 'PROFILING_TOP_ALLOCATIONS', 25)
+    allocations = []
+    for stat in after.compare_to(before, 'lineno')[:limit]:
+        frame = stat.traceback[0]
+        allocations.append({
+            'location': f'{frame.filename}:{frame.lineno}',
+            'line': linecache.getline(frame.filename, frame.lineno).strip(),
+            'size_diff_bytes': stat.size_diff,
+            'count_diff': stat.count_diff,
+        })
+    return allocations, peak
+
+
+class RequestProfile:
+    """Coleta perfil de CPU, consultas e alocações de uma requisição."""
+
+    def __init__(self, request, user):
+        self.request = request
+        self.user = user
+        self.profiler = None
+        self.started = None
+
+    def start(self):
+        self.timeline, self.timeline_token = start_query_timeline()
+        self.memory_before = _start_tracemalloc()
+        if _profiler_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started = time.perf_counter()
+
+    def finish(self):
+        """Encerra a coleta; deve rodar na thread/contexto que chamou ``start``."""
+        self.duration = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profiler_lock.release()
+        stop_query_timeline(self.timeline_token)
+        self.allocations, self.memory_peak = _stop_tracemalloc(self.memory_before)
+
+    def save(self, response):
+        """Grava o resultado no cache e informa o ID na resposta."""
+        profile_id = uuid.uuid4().hex
+        result = {
+            'id': profile_id,
+            'created_at': timezone.now().isoformat(),
+            'user': self.user.get_username(),
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'status': response.status_code if response is not None else 500,
+            'duration_ms': round(self.duration * 1000, 2),
+            'sql': [
+                {
+                    'sql': query['sql'],
+                    'start_ms': round((query['started'] - self.started) * 1000, 3),
+                    'duration_ms': round(query['duration'] * 1000, 3),
+                    'many': query['many'],
+                    'thread': query['thread'],
+                }
+                for query in self.timeline
+            ],
+            'sql_time_ms': round(sum(query['duration'] for query in self.timeline) * 1000, 3),
+            'allocations': self.allocations,
+            'memory_peak_bytes': self.memory_peak,
+            'profile': None,
+            'pstats': None,
+        }
+        if self.profiler is not None:
+            result['profile'] = self._stats_text()
+            self.profiler.create_stats()
+            result['pstats'] = marshal.dumps(self.profiler.stats)
+
+        store_profile(result)
+        if response is not None:
+            response[PROFILE_ID_HEADER] = profile_id
+        return result
+
+    def _stats_text(self):
+        output = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+            getattr(settings, 'PROFILING_TOP_FUNCTIONS', 40)
+        )
+        return output.getvalue()
+
+
+def store_profile(result):
+    ttl = getattr(settings, 'PROFILING_RESULT_TTL', 3600)
+    cache.set(RESULT_KEY.format(profile_id=result['id']), result, ttl)
+    summary = {key: result[key] for key in ('id', 'created_at', 'user', 'method', 'path', 'status', 'duration_ms')}
+    summary['sql_count'] = len(result['sql'])
+    index = [item for item in (cache.get(INDEX_KEY) or []) if cache.has_key(RESULT_KEY.format(profile_id=item['id']))]
+    cache.set(INDEX_KEY, [summary] + index[:INDEX_SIZE - 1], ttl)
+
+
+def get_profile(profile_id):
+    return cache.get(RESULT_KEY.format(profile_id=profile_id))
+
+
+def list_profiles():
+    return cache.get(INDEX_KEY) or []
+
+
+class ProfilingMiddleware:
+    """
+    Perfila a requisição quando um administrador a marca com ``X-Profile`` ou
+    ``?_profile=1``.
+
+    Em views assíncronas o cProfile mede a thread do event loop (o que inclui
+    outras corrotinas do mesmo worker); o SQL executado via ``sync_to_async``
+    aparece normalmente na linha do tempo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profiling_requested(request):
+            return self.get_response(request)
+        user = _profiling_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        profile = RequestProfile(request, user)
+        profile.start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            profile.finish()
+            profile.save(response)
+
+    async def __acall__(self, request):
+        if not profiling_requested(request):
+            return await self.get_response(request)
+        user = await sync_to_async(_profiling_user)(request)
+        if user is None:
+            return await self.get_response(request)
+
+        profile = RequestProfile(request, user)
+        profile.start()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            profile.finish()
+            await sync_to_async(profile.save)(response)
@@ -0,0 +1,184 @@
+"""
+Consulta pública de protocolos (denúncias e solicitações) com cache.
+
+O prefixo do protocolo define o model consultado:
+- CMP-YYYYNNNN: Complaint
+- DRV-YYYYNNNN: DriverRequest
+- VHC-YYYYNNNN: VehicleRequest
+
+A projeção pública (sem dados pessoais) é mantida em cache e invalidada pelos
+signals de post_save/post_delete de cada model. Protocolos inexistentes também
+são cacheados por poucos segundos para absorver consultas repetidas.
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PROTOCOL_PATTERN = re.compile(r'^(CMP|DRV|VHC)-?(\d{8})$')
+
+_CACHE_KEY_PREFIX = 'protocol_lookup'
+_NOT_FOUND = '__not_found__'
+
+
+def normalize_protocol(raw_protocol):
+    """
+    Normaliza o protocolo informado para o formato armazenado (ex: CMP-20260001).
+    Aceita letras minúsculas, espaços e a ausência do hífen. Retorna None se inválido.
+    """
+    value = (raw_protocol or '').upper().replace(' ', '').strip()
+    match = PROTOCOL_PATTERN.match(value)
+    if not match:
+        return None
+    return f'{match.group(1)}-{match.group(2)}'
+
+
+def get_protocol_prefix(protocol):
+    """Retorna o prefixo (CMP, DRV ou VHC) de um protocolo já normalizado."""
+    return protocol.split('-', 1)[0]
+
+
+def _cache_key(protocol):
+    return f'{_CACHE_KEY_PREFIX}:{protocol}'
+
+
+def _complaint_projection(protocol):
+    from complaints.models import Complaint
+
+    complaint = Complaint.objects.select_related('vehicle').filter(protocol=protocol).first()
+    if complaint is None:
+        return None
+
+    data = {
+        'protocol_type': 'complaint',
+        'protocol': complaint.protocol,
+        'status': complaint.status,
+        'status_display': complaint.get_status_display(),
+        'complaint_type': complaint.complaint_type,
+        'complaint_type_display': complaint.get_complaint_type_display(),
+        'vehicle_plate': complaint.vehicle_plate,
+        'occurrence_date': complaint.occurrence_date,
+        'occurrence_location': complaint.occurrence_location,
+        'created_at': complaint.created_at,
+        'updated_at': complaint.updated_at,
+    }
+
+    if complaint.vehicle:
+        data['vehicle'] = {
+            'brand': complaint.vehicle.brand,
+            'model': complaint.vehicle.model,
+            'year': complaint.vehicle.year,
+            'color': complaint.vehicle.color,
+        }
+
+    return data
+
+
+def _driver_request_projection(protocol):
+    from requests.models import DriverRequest
+
+    driver_request = DriverRequest.objects.filter(protocol=protocol).only(
+        'protocol', 'status', 'created_at', 'reviewed_at', 'rejection_reason'
+    ).first()
+    if driver_request is None:
+        return None
+
+    return {
+        'protocol_type': 'driver_request',
+        'protocol': driver_request.protocol,
+        'status': driver_request.status,
+        'status_display': driver_request.get_status_display(),
+        'created_at': driver_request.created_at,
+        'reviewed_at': driver_request.reviewed_at,
+        'rejection_reason': driver_request.rejection_reason if driver_request.status == 'reprovado' else None,
+    }
+
+
+def _vehicle_request_projection(protocol):
+    from requests.models import VehicleRequest
+
+    vehicle_request = VehicleRequest.objects.filter(protocol=protocol).only(
+        'protocol', 'status', 'plate', 'brand', 'model', 'created_at', 'reviewed_at', 'rejection_reason'
+    ).first()
+    if vehicle_request is None:
+        return None
+
+    return {
+        'protocol_type': 'vehicle_request',
+        'protocol': vehicle_request.protocol,
+        'status': vehicle_request.status,
+        'status_display': vehicle_request.get_status_display(),
+        'plate': vehicle_request.plate,
+        'brand': vehicle_request.brand,
+        'model': vehicle_request.model,
+        'created_at': vehicle_request.created_at,
+        'reviewed_at': vehicle_request.reviewed_at,
+        'rejection_reason': vehicle_request.rejection_reason if vehicle_request.status == 'reprovado' else None,
+    }
+
+
+_PROJECTIONS = {
+    'CMP': _complaint_projection,
+    'DRV': _driver_request_projection,
+    'VHC': _vehicle_request_projection,
+}
+
+
+def get_public_projection(protocol):
+    """
+    Retorna a projeção pública do protocolo (já normalizado) ou None se não existir.
+    Consulta o cache antes do banco; o resultado negativo também é cacheado.
+    """
+    key = _cache_key(protocol)
+    cached = cache.get(key)
+    if cached == _NOT_FOUND:
+        return None
+    if cached is not None:
+        return cached
+
+    data = _PROJECTIONS[get_protocol_prefix(protocol)](protocol)
+
+    if data is None:
+        cache.set(key, _NOT_FOUND, getattr(settings, 'PROTOCOL_LOOKUP_NOT_FOUND_CACHE_TIMEOUT', 15))
+    else:
+        cache.set(key, data, getattr(settings, 'PROTOCOL_LOOKUP_CACHE_TIMEOUT', 300))
+
+    return data
+
+
+async def aget_public_projection(protocol):
+    """
+    Versão assíncrona de ``get_public_projection``: o cache é lido sem ocupar o
+    executor das views síncronas e só a montagem da projeção (cache miss) passa
+    por ``sync_to_async``.
+    """
+    key = _cache_key(protocol)
+    cached = await cache.aget(key)
+    if cached == _NOT_FOUND:
+        return None
+    if cached is not None:
+        return cached
+
+    data = await sync_to_async(_PROJECTIONS[get_protocol_prefix(protocol)])(protocol)
+
+    if data is None:
+        await cache.aset(key, _NOT_FOUND, getattr(settings, 'PROTOCOL_LOOKUP_NOT_FOUND_CACHE_TIMEOUT', 15))
+    else:
+        await cache.aset(key, data, getattr(settings, 'PROTOCOL_LOOKUP_CACHE_TIMEOUT', 300))
+
+    return data
+
+
+def invalidate_protocol(protocol):
+    """
+    Remove o protocolo do cache imediatamente e novamente após o commit da transação,
+    evitando que uma leitura concorrente recoloque no cache o estado anterior.
+    """
+    if not protocol:
+        return
+
+    key = _cache_key(protocol)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
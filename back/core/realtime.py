@@ -0,0 +1,272 @@
+"""
+Envio de eventos em tempo real para os grupos do channel layer.
+
+Todo envio para WebSocket passa por ``group_send``, que isola falhas do channel
+layer (Redis indisponível, por exemplo) do fluxo de escrita que gerou o evento
+e registra o evento com um ID monotônico para replay na reconexão. A mensagem
+leva o ``traceparent`` do span atual (ver ``core.tracing``).
+
+Rajadas de eventos para um mesmo grupo (ex.: envio em massa de solicitações)
+são agrupadas durante ``WEBSOCKET_COALESCE_WINDOW_MS`` e entregues em uma única
+mensagem ``event.batch``. Os envios adiados são feitos pela thread de
+``core.flusher``, uma por processo.
+"""
+import asyncio
+import logging
+import threading
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.event_log import get_event_log
+from core.flusher import get_flusher, on_shutdown
+from core.tracing import current_traceparent, inject_message, start_span
+from core.transactions import on_commit_once
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_CACHE_KEY = 'realtime:counters'
+
+# Resultado de ``group_send``
+SENT = 'sent'
+QUEUED = 'queued'
+
+# Tópicos assináveis pelo WebSocket e os papéis que podem recebê-los.
+# Solicitações e denúncias só interessam a quem pode agir sobre elas.
+TOPIC_ROLES = {
+    'requests.driver': ('admin', 'approver'),
+    'requests.vehicle': ('admin', 'approver'),
+    'complaints': ('admin', 'approver'),
+    'dashboard': ('admin', 'approver', 'viewer'),
+    'notifications': ('admin', 'approver', 'viewer'),
+}
+
+
+def topic_group(topic):
+    """Grupo do channel layer que recebe os eventos de um tópico."""
+    return f'topic_{topic}'
+
+
+def user_group(user_id):
+    """Grupo exclusivo de um usuário (todas as abas/conexões dele)."""
+    return f'user_{user_id}'
+
+
+def get_user_role(user):
+    """Papel do usuário para fins de assinatura (superuser equivale a admin)."""
+    if user.is_superuser:
+        return 'admin'
+    try:
+        return user.profile.role
+    except Exception:
+        return None
+
+
+def allowed_topics(user):
+    """Tópicos que o papel do usuário permite assinar."""
+    role = get_user_role(user)
+    return [topic for topic, roles in TOPIC_ROLES.items() if role in roles]
+
+
+def _run_in_new_loop(coroutine_function):
+    return lambda *args: asyncio.run(coroutine_function(*args))
+
+
+def _send_now(group, message, run=async_to_sync):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return False
+
+    try:
+        run(channel_layer.group_send)(group, message)
+        return True
+    except Exception as e:
+        logger.error("Erro ao enviar evento '%s' para o grupo %s: %s", message.get('type'), group, e)
+        return False
+
+
+class EventCoalescer:
+    """
+    Agrupa os eventos de cada grupo durante a janela configurada.
+
+    O primeiro evento de um grupo agenda o envio; os seguintes entram no mesmo
+    lote. Um lote com um único evento é enviado como o próprio evento. Eventos
+    de estado (``counters.update``) são substituídos pelo mais recente do lote.
+    """
+
+    STATE_EVENT_TYPES = {'counters.update'}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._stats = Counter()
+
+    def add(self, group, message, window_seconds):
+        max_events = getattr(settings, 'WEBSOCKET_COALESCE_MAX_EVENTS', 100)
+        with self._lock:
+            buffer = self._buffers.setdefault(group, [])
+            buffer.append(message)
+            self._stats['events'] += 1
+            flush_now = len(buffer) >= max_events
+            if not flush_now and len(buffer) == 1:
+                get_flusher().schedule(('realtime', group), window_seconds, lambda: self.flush(group))
+
+        if flush_now:
+            self.flush(group)
+
+    def _collapse(self, messages):
+        latest_state = {}
+        for index, message in enumerate(messages):
+            if message.get('type') in self.STATE_EVENT_TYPES:
+                latest_state[message['type']] = index
+        return [
+            message for index, message in enumerate(messages)
+            if message.get('type') not in self.STATE_EVENT_TYPES or latest_state[message['type']] == index
+        ]
+
+    def flush(self, group, run=async_to_sync):
+        with self._lock:
+            messages = self._buffers.pop(group, [])
+            get_flusher().cancel(('realtime', group))
+        if not messages:
+            return
+
+        events = self._collapse(messages)
+        if len(events) == 1:
+            payload = events[0]
+        else:
+            payload = {'type': 'event.batch', 'events': events, 'count': len(events)}
+
+        sent = _send_now(group, payload, run)
+        with self._lock:
+            self._stats['messages'] += 1
+            self._stats['frames_saved'] += len(messages) - 1
+            if len(events) > 1:
+                self._stats['batches'] += 1
+            if not sent:
+                self._stats['send_errors'] += 1
+
+        if len(messages) > 1:
+            logger.debug(
+                "Lote de %s evento(s) para o grupo %s enviado como 1 mensagem (%s economizada(s) no total)",
+                len(messages), group, self._stats['frames_saved']
+            )
+
+    def flush_all(self, run=async_to_sync):
+        with self._lock:
+            groups = list(self._buffers)
+        for group in groups:
+            self.flush(group, run)
+
+    def stats(self):
+        """Métricas acumuladas: eventos, mensagens enviadas, lotes e frames economizados."""
+        with self._lock:
+            return {
+                'events': self._stats['events'],
+                'messages': self._stats['messages'],
+                'batches': self._stats['batches'],
+                'frames_saved': self._stats['frames_saved'],
+                'send_errors': self._stats['send_errors'],
+            }
+
+
+_coalescer = EventCoalescer()
+
+
+@on_shutdown
+def _flush_on_shutdown():
+    # Envia lotes pendentes ao encerrar o processo. No atexit os executors usados
+    # pelo async_to_sync já foram encerrados; o envio roda em um loop próprio.
+    _coalescer.flush_all(run=_run_in_new_loop)
+
+
+def get_coalescer():
+    return _coalescer
+
+
+def group_send(group, message, traceparent=None):
+    """
+    Registra e envia uma mensagem para um grupo do channel layer.
+
+    A mensagem recebe ``event_id`` quando o registro de eventos está disponível.
+    Com a janela de agrupamento ativa, o envio é adiado e pode ser combinado com
+    outros eventos do mesmo grupo. ``traceparent`` define o span pai do envio
+    (padrão: o span atual).
+
+    Retorna ``SENT`` quando a mensagem foi entregue ao channel layer, ``QUEUED``
+    quando entrou no lote do grupo (a entrega acontece depois; falhas aparecem em
+    ``get_coalescer().stats()['send_errors']`` e no log) ou None quando não há
+    channel layer ou o envio imediato falhou.
+    """
+    if get_channel_layer() is None:
+        return None
+
+    attributes = {'group': group, 'type': message.get('type')}
+    with start_span('channels group_send', parent=traceparent, kind='producer', attributes=attributes):
+        return _publish(group, inject_message(message))
+
+
+def _publish(group, message):
+    try:
+        message = {**message, 'event_id': get_event_log().append(group, message)}
+    except Exception as e:
+        logger.warning("Evento '%s' enviado sem registro para replay: %s", message.get('type'), e)
+
+    window_ms = getattr(settings, 'WEBSOCKET_COALESCE_WINDOW_MS', 250)
+    if window_ms and window_ms > 0:
+        _coalescer.add(group, message, window_ms / 1000)
+        return QUEUED
+
+    return SENT if _send_now(group, message) else None
+
+
+def group_send_on_commit(group, message):
+    """
+    Agenda o envio para depois do commit da transação atual. O envio continua o
+    trace do span que o agendou (o commit pode acontecer fora dele).
+    """
+    traceparent = current_traceparent()
+    transaction.on_commit(lambda: group_send(group, message, traceparent))
+
+
+def _compute_pending_counters():
+    from complaints.models import Complaint
+    from requests.models import DriverRequest, VehicleRequest
+
+    return {
+        'pending_driver_requests': DriverRequest.objects.filter(status='em_analise').count(),
+        'pending_vehicle_requests': VehicleRequest.objects.filter(status='em_analise').count(),
+        'pending_complaints': Complaint.objects.filter(status__in=['proposto', 'em_analise']).count(),
+    }
+
+
+def get_pending_counters():
+    """
+    Contadores de pendências exibidos no painel (solicitações e denúncias).
+
+    Mantidos em cache por alguns segundos para que reconexões em massa não
+    disparem as mesmas contagens para cada socket.
+    """
+    counters = cache.get(COUNTERS_CACHE_KEY)
+    if counters is None:
+        counters = _compute_pending_counters()
+        cache.set(COUNTERS_CACHE_KEY, counters, getattr(settings, 'REALTIME_COUNTERS_CACHE_TIMEOUT', 30))
+    return counters
+
+
+def _send_counters_update():
+    counters = _compute_pending_counters()
+    cache.set(COUNTERS_CACHE_KEY, counters, getattr(settings, 'REALTIME_COUNTERS_CACHE_TIMEOUT', 30))
+    group_send(topic_group('dashboard'), {'type': 'counters.update', 'counters': counters})
+
+
+def broadcast_counters():
+    """
+    Recalcula e publica ``counters.update`` após o commit da transação atual,
+    uma única vez por transação: alterações em lote disparam um sinal por objeto.
+    """
+    on_commit_once(_send_counters_update)
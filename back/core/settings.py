@@ -2,6 +2,7 @@ from pathlib import Path
 from datetime import timedelta
 import os
 from dotenv import load_dotenv
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'complaints',
     'notifications.apps.NotificationsConfig',
     'dashboard',
+    'monitoring',
 
     'rest_framework',
     'rest_framework.authtoken',
@@ -50,6 +52,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.structured_logging.RequestContextMiddleware',
+    'core.tracing.TracingMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
+    'monitoring.nplusone.NPlusOneMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'core.middleware.EncodingMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -59,6 +66,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -92,6 +100,65 @@ DATABASES = {
     }
 }
 
+# Pool de conexões (psycopg 3 + psycopg_pool), um por processo: cada worker
+# ASGI do gunicorn, cada processo filho do Celery e o beat dimensionam o seu com
+# DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE. O total no PostgreSQL é
+# WEB_CONCURRENCY x DB_POOL_MAX_SIZE do backend, mais a concorrência do Celery x o
+# DB_POOL_MAX_SIZE dele, mais o do beat, e precisa caber no max_connections
+# (docker-compose: 4 x 5 + núcleos x 2 + 1). Cada réplica de DB_REPLICA_HOSTS
+# copia esta configuração e soma o mesmo total no servidor dela.
+# O pool de um worker atende as ASGI_THREADS e as QUERY_THREAD_POOL_SIZE threads
+# de consulta (core.concurrency), que devolvem a conexão ao fim de cada tarefa:
+# DB_POOL_MAX_SIZE limita as consultas simultâneas, e quem excede espera até
+# DB_POOL_TIMEOUT.
+# Sem psycopg_pool instalado, conexões persistentes com verificação de saúde.
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'True').lower() in ('true', '1', 'yes')
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))  # segundos até renovar a conexão
+DB_POOL_MAX_IDLE = int(os.getenv('DB_POOL_MAX_IDLE', '300'))  # ociosas acima do mínimo são fechadas
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))  # espera máxima por uma conexão livre
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+if DB_POOL_ENABLED and ConnectionPool is not None:
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'max_lifetime': DB_POOL_MAX_LIFETIME,
+            'max_idle': DB_POOL_MAX_IDLE,
+            'timeout': DB_POOL_TIMEOUT,
+        },
+    }
+    # O Django passa ConnectionPool.check_connection ao pool: verifica a conexão
+    # antes de entregá-la (descarta as derrubadas pelo servidor)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Réplicas de leitura (core.db_router): 'host[:porta]' separados por vírgula,
+# com as mesmas credenciais do primário. Nos testes espelham o 'default'.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+DATABASES.update({
+    f'replica_{index}': {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    for index, (host, _, port) in enumerate((entry.partition(':') for entry in DB_REPLICA_HOSTS), start=1)
+})
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Após uma escrita o cliente lê do primário por este tempo (atraso de replicação)
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+DB_REPLICA_STICKY_COOKIE = 'db_primary'
+
 LANGUAGE_CODE = 'pt-br'
 
 TIME_ZONE = 'America/Sao_Paulo'
@@ -146,7 +213,11 @@ REST_FRAMEWORK = {
         'public_write': '20/hour',
         'auth': '30/hour',
         'password_reset': '5/hour',
+        'protocol_lookup': '600/hour',
     },
+    # Identifica o cliente por REMOTE_ADDR (já resolvido pelo servidor ASGI a partir
+    # dos proxies confiáveis), nunca pelo X-Forwarded-For enviado pelo cliente
+    'NUM_PROXIES': 0,
     'UNICODE_JSON': True,
     'STRICT_JSON': True,
 }
@@ -176,11 +247,15 @@ CORS_ALLOWED_HEADERS = [
     'content-type',
     'dnt',
     'origin',
+    'traceparent',
     'user-agent',
     'x-csrftoken',
+    'x-profile',
     'x-requested-with',
 ]
 
+CORS_EXPOSE_HEADERS = ['traceresponse', 'x-profile-id', 'x-request-id']
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -253,12 +328,72 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 FILE_UPLOAD_PERMISSIONS = 0o644
 
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'syspasso',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    # Sem Redis configurado (dev local), mantém o cache em memória do processo
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'syspasso',
+        }
+    }
+
+PROTOCOL_LOOKUP_CACHE_TIMEOUT = 300  # 5 minutos; invalidado ao salvar o registro
+PROTOCOL_LOOKUP_NOT_FOUND_CACHE_TIMEOUT = 15  # cache curto para protocolos inexistentes
+SITE_CONFIGURATION_CACHE_TIMEOUT = 3600  # JSON pronto da configuração do site; invalidado ao salvar
+SITE_CONFIGURATION_MAX_AGE = 60  # Cache-Control público; depois o cliente revalida com o ETag
+NOTIFICATION_UNREAD_COUNT_CACHE_TIMEOUT = 60  # curto: limita o erro de um incr perdido durante o recálculo
+NOTIFICATION_SYNC_DEFAULT_LIMIT = 50
+NOTIFICATION_SYNC_MAX_LIMIT = 100
+NOTIFICATION_SYNC_OVERLAP_SECONDS = 5  # janela relida a cada sincronização: linhas commitadas depois do cursor
+REALTIME_COUNTERS_CACHE_TIMEOUT = 30  # contadores enviados na conexão do WebSocket
+REALTIME_EVENT_LOG_MAXLEN = 1000  # eventos mantidos por grupo para replay na reconexão
+REALTIME_REPLAY_MAX_EVENTS = 500
+REALTIME_EVENT_LOG_REDIS_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+WEBSOCKET_COALESCE_WINDOW_MS = int(os.getenv('WEBSOCKET_COALESCE_WINDOW_MS', '250'))  # 0 desativa o agrupamento
+WEBSOCKET_COALESCE_MAX_EVENTS = 100  # envia o lote antes da janela ao atingir este tamanho
+WEBSOCKET_AUTH_USER_CACHE_TIMEOUT = 60  # usuário/perfil resolvidos na conexão do WebSocket
+SSE_HEARTBEAT_SECONDS = 15  # comentário enviado no stream SSE ocioso
+SSE_RETRY_MS = 3000  # intervalo de reconexão sugerido ao EventSource
+# Threads para consultas independentes em paralelo (ex.: bootstrap do dashboard).
+# Cada tarefa pega uma conexão do pool do processo e a devolve ao terminar.
+QUERY_THREAD_POOL_SIZE = int(os.getenv('QUERY_THREAD_POOL_SIZE', '4'))
+DASHBOARD_CACHE_FRESH_SECONDS = int(os.getenv('DASHBOARD_CACHE_FRESH_SECONDS', '30'))  # depois disso, recalcula em segundo plano
+DASHBOARD_CACHE_STALE_SECONDS = 300  # tempo extra em que o valor vencido ainda é servido
+DASHBOARD_CACHE_LOCK_TIMEOUT = 30  # limite de um recálculo (lock contra recálculos simultâneos)
+DASHBOARD_ACTIVITY_DEFAULT_LIMIT = 20
+DASHBOARD_ACTIVITY_MAX_LIMIT = 100
+ACTIVITY_PARTITION_MONTHS_AHEAD = 3  # partições mensais criadas à frente do mês atual
+
+# Log de auditoria gravado em lote fora da requisição
+AUDIT_LOG_WRITER = os.getenv('AUDIT_LOG_WRITER', 'database')  # 'database' (thread do processo) ou 'celery'
+AUDIT_LOG_BATCH_SIZE = 100  # grava o lote ao atingir este tamanho
+AUDIT_LOG_FLUSH_INTERVAL_MS = 1000  # ou após este intervalo desde a primeira entrada pendente
+
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_WORKER_HIJACK_ROOT_LOGGER = False  # mantém o handler 'queue' do root no worker
+CELERY_BEAT_SCHEDULE = {
+    # Diário e idempotente: a partição do mês seguinte existe muito antes de ser usada
+    'create-activity-partitions': {
+        'task': 'dashboard.tasks.create_activity_partitions',
+        'schedule': crontab(hour=3, minute=0),
+    },
+}
 
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -305,24 +440,73 @@ ACCOUNT_EMAIL_VERIFICATION = 'mandatory'
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_USERNAME_REQUIRED = True
 
+# Métricas (core.metrics): /metrics só responde aos IPs/redes abaixo ou ao token
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()
+]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_PUBLISH_SECONDS = int(os.getenv('METRICS_PUBLISH_SECONDS', '15'))  # snapshot de cada processo no cache
+
+# Perfil sob demanda (core.profiling): resultados ficam no cache por este tempo
+PROFILING_RESULT_TTL = int(os.getenv('PROFILING_RESULT_TTL', '3600'))
+PROFILING_TOP_FUNCTIONS = 40  # linhas do resumo do cProfile
+PROFILING_TOP_ALLOCATIONS = 25
+
+# Consultas SQL por fingerprint (monitoring.slow_queries) e EXPLAIN das lentas
+SLOW_QUERY_CAPTURE_ENABLED = os.getenv('SLOW_QUERY_CAPTURE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_FLUSH_SECONDS = 30  # agregados em memória -> tabela query_fingerprints
+SLOW_QUERY_EXPLAIN_INTERVAL = 600  # no máximo um EXPLAIN por consulta nesse intervalo (0 desativa)
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = 5000
+SLOW_QUERY_EXPLAINS_PER_QUERY = 5
+TEST_RUNNER = 'monitoring.testing.MonitoringTestRunner'  # testes sem a captura global
+
+# Detector de N+1 (monitoring.nplusone): 'off', 'log' ou 'raise' (testes)
+N_PLUS_ONE_DETECTION = os.getenv('N_PLUS_ONE_DETECTION', 'log' if DEBUG else 'off')
+N_PLUS_ONE_THRESHOLD = 3  # mesma consulta repetida esta quantidade de vezes na requisição
+
+# Rastreamento distribuído (core.tracing): 'file' (logs/traces.jsonl), 'memory' ou 'off'
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'file')
+TRACING_FILE = BASE_DIR / 'logs' / 'traces.jsonl'
+TRACING_MEMORY_MAX_SPANS = 10000  # spans mantidos pelo exportador 'memory'
+
+# Formato das linhas de log: 'json' (estruturado) ou 'text'
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # registros além disso são descartados
+
+# Os loggers escrevem apenas na fila ('queue', no root); console e arquivo são
+# alimentados pela thread do QueueListener (ver core.structured_logging)
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
         'verbose': {
-            'format': '[{levelname}] {asctime} {name} {process:d} {thread:d} {message}',
+            'format': '[{levelname}] {asctime} {name} {process:d} {thread:d} {request_id} {message}',
             'style': '{',
         },
         'simple': {
             'format': '[{levelname}] {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.structured_logging.JSONFormatter',
+        },
+        'span': {
+            'format': '{message}',
+            'style': '{',
+        },
+    },
+    'filters': {
+        'request_context': {
+            '()': 'core.structured_logging.RequestContextFilter',
+        },
     },
     'handlers': {
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'simple',
         },
         'file': {
             'level': 'ERROR',
@@ -330,29 +514,55 @@ LOGGING = {
             'filename': BASE_DIR / 'logs' / 'django.log',
             'maxBytes': 1024*1024*15,  # 15MB por arquivo
             'backupCount': 10,
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
+        },
+        # Configurado depois de 'console' e 'file' (ordem alfabética), que ele referencia
+        'queue': {
+            '()': 'core.structured_logging.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'queue_size': LOG_QUEUE_SIZE,
+            'filters': ['request_context'],
+        },
+        'trace_file': {
+            'level': 'INFO',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': TRACING_FILE,
+            'maxBytes': 1024*1024*50,  # 50MB por arquivo
+            'backupCount': 5,
+            'formatter': 'span',
         },
+        # Fila própria dos spans (core.tracing.FileSpanExporter), depois de 'trace_file'
+        'traces': {
+            '()': 'core.structured_logging.QueueListenerHandler',
+            'handlers': ['cfg://handlers.trace_file'],
+            'queue_size': LOG_QUEUE_SIZE,
+        },
+    },
+    # Todos os loggers chegam à fila pelo root; os abaixo só ajustam o nível
+    'root': {
+        'handlers': ['queue'],
+        'level': 'INFO',
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
             'level': 'INFO',
-            'propagate': True,
         },
         'conductors': {
-            'handlers': ['console', 'file'],
             'level': 'DEBUG',
-            'propagate': True,
         },
         'requests': {
-            'handlers': ['console', 'file'],
             'level': 'DEBUG',
-            'propagate': True,
         },
         'core.middleware': {
-            'handlers': ['console', 'file'],
             'level': 'DEBUG',
-            'propagate': True,
+        },
+        'core.request': {
+            'level': 'INFO',
+        },
+        'core.tracing.spans': {
+            'handlers': ['traces'],
+            'level': 'INFO',
+            'propagate': False,
         },
     },
 }
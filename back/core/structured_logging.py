@@ -0,0 +1,248 @@
+"""
+Pipeline de logging sem I/O nas threads de requisição.
+
+Os loggers propagam ao root, que usa apenas o ``QueueListenerHandler``: a
+chamada ao logger formata a mensagem, anexa o contexto da requisição
+(``request_id``, usuário, view) e coloca o registro em uma fila em memória. Uma thread
+``QueueListener`` por processo retira os registros e os entrega aos handlers
+reais (console, arquivo rotativo), de modo que escrita e rotação de arquivos
+não bloqueiam o worker.
+
+``RequestContextMiddleware`` define o contexto da requisição e registra uma
+linha de acesso (``core.request``) com método, caminho, status e duração.
+"""
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject, empty
+
+request_context = ContextVar('request_context', default=None)
+
+access_logger = logging.getLogger('core.request')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Atributos padrão de LogRecord; os demais (``extra=``) vão para o JSON. O
+# ``request`` que o Django anexa em django.request/django.server não é serializável
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request'}
+
+
+def _current_username(request):
+    """Usuário da requisição, sem forçar autenticação (nem consultas) no log."""
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        if user._wrapped is empty:
+            return None
+        user = user._wrapped
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None
+    return user.get_username()
+
+
+class RequestContextFilter(logging.Filter):
+    """Anexa ``request_id``, ``trace_id``, ``user`` e ``view`` da requisição atual ao registro."""
+
+    def filter(self, record):
+        context = request_context.get()
+        if context is None:
+            # django.request registra a resposta fora do middleware, mas anexa a requisição
+            request = record.__dict__.get('request')
+            record.request_id = record.__dict__.get('request_id', getattr(request, 'request_id', None))
+            record.user = record.__dict__.get('user')
+            record.view = record.__dict__.get('view')
+            record.trace_id = record.__dict__.get('trace_id')
+            return True
+
+        record.request_id = context['request_id']
+        record.trace_id = context.get('trace_id')
+        record.view = context.get('view')
+        record.user = _current_username(context['request'])
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Uma linha JSON por registro, incluindo os campos passados em ``extra``."""
+
+    def format(self, record):
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_') and value is not None:
+                payload[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        if record.stack_info:
+            payload['stack'] = self.formatStack(record.stack_info)
+
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    ``QueueHandler`` que inicia o próprio ``QueueListener``.
+
+    ``handlers`` recebe os handlers de destino já configurados
+    (``'cfg://handlers.<nome>'`` no ``LOGGING``). É criado via ``'()'``: com
+    ``'class'`` o ``dictConfig`` do Python 3.12+ trata subclasses de
+    ``QueueHandler`` de forma especial e não repassaria ``handlers``. A fila é limitada a
+    ``queue_size`` registros: se o listener não acompanhar, os excedentes são
+    descartados (e contados) em vez de bloquear a requisição. Após um ``fork``
+    (workers do Celery/gunicorn) o listener é recriado no processo filho.
+    """
+
+    def __init__(self, handlers, queue_size=10000, respect_handler_level=True):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        # Indexar o ConvertingList do dictConfig resolve 'cfg://' no handler configurado
+        self.target_handlers = [handlers[i] for i in range(len(handlers))]
+        self.respect_handler_level = respect_handler_level
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Processo filho: a thread do listener não sobrevive ao fork
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._listener = QueueListener(
+                self.queue, *self.target_handlers,
+                respect_handler_level=self.respect_handler_level
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        """
+        Resolve a mensagem na thread chamadora, preservando o traceback em
+        ``exc_text`` para que cada formatter de destino o apresente à sua maneira.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Aguarda a gravação dos registros já enfileirados."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+            self._start()
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+        super().close()
+
+
+class RequestContextMiddleware:
+    """
+    Define o contexto de logging da requisição e registra a linha de acesso.
+
+    O ``request_id`` vem do cabeçalho ``X-Request-ID`` (quando válido) ou é
+    gerado, e é devolvido no mesmo cabeçalho da resposta.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = self._begin(request)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, started)
+            request_context.reset(token)
+
+    async def __acall__(self, request):
+        token, started = self._begin(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._finish(request, response, started)
+            request_context.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        context = request_context.get()
+        if context is not None:
+            match = request.resolver_match
+            context['view'] = (
+                match.view_name if match and match.view_name
+                else getattr(view_func, '__qualname__', repr(view_func))
+            )
+        return None
+
+    def _begin(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = request_context.set({'request_id': request_id, 'request': request, 'view': None})
+        return token, time.perf_counter()
+
+    def _finish(self, request, response, started):
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        status = response.status_code if response is not None else 500
+        if response is not None:
+            response[REQUEST_ID_HEADER] = request.request_id
+
+        level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 else logging.INFO
+        access_logger.log(
+            level, "%s %s %s %.2fms", request.method, request.path, status, duration_ms,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': status,
+                'duration_ms': duration_ms,
+            }
+        )
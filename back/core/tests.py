@@ -0,0 +1,496 @@
+"""
+Testes dos módulos de infraestrutura do core.
+"""
+import json
+import logging
+import marshal
+import sys
+import tracemalloc
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.celery import reset_database_pools
+from core.db_router import ReplicaRoutingMiddleware, replica_reads
+from core.metrics import get_registry, labels as metric_labels, render_prometheus
+from core.structured_logging import JSONFormatter, QueueListenerHandler
+from core.tracing import get_exporter, start_span
+from core.transactions import on_commit_once
+from requests.consumers import RequestNotificationConsumer
+from requests.models import DriverRequest
+
+
+def make_user(username='coreuser', password='CorePass123!', email='core@example.com', role='viewer'):
+    user = User.objects.create_user(username=username, password=password, email=email)
+    profile = user.profile
+    profile.role = role
+    profile.save()
+    return user
+
+def make_approver(username='approver', password='ApproverPass123!', email='approver@example.com'):
+    return make_user(username=username, password=password, email=email, role='approver')
+
+VALID_DRIVER_REQUEST_DATA = {
+    'name': 'Ana Paula',
+    'cpf': '52998224725',
+    'email': 'ana@example.com',
+    'phone': '(11) 98765-4321',
+    'license_number': '12345678901',
+    'license_category': 'B',
+    'birth_date': '1988-03-15',
+    'license_expiry_date': '2028-03-15',
+    'gender': 'F',
+    'nationality': 'Brasileira',
+    'street': 'Rua das Palmeiras',
+    'number': '55',
+    'neighborhood': 'Jardins',
+    'city': 'São Paulo',
+}
+
+def make_driver_request(**kwargs):
+    data = dict(VALID_DRIVER_REQUEST_DATA, **kwargs)
+    return DriverRequest.objects.create(**data)
+
+
+class OnCommitOnceTests(TestCase):
+    """Callback de commit agendado por N sinais e executado uma vez."""
+
+    def test_varias_chamadas_na_transacao_executam_uma_vez(self):
+        func = mock.Mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                on_commit_once(func)
+        func.assert_called_once_with()
+
+    def test_nova_transacao_agenda_novamente(self):
+        func = mock.Mock()
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                on_commit_once(func)
+                on_commit_once(func)
+        self.assertEqual(func.call_count, 2)
+
+    def test_lote_de_transacao_desfeita_roda_no_proximo_commit(self):
+        func = mock.Mock()
+        with self.captureOnCommitCallbacks(execute=False):
+            on_commit_once(func)
+        func.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_once(func)
+        func.assert_called_once_with()
+
+
+class RequestLoggingTests(TestCase):
+    """Logging enfileirado: contexto da requisição e nenhuma escrita na thread da view."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.approver = make_approver()
+        self.req = make_driver_request()
+        # Os loggers da aplicação propagam ao handler da fila no root
+        self.handler = next(
+            handler for handler in logging.getLogger().handlers if isinstance(handler, QueueListenerHandler)
+        )
+        self.records = []
+
+    def _post_approve(self, **kwargs):
+        self.client.force_authenticate(user=self.approver)
+        with mock.patch.object(self.handler, 'enqueue', side_effect=self.records.append):
+            return self.client.post(f'/api/requests/drivers/{self.req.pk}/approve/', **kwargs)
+
+    def test_logs_da_view_carregam_request_id_usuario_e_view(self):
+        response = self._post_approve(HTTP_X_REQUEST_ID='req-123')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Request-ID'], 'req-123')
+
+        approved = [r for r in self.records if r.name == 'requests.views' and 'aprovada' in r.msg]
+        self.assertEqual(len(approved), 1)
+        self.assertEqual(approved[0].request_id, 'req-123')
+        self.assertEqual(approved[0].user, self.approver.username)
+        self.assertIn('approve', approved[0].view)
+        self.assertIsNone(approved[0].args)
+
+    def test_linha_de_acesso_registra_status_e_duracao(self):
+        self._post_approve()
+        access = [r for r in self.records if r.name == 'core.request']
+        self.assertEqual(len(access), 1)
+        self.assertEqual(access[0].status, 200)
+        self.assertGreaterEqual(access[0].duration_ms, 0)
+        self.assertEqual(access[0].user, self.approver.username)
+        self.assertRegex(access[0].request_id, r'^[0-9a-f]{32}$')
+
+    def test_request_id_invalido_e_substituido(self):
+        response = self._post_approve(HTTP_X_REQUEST_ID='inválido com espaços')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_formatter_json_inclui_extras_e_excecao(self):
+        try:
+            raise ValueError('falhou')
+        except ValueError:
+            record = logging.getLogger('requests').makeRecord(
+                'requests', logging.ERROR, __file__, 1, 'erro %s', ('x',), exc_info=sys.exc_info(),
+                extra={'request_id': 'abc', 'duration_ms': 1.5}
+            )
+        line = json.loads(JSONFormatter().format(record))
+        self.assertEqual(line['message'], 'erro x')
+        self.assertEqual(line['request_id'], 'abc')
+        self.assertEqual(line['duration_ms'], 1.5)
+        self.assertIn('ValueError: falhou', line['exception'])
+
+    def test_fila_cheia_descarta_sem_bloquear(self):
+        target = logging.Handler()
+        handler = QueueListenerHandler([target], queue_size=1)
+        handler.close()  # sem o listener, nada consome a fila
+        record = logging.makeLogRecord({'msg': 'x'})
+        handler.enqueue(record)
+        handler.enqueue(record)
+        self.assertEqual(handler.dropped, 1)
+
+
+class MetricsTests(TestCase):
+    """Instrumentação de requisições, consumers e tarefas e o endpoint /metrics."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.approver = make_approver()
+        get_registry().clear()
+
+    def _values(self):
+        return {(name, tuple(map(tuple, pairs))): value for name, pairs, value in get_registry().snapshot()}
+
+    def test_requisicao_registra_rota_status_e_consultas(self):
+        req = make_driver_request()
+        self.client.force_authenticate(user=self.approver)
+        self.client.post(f'/api/requests/drivers/{req.pk}/approve/')
+
+        values = self._values()
+        route = 'driver-request-approve'
+        self.assertEqual(values[('http_requests_total', metric_labels(route=route, method='POST', status=200))], 1)
+        queries = values[('http_request_db_queries', metric_labels(route=route, method='POST'))]
+        self.assertGreater(queries[1], 0)
+        self.assertEqual(sum(values[('http_request_duration_seconds', metric_labels(route=route, method='POST'))][0]), 1)
+        self.assertIn(('http_response_size_bytes', metric_labels(route=route, method='POST')), values)
+
+    def test_tarefa_celery_registra_estado_e_duracao(self):
+        from celery.signals import task_postrun, task_prerun
+
+        task = mock.Mock()
+        task.name = 'authentication.tasks.exemplo'
+        task_prerun.send(sender=task, task_id='t1', task=task)
+        User.objects.count()
+        task_postrun.send(sender=task, task_id='t1', task=task, state='SUCCESS')
+
+        values = self._values()
+        self.assertEqual(values[('celery_tasks_total', metric_labels(task=task.name, state='SUCCESS'))], 1)
+        self.assertEqual(values[('celery_task_db_queries_total', metric_labels(task=task.name))], 1)
+
+    def test_formato_prometheus_separa_processos(self):
+        snapshot = [
+            ['http_requests_total', [['route', 'x']], 2],
+            ['http_request_duration_seconds', [['route', 'x']], [[1] + [0] * 11, 0.001]],
+        ]
+        text = render_prometheus({'web:1': snapshot, 'web:2': snapshot})
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn('http_requests_total{process="web:1",route="x"} 2', text)
+        self.assertIn('http_requests_total{process="web:2",route="x"} 2', text)
+        self.assertIn('http_request_duration_seconds_bucket{process="web:1",route="x",le="0.005"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{process="web:1",route="x",le="+Inf"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{process="web:2",route="x"} 1', text)
+
+    def test_endpoint_restrito_a_rede_interna_ou_token(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('realtime_coalescer_events_total', response.content.decode())
+
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, status.HTTP_404_NOT_FOUND)
+        with override_settings(METRICS_TOKEN='segredo'):
+            response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ConsumerMetricsTests(TransactionTestCase):
+    """
+    Métricas dos consumers. TransactionTestCase: o consumer usa
+    ``database_sync_to_async``, que fecharia a conexão dentro da transação de um
+    TestCase.
+    """
+
+    def setUp(self):
+        self.approver = make_approver()
+        get_registry().clear()
+
+    def _values(self):
+        return {(name, tuple(map(tuple, pairs))): value for name, pairs, value in get_registry().snapshot()}
+
+    def test_consumer_registra_mensagens_e_conexoes(self):
+        async def scenario():
+            communicator = WebsocketCommunicator(RequestNotificationConsumer.as_asgi(), '/ws/requests/')
+            communicator.scope['user'] = self.approver
+            await communicator.connect()
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+        values = self._values()
+        consumer = 'RequestNotificationConsumer'
+        self.assertEqual(values[('channels_messages_total', metric_labels(consumer=consumer, type='websocket.connect'))], 1)
+        self.assertEqual(values[('channels_connections_active', metric_labels(consumer=consumer))], 0)
+        self.assertGreater(values[('channels_message_db_queries_total', metric_labels(consumer=consumer, type='websocket.connect'))], 0)
+
+
+class RequestProfilingTests(TestCase):
+    """Perfil sob demanda (core.profiling) de uma tela do painel."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = make_user(username='coreadmin', email='coreadmin@example.com', role='admin')
+        self.viewer = make_user(username='coreviewer', email='coreviewer@example.com')
+
+    def _get_stats(self, user, **kwargs):
+        self.client.cookies['access'] = str(AccessToken.for_user(user))
+        return self.client.get('/api/dashboard/stats/', **kwargs)
+
+    def test_admin_com_cabecalho_gera_perfil_para_download(self):
+        response = self._get_stats(self.admin, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response['X-Profile-ID']
+
+        detail = self.client.get(f'/api/profiling/{profile_id}/').json()
+        self.assertEqual(detail['path'], '/api/dashboard/stats/')
+        self.assertEqual(detail['user'], self.admin.username)
+        self.assertTrue(detail['sql'])
+        self.assertIn('function calls', detail['profile'])
+        self.assertIsInstance(detail['allocations'], list)
+        self.assertTrue(detail['has_pstats'])
+
+        download = self.client.get(f'/api/profiling/{profile_id}/download/')
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(marshal.loads(download.content), dict)
+
+        listing = self.client.get('/api/profiling/').json()
+        self.assertEqual(listing['results'][0]['id'], profile_id)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_parametro_de_query_tambem_ativa(self):
+        self.client.cookies['access'] = str(AccessToken.for_user(self.admin))
+        response = self.client.get('/api/dashboard/stats/?_profile=1')
+        self.assertIn('X-Profile-ID', response)
+
+    def test_parametro_de_query_exige_nome_e_valor_exatos(self):
+        self.client.cookies['access'] = str(AccessToken.for_user(self.admin))
+        for query in ('x_profile=1', '_profile=0', 'search=_profile=1'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/dashboard/stats/?{query}')
+                self.assertNotIn('X-Profile-ID', response)
+
+    def test_cabecalho_com_valor_diferente_de_1_nao_perfila(self):
+        response = self._get_stats(self.admin, HTTP_X_PROFILE='0')
+        self.assertNotIn('X-Profile-ID', response)
+
+    def test_gatilho_de_nao_admin_e_ignorado(self):
+        response = self._get_stats(self.viewer, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-ID', response)
+
+    def test_sem_gatilho_nao_perfila(self):
+        with mock.patch('core.profiling.RequestProfile') as profile:
+            response = self._get_stats(self.admin)
+        profile.assert_not_called()
+        self.assertNotIn('X-Profile-ID', response)
+
+    def test_resultado_restrito_a_administradores(self):
+        profile_id = self._get_stats(self.admin, HTTP_X_PROFILE='1')['X-Profile-ID']
+        self.client.cookies['access'] = str(AccessToken.for_user(self.viewer))
+        response = self.client.get(f'/api/profiling/{profile_id}/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    WEBSOCKET_COALESCE_WINDOW_MS=0,
+    TRACING_EXPORTER='memory',
+)
+class TracingTests(TransactionTestCase):
+    """
+    Propagação do trace context entre HTTP, sinais, channel layer e Celery.
+
+    TransactionTestCase: o consumer usa ``database_sync_to_async``, e os
+    callbacks de on_commit rodam no commit da própria requisição.
+    """
+
+    TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+    PARENT = f'00-{TRACE_ID}-00f067aa0ba902b7-01'
+
+    def setUp(self):
+        cache.clear()
+        self.exporter = get_exporter('memory')
+        self.exporter.clear()
+        self.approver = make_approver()
+
+    def _span(self, name):
+        return next(span for span in self.exporter.get_spans(self.TRACE_ID) if span['name'] == name)
+
+    def test_solicitacao_publica_propaga_trace_ate_o_consumer(self):
+        client = APIClient()
+
+        def submit():
+            return client.post('/api/requests/drivers/', VALID_DRIVER_REQUEST_DATA, HTTP_TRACEPARENT=self.PARENT)
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                RequestNotificationConsumer.as_asgi(), '/ws/requests/?topics=requests.driver'
+            )
+            communicator.scope['user'] = self.approver
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.receive_json_from()
+            response = await database_sync_to_async(submit)()
+            frame = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return response, frame
+
+        response, frame = async_to_sync(scenario)()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(frame['type'], 'new_request')
+
+        server = self._span('HTTP POST driver-request-list')
+        self.assertEqual(server['kind'], 'server')
+        self.assertEqual(server['parent_id'], '00f067aa0ba902b7')
+        self.assertEqual(server['attributes']['http.status_code'], 201)
+        self.assertTrue(response['traceresponse'].startswith(f'00-{self.TRACE_ID}-{server["span_id"]}'))
+
+        signal = self._span('requests.signals.notify_new_driver_request')
+        self.assertEqual(signal['parent_id'], server['span_id'])
+        publish = next(
+            span for span in self.exporter.get_spans(self.TRACE_ID)
+            if span['name'] == 'channels group_send' and span['parent_id'] == signal['span_id']
+        )
+        consumer = self._span('channels new_request')
+        self.assertEqual(consumer['kind'], 'consumer')
+        self.assertEqual(consumer['parent_id'], publish['span_id'])
+        self.assertEqual(consumer['attributes']['consumer'], 'RequestNotificationConsumer')
+
+    def test_traceparent_invalido_inicia_novo_trace(self):
+        response = APIClient().get('/api/protocols/00001/', HTTP_TRACEPARENT='00-invalido-01')
+        span = self.exporter.get_spans()[-1]
+        self.assertIsNone(span['parent_id'])
+        self.assertIn(span['trace_id'], response['traceresponse'])
+
+    def test_tarefa_celery_continua_o_trace_do_publicador(self):
+        from celery.signals import before_task_publish, task_postrun, task_prerun
+
+        headers = {}
+        with start_span('publicador', parent=self.PARENT) as publisher:
+            before_task_publish.send(sender='authentication.utils.send_email_async', headers=headers, body=())
+        self.assertEqual(headers['traceparent'], publisher.traceparent)
+
+        task = mock.Mock()
+        task.name = 'authentication.utils.send_email_async'
+        task.request = mock.Mock(spec=['traceparent'], traceparent=headers['traceparent'])
+        task_prerun.send(sender=task, task_id='t1', task=task)
+        task_postrun.send(sender=task, task_id='t1', task=task, state='SUCCESS')
+
+        span = self._span('celery authentication.utils.send_email_async')
+        self.assertEqual(span['parent_id'], publisher.span_id)
+        self.assertEqual(span['attributes']['celery.state'], 'SUCCESS')
+
+    @override_settings(TRACING_EXPORTER='off')
+    def test_desligado_nao_gera_spans(self):
+        response = APIClient().get('/api/protocols/00001/', HTTP_TRACEPARENT=self.PARENT)
+        self.assertNotIn('traceresponse', response)
+        self.assertEqual(self.exporter.get_spans(), [])
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'], DB_REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Escolha do banco pelo ReplicaRouter (sem consultas: apenas a decisão)."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def view(self, write=False):
+        def view(request):
+            self.reads.append(router.db_for_read(DriverRequest))
+            if write:
+                router.db_for_write(DriverRequest)
+                self.reads.append(router.db_for_read(DriverRequest))
+            return HttpResponse()
+        return view
+
+    def test_get_le_da_replica(self):
+        response = ReplicaRoutingMiddleware(self.view())(self.factory.get('/api/requests/drivers/'))
+        self.assertIn(self.reads[0], ['replica_1', 'replica_2'])
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_escrita_fixa_o_cliente_no_primario(self):
+        response = ReplicaRoutingMiddleware(self.view(write=True))(self.factory.post('/api/requests/drivers/'))
+        self.assertEqual(self.reads, ['default', 'default'])
+        self.assertEqual(response.cookies['db_primary']['max-age'], 5)
+
+        self.factory.cookies['db_primary'] = '1'
+        ReplicaRoutingMiddleware(self.view())(self.factory.get('/api/protocols/00001/'))
+        self.assertEqual(self.reads[-1], 'default')
+
+    def test_get_que_grava_passa_a_ler_do_primario(self):
+        response = ReplicaRoutingMiddleware(self.view(write=True))(self.factory.get('/'))
+        self.assertIn(self.reads[0], ['replica_1', 'replica_2'])
+        self.assertEqual(self.reads[1], 'default')
+        self.assertIn('db_primary', response.cookies)
+
+    def test_agregados_usam_replica_mesmo_apos_escrita(self):
+        def view(request):
+            with replica_reads():
+                self.reads.append(router.db_for_read(DriverRequest))
+            return HttpResponse()
+
+        self.factory.cookies['db_primary'] = '1'
+        ReplicaRoutingMiddleware(view)(self.factory.get('/api/dashboard/stats/'))
+        self.assertIn(self.reads[0], ['replica_1', 'replica_2'])
+
+    def test_fora_de_requisicao_usa_primario(self):
+        self.assertEqual(router.db_for_read(DriverRequest), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sem_replicas_tudo_no_primario(self):
+        response = ReplicaRoutingMiddleware(self.view(write=True))(self.factory.get('/'))
+        self.assertEqual(self.reads, ['default', 'default'])
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_migracoes_apenas_no_primario(self):
+        self.assertFalse(router.allow_migrate('replica_1', 'requests'))
+        self.assertTrue(router.allow_migrate('default', 'requests'))
+
+
+class CeleryForkTests(SimpleTestCase):
+    """Descarte do pool de conexões herdado no fork do worker do Celery."""
+
+    def test_django_mantem_pools_em_connection_pools(self):
+        from django.db.backends.postgresql.base import DatabaseWrapper
+
+        self.assertIsInstance(DatabaseWrapper.__dict__.get('_connection_pools'), dict)
+        self.assertIn('_connection_pools', DatabaseWrapper.close_pool.__code__.co_names)
+
+    def test_descarta_o_pool_sem_fechar_as_conexoes_herdadas(self):
+        pool = mock.Mock()
+        conn = mock.Mock(
+            vendor='postgresql', alias='default',
+            settings_dict={'OPTIONS': {'pool': True}}, _connection_pools={'default': pool}
+        )
+        with mock.patch('django.db.connections.all', return_value=[conn]):
+            reset_database_pools()
+
+        self.assertEqual(conn._connection_pools, {})
+        pool.close.assert_not_called()
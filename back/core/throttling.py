@@ -2,8 +2,14 @@
 Classes de throttling customizadas para controle de taxa de requisições.
 Protege endpoints públicos contra abuso e ataques DDoS.
 """
+import functools
 
-from rest_framework.throttling import AnonRateThrottle
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from authentication.websocket_auth import aget_request_user
+from core.async_api import json_response
+from core.exceptions import custom_exception_handler
 
 
 class PublicReadThrottle(AnonRateThrottle):
@@ -36,3 +42,94 @@ class PasswordResetThrottle(AnonRateThrottle):
     Taxa: 5 requisições por hora por IP.
     """
     scope = 'password_reset'
+
+
+class ProtocolLookupThrottle(AnonRateThrottle):
+    """
+    Throttle para a consulta pública de protocolos.
+    Taxa: 600 requisições por hora por IP. Mais permissiva que a leitura pública
+    porque o site consulta o protocolo periodicamente e a resposta vem do cache.
+    """
+    scope = 'protocol_lookup'
+
+
+# --- Views assíncronas --------------------------------------------------------
+
+class AsyncThrottleMixin:
+    """
+    ``aallow_request`` para views assíncronas: mesma regra e mesma chave de cache
+    do ``allow_request`` do DRF, com ``cache.aget``/``cache.aset``. O histórico é
+    compartilhado com o throttle síncrono do mesmo escopo.
+    """
+
+    async def aallow_request(self, request, view=None):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.history = await self.cache.aget(self.key, [])
+        self.now = self.timer()
+
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) >= self.num_requests:
+            return self.throttle_failure()
+        self.history.insert(0, self.now)
+        await self.cache.aset(self.key, self.history, self.duration)
+        return True
+
+
+class AsyncAnonRateThrottle(AsyncThrottleMixin, AnonRateThrottle):
+    """``AnonRateThrottle`` (escopo ``anon``) para views assíncronas."""
+
+
+class AsyncUserRateThrottle(AsyncThrottleMixin, UserRateThrottle):
+    """``UserRateThrottle`` (escopo ``user``) para views assíncronas."""
+
+
+class AsyncPublicReadThrottle(AsyncThrottleMixin, PublicReadThrottle):
+    """``PublicReadThrottle`` para views assíncronas."""
+
+
+class _ThrottleRequest:
+    """O que os throttles do DRF leem da requisição: ``META`` e ``user``."""
+
+    def __init__(self, request, user):
+        self.META = request.META
+        self.user = user
+
+
+def athrottle_classes(throttle_classes):
+    """
+    Equivalente ao ``@throttle_classes`` do DRF para views assíncronas do Django.
+
+    O usuário vem do JWT da requisição (``aget_request_user``), resolvido apenas
+    quando há token: acessos anônimos não saem do event loop. Excedido o limite
+    a resposta é o 429 do DRF, com ``Retry-After``.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            throttle_request = _ThrottleRequest(request, await aget_request_user(request))
+            throttle_durations = []
+            for throttle_class in throttle_classes:
+                throttle = throttle_class()
+                if not await throttle.aallow_request(throttle_request):
+                    throttle_durations.append(throttle.wait())
+
+            if throttle_durations:
+                durations = [duration for duration in throttle_durations if duration is not None]
+                return throttled_response(request, max(durations, default=None))
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def throttled_response(request, wait):
+    """Resposta 429 no formato do ``custom_exception_handler``."""
+    response = custom_exception_handler(Throttled(wait), {'request': request, 'view': None})
+    headers = {'Retry-After': response['Retry-After']} if response.has_header('Retry-After') else None
+    return json_response(response.data, status=response.status_code, headers=headers)
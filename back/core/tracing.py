@@ -0,0 +1,403 @@
+"""
+Rastreamento distribuído com o trace context do W3C (cabeçalho ``traceparent``).
+
+Um trace acompanha a solicitação pública de ponta a ponta:
+- HTTP: ``TracingMiddleware`` continua o trace do cabeçalho ``traceparent`` (ou
+  inicia um novo) e devolve o contexto em ``traceresponse``;
+- sinais: receivers decorados com ``@traced()`` viram spans filhos da requisição;
+- channel layer: ``core.realtime.group_send`` grava ``traceparent`` na mensagem e
+  ``TracedConsumerMixin`` abre o span do consumer como filho dele;
+- Celery: o ``traceparent`` vai nos cabeçalhos da tarefa (``before_task_publish``)
+  e o worker abre o span da execução em ``task_prerun``/``task_postrun``.
+
+Os spans finalizados vão para o exportador de ``TRACING_EXPORTER``:
+``'file'`` (uma linha JSON por span no logger ``core.tracing.spans``, gravada
+pela thread do ``QueueListener`` em ``logs/traces.jsonl``), ``'memory'`` (últimos
+``TRACING_MEMORY_MAX_SPANS`` spans, para testes e inspeção no shell) ou ``'off'``.
+O comando ``manage.py traces`` lê o arquivo e monta a árvore de um trace.
+"""
+import functools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from django.conf import settings
+
+from core.structured_logging import request_context
+
+logger = logging.getLogger(__name__)
+span_logger = logging.getLogger('core.tracing.spans')
+
+TRACEPARENT_HEADER = 'traceparent'
+TRACERESPONSE_HEADER = 'traceresponse'
+# Campo das mensagens do channel layer e cabeçalho das tarefas Celery
+TRACEPARENT_FIELD = 'traceparent'
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_INVALID_TRACE_ID = '0' * 32
+_INVALID_SPAN_ID = '0' * 16
+
+_current_span = ContextVar('trace_span', default=None)
+
+
+def parse_traceparent(value):
+    """``(trace_id, span_id)`` de um ``traceparent`` válido, ou None."""
+    match = _TRACEPARENT.match((value or '').strip().lower())
+    if match is None or match.group(1) == _INVALID_TRACE_ID or match.group(2) == _INVALID_SPAN_ID:
+        return None
+    return match.group(1), match.group(2)
+
+
+def _new_id(bits):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+
+def tracing_enabled():
+    return getattr(settings, 'TRACING_EXPORTER', 'file') != 'off'
+
+
+class Span:
+    """Uma operação do trace; ativa (contexto atual) desde a criação até ``end()``."""
+
+    def __init__(self, name, trace_id, parent_id=None, kind='internal', attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = 'ok'
+        self.start_time = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+
+    @property
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc):
+        self.status = 'error'
+        self.attributes['exception'] = f'{type(exc).__name__}: {exc}'
+
+    def end(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Encerrado em outro contexto (ex.: sinais do Celery em threads diferentes)
+            if _current_span.get() is self:
+                _current_span.set(None)
+        export(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+        return False
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start': datetime.fromtimestamp(self.start_time, tz=timezone.utc).isoformat(),
+            'duration_ms': round(self.duration * 1000, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Span usado com o rastreamento desligado: não altera o contexto."""
+
+    traceparent = None
+    trace_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def start_span(name, parent=None, kind='internal', attributes=None):
+    """
+    Inicia um span e o torna o atual. ``parent`` é um ``traceparent`` recebido de
+    outro processo; sem ele o span é filho do atual (ou raiz de um novo trace).
+
+    Use como context manager ou encerre com ``span.end()``.
+    """
+    if not tracing_enabled():
+        return _NOOP_SPAN
+    remote = parse_traceparent(parent) if parent else None
+    if remote is not None:
+        trace_id, parent_id = remote
+    else:
+        current = _current_span.get()
+        if current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = _new_id(128), None
+    return Span(name, trace_id, parent_id, kind, attributes)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_traceparent():
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+def traced(name=None):
+    """Executa a função decorada dentro de um span (nome padrão: módulo.função)."""
+    def decorator(func):
+        span_name = name or f'{func.__module__}.{func.__qualname__}'
+
+        if iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Exportadores -------------------------------------------------------------
+
+class InMemorySpanExporter:
+    """Mantém os últimos spans finalizados do processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=getattr(settings, 'TRACING_MEMORY_MAX_SPANS', 10000))
+
+    def export(self, span):
+        with self._lock:
+            self._spans.append(span.to_dict())
+
+    def get_spans(self, trace_id=None):
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span['trace_id'] == trace_id]
+        return spans
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class FileSpanExporter:
+    """
+    Uma linha JSON por span no logger ``core.tracing.spans``. A escrita no
+    arquivo é feita pela thread do ``QueueListener`` (ver ``LOGGING``).
+    """
+
+    def export(self, span):
+        span_logger.info(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+
+
+_exporters = {
+    'memory': InMemorySpanExporter(),
+    'file': FileSpanExporter(),
+}
+
+
+def get_exporter(name=None):
+    return _exporters.get(name or getattr(settings, 'TRACING_EXPORTER', 'file'))
+
+
+def export(span):
+    exporter = get_exporter()
+    if exporter is None:
+        return
+    try:
+        exporter.export(span)
+    except Exception:
+        logger.debug("Falha ao exportar o span %s", span.name, exc_info=True)
+
+
+# --- HTTP ---------------------------------------------------------------------
+
+class TracingMiddleware:
+    """
+    Span de servidor de cada requisição, filho do ``traceparent`` recebido.
+
+    O nome passa a ser o da view (``resolver_match.view_name``) quando ela é
+    resolvida; o ``trace_id`` também vai para o contexto de logging.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not tracing_enabled():
+            return self.get_response(request)
+        span = self._begin(request)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        except Exception as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            self._finish(span, response)
+
+    async def __acall__(self, request):
+        if not tracing_enabled():
+            return await self.get_response(request)
+        span = self._begin(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        except Exception as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            self._finish(span, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        span = getattr(request, 'trace_span', None)
+        match = request.resolver_match
+        if span is not None and match and match.view_name:
+            span.name = f'HTTP {request.method} {match.view_name}'
+            span.set_attribute('http.route', match.route)
+        return None
+
+    def _begin(self, request):
+        span = start_span(
+            f'HTTP {request.method}',
+            parent=request.headers.get(TRACEPARENT_HEADER),
+            kind='server',
+            attributes={
+                'http.method': request.method,
+                'http.target': request.path,
+                'request_id': getattr(request, 'request_id', None),
+            }
+        )
+        request.trace_span = span
+        context = request_context.get()
+        if context is not None:
+            context['trace_id'] = span.trace_id
+        return span
+
+    def _finish(self, span, response):
+        if response is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                span.status = 'error'
+            response[TRACERESPONSE_HEADER] = span.traceparent
+        span.end()
+
+
+# --- Channels -----------------------------------------------------------------
+
+def inject_message(message):
+    """Cópia da mensagem do channel layer com o ``traceparent`` do span atual."""
+    traceparent = current_traceparent()
+    if traceparent is None:
+        return message
+    return {**message, TRACEPARENT_FIELD: traceparent}
+
+
+class TracedConsumerMixin:
+    """Abre um span para cada mensagem de grupo que traz ``traceparent``."""
+
+    async def dispatch(self, message):
+        traceparent = message.get(TRACEPARENT_FIELD)
+        if not traceparent or not tracing_enabled():
+            return await super().dispatch(message)
+        attributes = {'consumer': type(self).__name__, 'event_id': message.get('event_id')}
+        if message.get('replay'):
+            attributes['replay'] = True
+        with start_span(f'channels {message.get("type")}', parent=traceparent, kind='consumer', attributes=attributes):
+            return await super().dispatch(message)
+
+
+# --- Celery -------------------------------------------------------------------
+
+@before_task_publish.connect(dispatch_uid='core.tracing.before_task_publish')
+def _inject_task_headers(headers=None, **kwargs):
+    traceparent = current_traceparent()
+    if traceparent and headers is not None:
+        headers[TRACEPARENT_FIELD] = traceparent
+
+
+_running_tasks = {}
+
+
+def _task_traceparent(task):
+    request = getattr(task, 'request', None)
+    if request is None:
+        return None
+    return getattr(request, TRACEPARENT_FIELD, None) or (getattr(request, 'headers', None) or {}).get(TRACEPARENT_FIELD)
+
+
+@task_prerun.connect(dispatch_uid='core.tracing.task_prerun')
+def _task_started(task_id=None, task=None, **kwargs):
+    if not tracing_enabled():
+        return
+    name = getattr(task, 'name', 'unknown')
+    _running_tasks[task_id] = start_span(
+        f'celery {name}', parent=_task_traceparent(task), kind='consumer',
+        attributes={'celery.task': name, 'celery.task_id': task_id}
+    )
+
+
+@task_postrun.connect(dispatch_uid='core.tracing.task_postrun')
+def _task_finished(task_id=None, state=None, **kwargs):
+    span = _running_tasks.pop(task_id, None)
+    if span is None:
+        return
+    span.set_attribute('celery.state', state)
+    if state == 'FAILURE':
+        span.status = 'error'
+    span.end()
@@ -0,0 +1,40 @@
+"""
+Callbacks de commit executados uma única vez por transação.
+
+Sinais disparados por objeto (``post_save``/``post_delete`` em lote) agendariam o
+mesmo trabalho N vezes. ``on_commit_once`` registra um ``on_commit`` leve a cada
+chamada, mas todos compartilham o mesmo lote pendente da conexão: o primeiro a
+rodar após o commit executa a função e encerra o lote; os demais não fazem nada.
+
+O estado é próprio (por thread, como as conexões do Django) e é limpo pelo
+callback. Os callbacks de um savepoint ou de uma transação desfeita são
+descartados pelo Django, mas o lote continua pendente e é executado pelo próximo
+commit que tiver chamado ``on_commit_once``: nenhum trabalho é perdido.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_state = threading.local()
+
+
+def _pending():
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        pending = _state.pending = {}
+    return pending
+
+
+def on_commit_once(func, using=None):
+    """Executa ``func`` após o commit da transação atual, uma vez por lote de chamadas."""
+    pending = _pending()
+    key = (using or DEFAULT_DB_ALIAS, func)
+    batch = pending.setdefault(key, object())
+
+    def run():
+        if pending.get(key) is not batch:
+            return
+        del pending[key]
+        func()
+
+    transaction.on_commit(run, using=using)
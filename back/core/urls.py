@@ -1,8 +1,11 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core import views
+from core.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('authentication.urls')),
@@ -13,6 +16,11 @@ urlpatterns = [
     path('api/complaints/', include('complaints.urls')),
     path('api/notifications/', include('notifications.urls')),
     path('api/dashboard/', include('dashboard.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    path('api/profiling/', views.profile_list, name='profile-list'),
+    path('api/profiling/<str:profile_id>/', views.profile_detail, name='profile-detail'),
+    path('api/profiling/<str:profile_id>/download/', views.profile_download, name='profile-download'),
+    re_path(r'^api/protocols/(?P<protocol>[^/]+)/?$', views.public_protocol_lookup, name='public-protocol-lookup'),
 ]
 
 if settings.DEBUG:
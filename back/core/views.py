@@ -1 +1,81 @@
-# Views consolidadas em back/dashboard/views.py
+# Views de negócio consolidadas em back/dashboard/views.py
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from authentication.permissions import IsAdminRole
+from core.profiling import get_profile, list_profiles
+from core.protocol_lookup import normalize_protocol, get_public_projection
+from core.throttling import ProtocolLookupThrottle
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@throttle_classes([ProtocolLookupThrottle])
+def public_protocol_lookup(request, protocol):
+    """
+    Consulta pública unificada de protocolos (CMP-, DRV- e VHC-).
+    Retorna apenas a projeção pública do registro, servida a partir do cache.
+    """
+    normalized = normalize_protocol(protocol)
+
+    if normalized is None:
+        return Response(
+            {
+                'error': 'Protocolo inválido.',
+                'message': 'Informe um protocolo no formato CMP-AAAANNNN, DRV-AAAANNNN ou VHC-AAAANNNN.',
+                'protocol_searched': protocol,
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    data = get_public_projection(normalized)
+
+    if data is None:
+        return Response(
+            {
+                'error': 'Protocolo não encontrado.',
+                'message': 'Não foi possível localizar um registro com o protocolo informado. Verifique se o número está correto.',
+                'protocol_searched': normalized,
+            },
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminRole])
+def profile_list(request):
+    """Perfis de requisição recentes (ver core.profiling), do mais novo ao mais antigo."""
+    return Response({'results': list_profiles()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminRole])
+def profile_detail(request, profile_id):
+    """
+    Resultado de um perfil: resumo do cProfile, linha do tempo SQL e alocações.
+    O arquivo pstats completo fica em ``download/``.
+    """
+    profile = get_profile(profile_id)
+    if profile is None:
+        return Response({'error': 'Perfil não encontrado ou expirado.'}, status=status.HTTP_404_NOT_FOUND)
+    data = {key: value for key, value in profile.items() if key != 'pstats'}
+    data['has_pstats'] = profile['pstats'] is not None
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminRole])
+def profile_download(request, profile_id):
+    """Arquivo ``.pstats`` do perfil (abre com ``pstats``, snakeviz etc.)."""
+    profile = get_profile(profile_id)
+    if profile is None or profile['pstats'] is None:
+        return Response({'error': 'Perfil não encontrado ou expirado.'}, status=status.HTTP_404_NOT_FOUND)
+    response = HttpResponse(profile['pstats'], content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.pstats"'
+    return response
+
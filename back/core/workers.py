@@ -0,0 +1,47 @@
+"""
+Worker do gunicorn para servir ``core.asgi:application`` (HTTP e WebSockets).
+
+Cada worker é um processo com o próprio event loop do uvicorn; os WebSockets de
+workers diferentes se falam pelo channel layer do Redis (``CHANNEL_LAYERS``),
+então um ``group_send`` chega a todas as conexões, em qualquer processo.
+
+O executor padrão do loop (usado por ``sync_to_async(thread_sensitive=False)``,
+ex.: ``cache.aget`` das views assíncronas) tem ``ASGI_THREADS`` threads por
+worker. As views síncronas continuam em uma thread por requisição do
+``ASGIHandler`` e o acesso ao banco é limitado pelo pool de cada worker
+(``DB_POOL_MAX_SIZE``). Ver ``gunicorn.conf.py``.
+
+Ao encerrar, o worker executa as descargas de ``core.flusher`` (lotes de
+eventos e de auditoria) no executor, com o loop ainda ativo: ``async_to_sync``
+não pode ser chamado da thread do loop.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from uvicorn_worker import UvicornWorker
+
+from core.flusher import run_shutdown_hooks
+
+
+def asgi_threads():
+    return int(os.getenv('ASGI_THREADS', 10))
+
+
+class ASGIWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        # O Django não implementa o protocolo lifespan
+        'lifespan': 'off',
+        # Ping do servidor para detectar conexões mortas atrás do proxy
+        'ws_ping_interval': float(os.getenv('WS_PING_INTERVAL', 20)),
+        'ws_ping_timeout': float(os.getenv('WS_PING_TIMEOUT', 20)),
+    }
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=asgi_threads(), thread_name_prefix='asgi'))
+        try:
+            await super()._serve()
+        finally:
+            await loop.run_in_executor(None, run_shutdown_hooks)
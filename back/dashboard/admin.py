@@ -1 +1,18 @@
 from django.contrib import admin
+from .models import ActivityEvent
+
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    """Registro append-only: somente leitura no admin."""
+    list_display = ['id', 'created_at', 'entity_type', 'entity_id', 'action', 'status', 'actor']
+    list_filter = ['entity_type', 'action', 'status']
+    search_fields = ['description']
+    list_select_related = ['actor']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
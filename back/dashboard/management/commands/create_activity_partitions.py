@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dashboard.partitions import ensure_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the monthly partitions of the activity event table for the current '
+        'month and the next N months (PostgreSQL only; also run daily by celery beat)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=3,
+                            help='Months ahead of the current one to create')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write('Database is not PostgreSQL; activity events are not partitioned.')
+            return
+
+        created = ensure_partitions(months_ahead=options['months'])
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f'Created partition {name}'))
+        if not created:
+            self.stdout.write('All partitions already exist.')
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-18 23:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+from dashboard.partitions import CREATE_TABLE_SQL, DROP_TABLE_SQL, ensure_partitions
+
+
+def create_activity_table(apps, schema_editor):
+    """No PostgreSQL cria a tabela particionada por mês; nos demais bancos, a tabela comum."""
+    ActivityEvent = apps.get_model('dashboard', 'ActivityEvent')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(ActivityEvent)
+        return
+    schema_editor.execute(CREATE_TABLE_SQL)
+    ensure_partitions(connection=schema_editor.connection)
+
+
+def drop_activity_table(apps, schema_editor):
+    ActivityEvent = apps.get_model('dashboard', 'ActivityEvent')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.delete_model(ActivityEvent)
+        return
+    schema_editor.execute(DROP_TABLE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Apenas o estado: a tabela é criada pelo RunPython abaixo (particionada no PostgreSQL)
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ActivityEvent',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data do Evento')),
+                        ('entity_type', models.CharField(choices=[('driver_request', 'Solicitação de Motorista'), ('vehicle_request', 'Solicitação de Veículo'), ('complaint', 'Denúncia')], max_length=20, verbose_name='Tipo de Registro')),
+                        ('entity_id', models.BigIntegerField(verbose_name='ID do Registro')),
+                        ('action', models.CharField(choices=[('created', 'Criado'), ('status_changed', 'Status Alterado')], max_length=20, verbose_name='Ação')),
+                        ('status', models.CharField(help_text='Status do registro após o evento', max_length=20, verbose_name='Status')),
+                        ('previous_status', models.CharField(blank=True, default='', max_length=20, verbose_name='Status Anterior')),
+                        ('description', models.CharField(max_length=255, verbose_name='Descrição')),
+                        ('actor', models.ForeignKey(blank=True, help_text='Usuário que executou a ação (vazio para ações públicas)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_events', to=settings.AUTH_USER_MODEL, verbose_name='Responsável')),
+                    ],
+                    options={
+                        'verbose_name': 'Evento de Atividade',
+                        'verbose_name_plural': 'Eventos de Atividade',
+                        'ordering': ['-created_at', '-id'],
+                        'indexes': [models.Index(fields=['-created_at', '-id'], name='activity_recent_idx'), models.Index(fields=['entity_type', 'entity_id', '-created_at', '-id'], name='activity_entity_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_activity_table, drop_activity_table),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+
+def backfill_activity_events(apps, schema_editor):
+    """
+    Gera os eventos dos registros existentes: a criação e, para os já
+    avaliados, a mudança para o status atual na data da avaliação.
+    """
+    ActivityEvent = apps.get_model('dashboard', 'ActivityEvent')
+    sources = [
+        (apps.get_model('requests', 'DriverRequest'), 'driver_request', 'em_analise'),
+        (apps.get_model('requests', 'VehicleRequest'), 'vehicle_request', 'em_analise'),
+        (apps.get_model('complaints', 'Complaint'), 'complaint', 'proposto'),
+    ]
+
+    # Cópia de dashboard.signals.describe: os models históricos não têm os
+    # métodos get_*_display e a migração não deve depender de código do app,
+    # que pode mudar depois dela.
+    for model, entity_type, initial_status in sources:
+        status_display = dict(model._meta.get_field('status').choices)
+        events = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=500):
+            if entity_type == 'driver_request':
+                subject = f"solicitação de motorista de {instance.name}"
+            elif entity_type == 'vehicle_request':
+                subject = f"solicitação de veículo {instance.brand} {instance.model} - Placa {instance.plate}"
+            else:
+                type_display = dict(model._meta.get_field('complaint_type').choices).get(
+                    instance.complaint_type, instance.complaint_type
+                )
+                subject = f"denúncia {type_display} - Placa {instance.vehicle_plate}"
+
+            events.append(ActivityEvent(
+                created_at=instance.created_at,
+                entity_type=entity_type,
+                entity_id=instance.pk,
+                action='created',
+                status=initial_status,
+                description=f"Nova {subject}"[:255],
+            ))
+            if instance.status != initial_status and instance.reviewed_at:
+                events.append(ActivityEvent(
+                    created_at=instance.reviewed_at,
+                    entity_type=entity_type,
+                    entity_id=instance.pk,
+                    action='status_changed',
+                    status=instance.status,
+                    previous_status=initial_status,
+                    description=f"{subject[0].upper()}{subject[1:]}: {status_display.get(instance.status, instance.status)}"[:255],
+                    actor_id=instance.reviewed_by_id,
+                ))
+
+            if len(events) >= 500:
+                ActivityEvent.objects.bulk_create(events)
+                events = []
+        ActivityEvent.objects.bulk_create(events)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_activity_event'),
+        ('requests', '0007_vehiclerequest_crlv_pdf_vehiclerequest_insurance_pdf'),
+        ('complaints', '0007_complaint_occurrence_location_complaint_priority_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_activity_events, migrations.RunPython.noop),
+    ]
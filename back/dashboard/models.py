@@ -1,3 +1,80 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
 
-# Create your models here.
+
+class ActivityEvent(models.Model):
+    """
+    Registro append-only dos eventos de domínio (criações e mudanças de status)
+    de solicitações e denúncias.
+
+    Alimentado pelos signals de ``dashboard.signals``; serve as atividades
+    recentes e o histórico de cada registro com uma única varredura do índice
+    ``(created_at, id)``. No PostgreSQL a tabela é particionada por mês
+    (ver ``dashboard.partitions``).
+    """
+
+    ENTITY_TYPES = [
+        ('driver_request', 'Solicitação de Motorista'),
+        ('vehicle_request', 'Solicitação de Veículo'),
+        ('complaint', 'Denúncia'),
+    ]
+
+    ACTIONS = [
+        ('created', 'Criado'),
+        ('status_changed', 'Status Alterado'),
+    ]
+
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Data do Evento'
+    )
+    entity_type = models.CharField(
+        max_length=20,
+        choices=ENTITY_TYPES,
+        verbose_name='Tipo de Registro'
+    )
+    entity_id = models.BigIntegerField(
+        verbose_name='ID do Registro'
+    )
+    action = models.CharField(
+        max_length=20,
+        choices=ACTIONS,
+        verbose_name='Ação'
+    )
+    status = models.CharField(
+        max_length=20,
+        verbose_name='Status',
+        help_text='Status do registro após o evento'
+    )
+    previous_status = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        verbose_name='Status Anterior'
+    )
+    description = models.CharField(
+        max_length=255,
+        verbose_name='Descrição'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='activity_events',
+        verbose_name='Responsável',
+        help_text='Usuário que executou a ação (vazio para ações públicas)'
+    )
+
+    class Meta:
+        verbose_name = 'Evento de Atividade'
+        verbose_name_plural = 'Eventos de Atividade'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='activity_recent_idx'),
+            models.Index(fields=['entity_type', 'entity_id', '-created_at', '-id'], name='activity_entity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entity_type_display()} #{self.entity_id} - {self.get_action_display()}"
@@ -0,0 +1,115 @@
+"""
+Particionamento mensal da tabela de eventos de atividade (apenas PostgreSQL).
+
+A tabela ``dashboard_activityevent`` é particionada por ``created_at``; consultas
+com limite de data (cursor da paginação, janelas de tempo) leem apenas as
+partições envolvidas. Uma partição DEFAULT recebe eventos fora dos meses já
+criados (ex.: dados migrados), então a falta de uma partição nunca impede a
+escrita. Partições futuras são criadas diariamente pela tarefa
+``dashboard.tasks.create_activity_partitions`` (``CELERY_BEAT_SCHEDULE``) ou
+pelo comando ``create_activity_partitions``.
+
+O PostgreSQL não cria uma partição cujo intervalo já tem linhas na DEFAULT;
+nesse caso as linhas do mês são movidas para a tabela nova antes de anexá-la.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from dateutil.relativedelta import relativedelta
+from django.db import DatabaseError, connection as default_connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = 'dashboard_activityevent'
+
+CREATE_TABLE_SQL = f"""
+CREATE TABLE {TABLE_NAME} (
+    id bigserial NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    entity_type varchar(20) NOT NULL,
+    entity_id bigint NOT NULL,
+    action varchar(20) NOT NULL,
+    status varchar(20) NOT NULL,
+    previous_status varchar(20) NOT NULL,
+    description varchar(255) NOT NULL,
+    actor_id integer NULL REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE {TABLE_NAME}_default PARTITION OF {TABLE_NAME} DEFAULT;
+CREATE INDEX activity_recent_idx ON {TABLE_NAME} (created_at DESC, id DESC);
+CREATE INDEX activity_entity_idx ON {TABLE_NAME} (entity_type, entity_id, created_at DESC, id DESC);
+CREATE INDEX {TABLE_NAME}_actor_id ON {TABLE_NAME} (actor_id);
+"""
+
+DROP_TABLE_SQL = f'DROP TABLE IF EXISTS {TABLE_NAME} CASCADE;'
+
+
+def month_start(value):
+    """Primeiro instante (UTC) do mês de ``value``."""
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(start):
+    return f'{TABLE_NAME}_{start:%Y%m}'
+
+
+def _create_partition(cursor, name, lower, upper):
+    """
+    Cria a partição ``[lower, upper)``, movendo antes as linhas do intervalo que
+    estão na DEFAULT (o ATTACH valida que a DEFAULT não tem mais linhas nele).
+    """
+    bounds = [lower, upper]
+    cursor.execute(
+        f'SELECT 1 FROM {TABLE_NAME}_default WHERE created_at >= %s AND created_at < %s LIMIT 1',
+        bounds
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(
+            f'CREATE TABLE {name} PARTITION OF {TABLE_NAME} '
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        return
+
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE_NAME} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {TABLE_NAME}_default WHERE created_at >= %s AND created_at < %s '
+        f'RETURNING *) INSERT INTO {name} SELECT * FROM moved',
+        bounds
+    )
+    cursor.execute(
+        f'ALTER TABLE {TABLE_NAME} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    )
+
+
+def ensure_partitions(months_ahead=3, connection=None):
+    """
+    Cria as partições do mês atual e dos ``months_ahead`` meses seguintes.
+
+    Idempotente; retorna os nomes das partições criadas. Cada mês roda na
+    própria transação: uma falha é registrada no log e não impede os demais.
+    Não faz nada fora do PostgreSQL.
+    """
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        return []
+
+    created = []
+    start = month_start(timezone.now())
+    for offset in range(months_ahead + 1):
+        lower = start + relativedelta(months=offset)
+        upper = lower + relativedelta(months=1)
+        name = partition_name(lower)
+        try:
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute('SELECT to_regclass(%s)', [name])
+                if cursor.fetchone()[0] is not None:
+                    continue
+                _create_partition(cursor, name, lower, upper)
+        except DatabaseError:
+            logger.exception("Falha ao criar a partição %s de %s", name, TABLE_NAME)
+            continue
+        created.append(name)
+    return created
@@ -0,0 +1,384 @@
+"""
+Montagem dos dados do dashboard.
+
+As consultas agregadas ficam em ``QUERIES`` e são independentes entre si; cada
+seção (stats, charts, recent-activity, alerts) declara as que usa e monta o
+payload a partir dos resultados. Assim o bootstrap executa cada consulta uma
+única vez (em paralelo) e reaproveita contagens comuns, como solicitações
+pendentes e veículos inativos, entre as seções.
+
+Os endpoints leem o payload completo de ``get_cached_dashboard_data``, que
+serve o cache e o recalcula em segundo plano quando vence. As consultas leem de
+uma réplica quando houver (``core.db_router``).
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from complaints.models import Complaint
+from conductors.models import Conductor
+from core.caching import get_or_refresh
+from core.concurrency import run_queries
+from core.db_router import replica_reads
+from requests.models import DriverRequest
+from vehicles.models import Vehicle
+from .models import ActivityEvent
+
+MONTHS = 6
+DASHBOARD_CACHE_KEY = 'dashboard:data'
+ACTIVITY_CURSOR_SALT = 'dashboard.activity'
+RECENT_ACTIVITY_LIMIT = 20
+
+
+class InvalidActivityCursor(ValueError):
+    """Cursor de paginação das atividades inválido ou adulterado."""
+
+
+def _month_ranges():
+    """Últimos ``MONTHS`` meses (mais antigo primeiro): ``(rótulo, início, fim)``."""
+    now = timezone.now()
+    ranges = []
+    for i in range(MONTHS - 1, -1, -1):
+        date = now - relativedelta(months=i)
+        month_start = date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        if i > 0:
+            month_end = (now - relativedelta(months=i-1)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        else:
+            month_end = now
+        ranges.append((date.strftime('%b'), month_start, month_end))
+    return ranges
+
+
+def _monthly_counts(queryset, ranges, field=None):
+    """
+    Contagem por mês em uma única consulta agrupada pelo mês (``TruncMonth`` em
+    UTC, como os limites de ``_month_ranges``). Com ``field``, retorna
+    valor -> lista de contagens; sem ele, apenas a lista.
+
+    Um ``Count`` filtrado por mês e valor custaria mais para o ORM compilar do
+    que para o banco executar.
+    """
+    months = {start: index for index, (_, start, _) in enumerate(ranges)}
+    rows = (
+        queryset.filter(created_at__gte=ranges[0][1], created_at__lt=ranges[-1][2])
+        .annotate(month=TruncMonth('created_at', tzinfo=dt_timezone.utc))
+        .values('month', *([field] if field else []))
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    counts = {}
+    for row in rows:
+        series = counts.setdefault(row[field] if field else None, [0] * len(ranges))
+        series[months[row['month']]] += row['count']
+    if field is None:
+        return counts.get(None, [0] * len(ranges))
+    return counts
+
+
+def vehicle_stats():
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    return Vehicle.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='ativo')),
+        inactive=Count('id', filter=Q(status='inativo')),
+        last_month=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+    )
+
+
+def conductor_stats():
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    return Conductor.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        inactive=Count('id', filter=Q(is_active=False)),
+        last_month=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+    )
+
+
+def request_stats():
+    return DriverRequest.objects.aggregate(
+        total=Count('id'),
+        approved=Count('id', filter=Q(status='aprovado')),
+        pending=Count('id', filter=Q(status='em_analise')),
+        rejected=Count('id', filter=Q(status='reprovado')),
+    )
+
+
+def complaint_stats():
+    return Complaint.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='proposto')),
+        resolved=Count('id', filter=Q(status='concluido')),
+        investigating=Count('id', filter=Q(status='em_analise')),
+    )
+
+
+def monthly_registrations():
+    ranges = _month_ranges()
+    vehicles = _monthly_counts(Vehicle.objects.all(), ranges)
+    conductors = _monthly_counts(Conductor.objects.all(), ranges)
+    return [
+        {'month': label, 'veiculos': vehicles[index], 'condutores': conductors[index]}
+        for index, (label, _, _) in enumerate(ranges)
+    ]
+
+
+def requests_status():
+    ranges = _month_ranges()
+    counts = _monthly_counts(DriverRequest.objects.all(), ranges, field='status')
+    empty = [0] * len(ranges)
+    return [
+        {
+            'month': label,
+            'aprovadas': counts.get('aprovado', empty)[index],
+            'pendentes': counts.get('em_analise', empty)[index],
+            'rejeitadas': counts.get('reprovado', empty)[index],
+        }
+        for index, (label, _, _) in enumerate(ranges)
+    ]
+
+
+def vehicle_categories():
+    return list(Vehicle.objects.values('category').annotate(count=Count('id')))
+
+
+def recent_activity_events():
+    return list(ActivityEvent.objects.order_by('-created_at', '-id')[:RECENT_ACTIVITY_LIMIT])
+
+
+QUERIES = {
+    'vehicle_stats': vehicle_stats,
+    'conductor_stats': conductor_stats,
+    'request_stats': request_stats,
+    'complaint_stats': complaint_stats,
+    'monthly_registrations': monthly_registrations,
+    'requests_status': requests_status,
+    'vehicle_categories': vehicle_categories,
+    'recent_activity_events': recent_activity_events,
+}
+
+
+def _percentage(part, total, digits):
+    return round((part / total * 100) if total > 0 else 0, digits)
+
+
+def build_stats(results):
+    vehicles = results['vehicle_stats']
+    conductors = results['conductor_stats']
+    requests = results['request_stats']
+    complaints = results['complaint_stats']
+    total_vehicles = vehicles['total'] or 0
+    total_conductors = conductors['total'] or 0
+
+    return {
+        'vehicles': {
+            'total': total_vehicles,
+            'active': vehicles['active'],
+            'inactive': vehicles['inactive'],
+            'growth_percentage': _percentage(vehicles['last_month'], total_vehicles, 2),
+        },
+        'conductors': {
+            'total': total_conductors,
+            'active': conductors['active'],
+            'inactive': conductors['inactive'],
+            'growth_percentage': _percentage(conductors['last_month'], total_conductors, 2),
+        },
+        'requests': {
+            'total': requests['total'],
+            'approved': requests['approved'],
+            'pending': requests['pending'],
+            'rejected': requests['rejected'],
+        },
+        'complaints': {
+            'total': complaints['total'],
+            'pending': complaints['pending'],
+            'resolved': complaints['resolved'],
+            'investigating': complaints['investigating'],
+        },
+    }
+
+
+def build_charts(results):
+    vehicles = results['vehicle_stats']
+    conductors = results['conductor_stats']
+    requests = results['request_stats']
+    complaints = results['complaint_stats']
+
+    category_distribution = [
+        {
+            'category': cat['category'].title(),
+            'quantidade': cat['count'],
+            'percentage': _percentage(cat['count'], vehicles['total'], 1),
+        }
+        for cat in results['vehicle_categories']
+        if cat['category']
+    ]
+
+    return {
+        'vehicleStatus': [
+            {'name': 'Ativos', 'value': vehicles['active'], 'color': '#10b981'},
+            {'name': 'Inativos', 'value': vehicles['inactive'], 'color': '#ef4444'},
+        ],
+        'monthlyRegistrations': results['monthly_registrations'],
+        'categoryDistribution': category_distribution,
+        'requestsStatus': results['requests_status'],
+        'performanceMetrics': [
+            {'subject': 'Aprovação', 'A': _percentage(requests['approved'], requests['total'], 1), 'fullMark': 100},
+            {'subject': 'Pendências', 'A': _percentage(requests['pending'], requests['total'], 1), 'fullMark': 100},
+            {'subject': 'Resolução', 'A': _percentage(complaints['resolved'], complaints['total'], 1), 'fullMark': 100},
+            {'subject': 'Veículos Ativos', 'A': _percentage(vehicles['active'], vehicles['total'], 1), 'fullMark': 100},
+            {'subject': 'Condutores Ativos', 'A': _percentage(conductors['active'], conductors['total'], 1), 'fullMark': 100},
+        ],
+    }
+
+
+def serialize_activity(event):
+    return {
+        'type': 'complaint' if event.entity_type == 'complaint' else 'request',
+        'id': event.id,
+        'entity_type': event.entity_type,
+        'entity_id': event.entity_id,
+        'action': event.action,
+        'description': event.description,
+        'status': event.status,
+        'date': event.created_at.isoformat(),
+    }
+
+
+def build_recent_activity(results):
+    return [serialize_activity(event) for event in results['recent_activity_events']]
+
+
+def build_alerts(results):
+    alerts = []
+
+    pending_requests = results['request_stats']['pending']
+    if pending_requests > 0:
+        alerts.append({
+            'type': 'warning',
+            'title': 'Solicitações Pendentes',
+            'message': f"Existem {pending_requests} solicitações aguardando análise",
+            'count': pending_requests,
+            'link': '/requests'
+        })
+
+    complaints = results['complaint_stats']
+    pending_complaints = complaints['pending'] + complaints['investigating']
+    if pending_complaints > 0:
+        alerts.append({
+            'type': 'error',
+            'title': 'Denúncias Não Resolvidas',
+            'message': f"{pending_complaints} denúncias precisam de atenção",
+            'count': pending_complaints,
+            'link': '/denuncias'
+        })
+
+    inactive_vehicles = results['vehicle_stats']['inactive']
+    if inactive_vehicles > 10:
+        alerts.append({
+            'type': 'info',
+            'title': 'Veículos Inativos',
+            'message': f"{inactive_vehicles} veículos estão inativos",
+            'count': inactive_vehicles,
+            'link': '/vehicles'
+        })
+
+    inactive_conductors = results['conductor_stats']['inactive']
+    if inactive_conductors > 10:
+        alerts.append({
+            'type': 'info',
+            'title': 'Condutores Inativos',
+            'message': f"{inactive_conductors} condutores estão inativos",
+            'count': inactive_conductors,
+            'link': '/conductors'
+        })
+
+    return alerts
+
+
+# Seção -> (consultas usadas, função que monta o payload)
+SECTIONS = {
+    'stats': (('vehicle_stats', 'conductor_stats', 'request_stats', 'complaint_stats'), build_stats),
+    'charts': (
+        ('vehicle_stats', 'conductor_stats', 'request_stats', 'complaint_stats',
+         'monthly_registrations', 'requests_status', 'vehicle_categories'),
+        build_charts
+    ),
+    'recent_activity': (('recent_activity_events',), build_recent_activity),
+    'alerts': (('vehicle_stats', 'conductor_stats', 'request_stats', 'complaint_stats'), build_alerts),
+}
+
+
+def get_dashboard_data(sections):
+    """
+    Monta as seções pedidas executando cada consulta necessária uma única vez.
+
+    Retorna um dicionário seção -> payload.
+    """
+    names = {name for section in sections for name in SECTIONS[section][0]}
+    # Agregados toleram o atraso de replicação
+    with replica_reads():
+        results = run_queries({name: QUERIES[name] for name in names})
+    return {section: SECTIONS[section][1](results) for section in sections}
+
+
+def get_cached_dashboard_data():
+    """
+    Payload de todas as seções, servido do cache (stale-while-revalidate).
+
+    Os números do dashboard são iguais para todos os usuários; cada recálculo
+    atende todos os navegadores abertos no período.
+    """
+    return get_or_refresh(
+        DASHBOARD_CACHE_KEY,
+        lambda: get_dashboard_data(list(SECTIONS)),
+        fresh_seconds=getattr(settings, 'DASHBOARD_CACHE_FRESH_SECONDS', 30),
+        stale_seconds=getattr(settings, 'DASHBOARD_CACHE_STALE_SECONDS', 300),
+        lock_timeout=getattr(settings, 'DASHBOARD_CACHE_LOCK_TIMEOUT', 30),
+    )
+
+
+def encode_activity_cursor(event):
+    return signing.dumps({'c': event.created_at.isoformat(), 'i': event.id}, salt=ACTIVITY_CURSOR_SALT)
+
+
+def decode_activity_cursor(token):
+    try:
+        data = signing.loads(token, salt=ACTIVITY_CURSOR_SALT)
+        created_at = parse_datetime(data['c'])
+        event_id = int(data['i'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError) as exc:
+        raise InvalidActivityCursor('Cursor inválido.') from exc
+    if created_at is None:
+        raise InvalidActivityCursor('Cursor inválido.')
+    return created_at, event_id
+
+
+def get_activity_page(limit, cursor=None, entity_type=None, entity_id=None):
+    """
+    Página de eventos do mais recente para o mais antigo (keyset em ``(created_at, id)``).
+
+    Com ``entity_type``/``entity_id`` retorna o histórico de um registro. O
+    cursor limita ``created_at``, o que permite ao PostgreSQL ignorar as
+    partições mais novas. Retorna ``(eventos, próximo_cursor)``.
+    """
+    queryset = ActivityEvent.objects.order_by('-created_at', '-id')
+    if entity_type:
+        queryset = queryset.filter(entity_type=entity_type)
+    if entity_id is not None:
+        queryset = queryset.filter(entity_id=entity_id)
+    if cursor:
+        created_at, event_id = decode_activity_cursor(cursor)
+        queryset = queryset.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(id__lt=event_id)
+        )
+
+    events = list(queryset[:limit + 1])
+    next_cursor = encode_activity_cursor(events[limit - 1]) if len(events) > limit else None
+    return events[:limit], next_cursor
@@ -0,0 +1,96 @@
+"""
+Alimenta o registro de atividades (``ActivityEvent``) a partir dos models.
+
+O status carregado do banco é guardado em ``post_init`` para detectar mudanças
+de status no ``post_save`` sem consulta extra. No ``pre_save`` ele passa a ser o
+status anterior daquele save, de modo que ``status_changed`` vale para qualquer
+receptor de ``post_save`` (contadores de ``requests`` e ``complaints``),
+independente da ordem dos receptores.
+"""
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from complaints.models import Complaint
+from requests.models import DriverRequest, VehicleRequest
+from .models import ActivityEvent
+
+ENTITY_TYPES = {
+    DriverRequest: 'driver_request',
+    VehicleRequest: 'vehicle_request',
+    Complaint: 'complaint',
+}
+
+
+def describe(instance, action):
+    """Descrição exibida nas atividades recentes."""
+    if isinstance(instance, DriverRequest):
+        subject = f"solicitação de motorista de {instance.name}"
+    elif isinstance(instance, VehicleRequest):
+        subject = f"solicitação de veículo {instance.brand} {instance.model} - Placa {instance.plate}"
+    else:
+        subject = f"denúncia {instance.get_complaint_type_display()} - Placa {instance.vehicle_plate}"
+
+    if action == 'created':
+        return f"Nova {subject}"[:255]
+    return f"{subject[0].upper()}{subject[1:]}: {instance.get_status_display()}"[:255]
+
+
+def activity_event_for(instance, action, previous_status='', created_at=None, actor_id=None):
+    """Monta (sem salvar) o evento de ``instance``; usado também pelas ações em lote do admin."""
+    event = ActivityEvent(
+        entity_type=ENTITY_TYPES[type(instance)],
+        entity_id=instance.pk,
+        action=action,
+        status=instance.status,
+        previous_status=previous_status or '',
+        description=describe(instance, action),
+        actor_id=actor_id,
+    )
+    if created_at is not None:
+        event.created_at = created_at
+    return event
+
+
+@receiver(post_init, sender=DriverRequest)
+@receiver(post_init, sender=VehicleRequest)
+@receiver(post_init, sender=Complaint)
+def remember_loaded_status(sender, instance, **kwargs):
+    instance._activity_status = instance.status
+
+
+@receiver(pre_save, sender=DriverRequest)
+@receiver(pre_save, sender=VehicleRequest)
+@receiver(pre_save, sender=Complaint)
+def remember_previous_status(sender, instance, **kwargs):
+    instance._previous_status = getattr(instance, '_activity_status', None)
+    instance._activity_status = instance.status
+
+
+def status_changed(instance):
+    """Se o save em andamento (``post_save``) alterou o status da instância."""
+    return getattr(instance, '_previous_status', None) != instance.status
+
+
+@receiver(post_save, sender=DriverRequest)
+@receiver(post_save, sender=VehicleRequest)
+@receiver(post_save, sender=Complaint)
+def record_activity_event(sender, instance, created, **kwargs):
+    """
+    Registra a criação e cada mudança de status (aprovação, reprovação,
+    análise, conclusão) no mesmo commit da alteração.
+    """
+    previous_status = getattr(instance, '_previous_status', None)
+
+    if created:
+        event = activity_event_for(instance, 'created', created_at=instance.created_at)
+    elif status_changed(instance):
+        event = activity_event_for(
+            instance,
+            'status_changed',
+            previous_status=previous_status,
+            actor_id=getattr(instance, 'reviewed_by_id', None)
+        )
+    else:
+        return
+
+    event.save()
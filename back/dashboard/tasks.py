@@ -0,0 +1,10 @@
+from celery import shared_task
+from django.conf import settings
+
+from .partitions import ensure_partitions
+
+
+@shared_task
+def create_activity_partitions():
+    """Tarefa periódica (beat) que mantém as partições dos próximos meses criadas."""
+    return ensure_partitions(months_ahead=getattr(settings, 'ACTIVITY_PARTITION_MONTHS_AHEAD', 3))
@@ -1,14 +1,31 @@
 """
 Testes abrangentes para o app dashboard.
 
-Cobre os endpoints: stats, charts, recent-activity e alerts.
+Cobre os endpoints: stats, charts, recent-activity, alerts e bootstrap.
 """
+from unittest import mock
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 
 from authentication.models import UserProfile
+from complaints.models import Complaint
+from requests.models import DriverRequest, VehicleRequest
+from vehicles.models import Vehicle
+from .models import ActivityEvent
+from .partitions import ensure_partitions, month_start, partition_name
+from .tasks import create_activity_partitions
+from core.caching import LOCK_SUFFIX, get_or_refresh
+from .services import SECTIONS, get_dashboard_data
 
 def make_user(username='dashuser', password='DashPass123!', email='dash@example.com', role='viewer'):
     user = User.objects.create_user(username=username, password=password, email=email)
@@ -17,6 +34,32 @@ def make_user(username='dashuser', password='DashPass123!', email='dash@example.
     profile.save()
     return user
 
+def make_dashboard_data():
+    make_complaint()
+    Vehicle.objects.create(
+        plate='DSH1234', brand='Toyota', model='Corolla', year=2022, color='Prata',
+        chassis_number='CHASSISDSH1234', renavam='RENAVAMDSH1234', fuel_type='flex', category='Carro'
+    )
+    return DriverRequest.objects.create(
+        name='Carlos Lima', cpf='52998224725', email='carlos@example.com', phone='(11) 91234-5678',
+        license_number='98765432100', license_category='B', birth_date='1985-07-20',
+        license_expiry_date='2028-07-20', gender='M', nationality='Brasileira',
+        street='Av. Brasil', number='200', neighborhood='Centro', city='Campinas',
+    )
+
+def make_complaint():
+    return Complaint.objects.create(
+        vehicle_plate='DSH1234',
+        complaint_type='excesso_velocidade',
+        description='Teste de denúncia com descrição de pelo menos 20 caracteres'
+    )
+
+def make_vehicle_request():
+    return VehicleRequest.objects.create(
+        plate='JKL7890', brand='Chevrolet', model='Onix', year=2021, color='Prata',
+        fuel_type='flex', category='Carro', passenger_capacity=5,
+    )
+
 class DashboardStatsTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -74,6 +117,20 @@ class DashboardChartsTests(TestCase):
         self.assertIsInstance(monthly, list)
         self.assertEqual(len(monthly), 6)  # 6 meses
 
+    def test_charts_agrupa_solicitacoes_por_mes_e_status(self):
+        request = make_dashboard_data()
+        DriverRequest.objects.filter(pk=request.pk).update(
+            status='aprovado', created_at=timezone.now() - relativedelta(months=2)
+        )
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/dashboard/charts/')
+
+        series = response.data['requestsStatus']
+        self.assertEqual([month['aprovadas'] for month in series], [0, 0, 0, 1, 0, 0])
+        self.assertEqual(sum(month['pendentes'] + month['rejeitadas'] for month in series), 0)
+        self.assertEqual(response.data['monthlyRegistrations'][-1]['veiculos'], 1)
+
 class DashboardRecentActivityTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -103,3 +160,235 @@ class DashboardAlertsTests(TestCase):
     def test_alertas_sem_autenticacao_retorna_401(self):
         response = self.client.get('/api/dashboard/alerts/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class DashboardBootstrapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = make_user(username='dashuser5', email='dash5@example.com')
+
+    def _authenticate_cookie(self):
+        self.client.cookies['access'] = str(AccessToken.for_user(self.user))
+
+    def test_bootstrap_retorna_todas_as_secoes(self):
+        self._authenticate_cookie()
+        response = self.client.get('/api/dashboard/bootstrap/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(set(data), {'stats', 'charts', 'recent_activity', 'alerts'})
+        self.assertEqual(len(data['charts']['monthlyRegistrations']), 6)
+
+    def test_bootstrap_sem_autenticacao_retorna_401(self):
+        response = self.client.get('/api/dashboard/bootstrap/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bootstrap_aceita_head(self):
+        self._authenticate_cookie()
+        response = self.client.head('/api/dashboard/bootstrap/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bootstrap_igual_aos_endpoints_individuais(self):
+        make_dashboard_data()
+        self._authenticate_cookie()
+        bootstrap = self.client.get('/api/dashboard/bootstrap/').json()
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(bootstrap['stats'], self.client.get('/api/dashboard/stats/').json())
+        self.assertEqual(bootstrap['charts'], self.client.get('/api/dashboard/charts/').json())
+        self.assertEqual(bootstrap['recent_activity'], self.client.get('/api/dashboard/recent-activity/').json())
+        self.assertEqual(bootstrap['alerts'], self.client.get('/api/dashboard/alerts/').json())
+        self.assertEqual(bootstrap['stats']['requests']['pending'], 1)
+        self.assertEqual(bootstrap['alerts'][0]['count'], 1)
+
+    def test_consultas_compartilhadas_entre_secoes(self):
+        make_dashboard_data()
+        with CaptureQueriesContext(connection) as separate:
+            for section in SECTIONS:
+                get_dashboard_data([section])
+        with CaptureQueriesContext(connection) as combined:
+            get_dashboard_data(list(SECTIONS))
+        self.assertLess(len(combined), len(separate))
+
+
+class StaleWhileRevalidateCacheTests(TestCase):
+    """
+    Cache stale-while-revalidate usado pelos endpoints do dashboard.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(side_effect=[1, 2, 3])
+
+    def _get(self, fresh_seconds=30):
+        return get_or_refresh('swr:test', self.compute, fresh_seconds=fresh_seconds, stale_seconds=60)
+
+    def test_valor_fresco_servido_do_cache(self):
+        self.assertEqual(self._get(), 1)
+        self.assertEqual(self._get(), 1)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_valor_vencido_servido_e_recalculado_uma_vez(self):
+        self._get()
+        # Vencido: devolve o valor antigo e recalcula (em linha dentro da transação do teste)
+        self.assertEqual(self._get(fresh_seconds=0), 1)
+        self.assertEqual(self._get(), 2)
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_recalculo_em_andamento_nao_dispara_outro(self):
+        self._get()
+        cache.add('swr:test' + LOCK_SUFFIX, 1, 30)
+        self.assertEqual(self._get(fresh_seconds=0), 1)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_cache_frio_aguarda_recalculo_concorrente(self):
+        cache.add('swr:test' + LOCK_SUFFIX, 1, 30)
+
+        def other_request_finishes(seconds):
+            cache.set('swr:test', {'value': 'calculado', 'computed_at': 0}, 60)
+
+        with mock.patch('core.caching.time.sleep', side_effect=other_request_finishes):
+            self.assertEqual(self._get(), 'calculado')
+        self.compute.assert_not_called()
+
+    def test_endpoints_compartilham_o_mesmo_recalculo(self):
+        client = APIClient()
+        client.force_authenticate(user=make_user(username='dashuser6', email='dash6@example.com'))
+        with mock.patch('dashboard.services.get_dashboard_data', wraps=get_dashboard_data) as compute:
+            for path in ('stats', 'charts', 'recent-activity', 'alerts'):
+                self.assertEqual(client.get(f'/api/dashboard/{path}/').status_code, status.HTTP_200_OK)
+        self.assertEqual(compute.call_count, 1)
+
+
+class ActivityEventTests(TestCase):
+    """
+    Registro de atividades alimentado pelos signals e servido por cursor.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = make_user(username='dashuser7', email='dash7@example.com', role='admin')
+        self.client.force_authenticate(user=self.user)
+
+    def test_criacao_registra_evento_com_nome_do_solicitante(self):
+        driver_request = make_dashboard_data()
+        event = ActivityEvent.objects.get(entity_type='driver_request')
+        self.assertEqual(event.entity_id, driver_request.id)
+        self.assertEqual(event.action, 'created')
+        self.assertEqual(event.description, 'Nova solicitação de motorista de Carlos Lima')
+
+    def test_mudanca_de_status_registra_evento(self):
+        driver_request = make_dashboard_data()
+        driver_request.status = 'aprovado'
+        driver_request.reviewed_by = self.user
+        driver_request.save()
+
+        event = ActivityEvent.objects.filter(entity_type='driver_request').first()
+        self.assertEqual(event.action, 'status_changed')
+        self.assertEqual(event.previous_status, 'em_analise')
+        self.assertEqual(event.status, 'aprovado')
+        self.assertEqual(event.actor, self.user)
+
+    def test_save_sem_mudanca_de_status_nao_registra(self):
+        driver_request = make_dashboard_data()
+        driver_request.save(update_fields=['viewed_at'])
+        DriverRequest.objects.get(pk=driver_request.pk).save()
+        self.assertEqual(ActivityEvent.objects.filter(entity_type='driver_request').count(), 1)
+
+    def test_atividade_recente_inclui_solicitacoes_de_veiculo(self):
+        make_dashboard_data()
+        vehicle_request = make_vehicle_request()
+        activities = self.client.get('/api/dashboard/recent-activity/').data
+        self.assertEqual(activities[0]['entity_type'], 'vehicle_request')
+        self.assertEqual(activities[0]['entity_id'], vehicle_request.id)
+        self.assertEqual(activities[0]['type'], 'request')
+        self.assertEqual(len(activities), 3)
+
+    def test_paginacao_por_cursor(self):
+        make_dashboard_data()
+        make_vehicle_request()
+        first = self.client.get('/api/dashboard/activity/', {'limit': 2}).data
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNotNone(first['next_cursor'])
+
+        second = self.client.get('/api/dashboard/activity/', {'limit': 2, 'cursor': first['next_cursor']}).data
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next_cursor'])
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(ids, list(ActivityEvent.objects.values_list('id', flat=True)))
+
+    def test_historico_de_um_registro(self):
+        complaint = make_complaint()
+        complaint.status = 'em_analise'
+        complaint.save()
+        make_dashboard_data()
+
+        response = self.client.get('/api/dashboard/activity/', {'entity_type': 'complaint', 'entity_id': complaint.id})
+        self.assertEqual([item['action'] for item in response.data['results']], ['status_changed', 'created'])
+
+    def test_parametros_invalidos_retornam_400(self):
+        for params in ({'cursor': 'invalido'}, {'entity_type': 'vehicle'}, {'entity_id': 'x'}):
+            response = self.client.get('/api/dashboard/activity/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class _PartitionCursor:
+    """Cursor do PostgreSQL simulado: registra o SQL e responde às consultas de verificação."""
+
+    def __init__(self, default_has_rows, failing):
+        self.default_has_rows = default_has_rows
+        self.failing = failing
+        self.executed = []
+        self._result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        from django.db import DatabaseError
+
+        self.executed.append(sql)
+        if any(name in sql for name in self.failing) and sql.startswith(('CREATE', 'ALTER')):
+            raise DatabaseError('updated partition constraint for default partition would be violated')
+        if sql.startswith('SELECT to_regclass'):
+            self._result = (None,)
+        elif sql.startswith('SELECT 1'):
+            self._result = (1,) if self.default_has_rows else None
+
+    def fetchone(self):
+        return self._result
+
+
+class ActivityPartitionTests(TestCase):
+    def partition_connection(self, default_has_rows=False, failing=()):
+        cursor = _PartitionCursor(default_has_rows, failing)
+        return mock.Mock(vendor='postgresql', alias='default', cursor=mock.Mock(return_value=cursor)), cursor
+
+    def test_tarefa_agendada_no_beat(self):
+        tasks = [entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()]
+        self.assertIn(create_activity_partitions.name, tasks)
+
+    def test_linhas_na_default_sao_movidas_antes_de_anexar(self):
+        fake_connection, cursor = self.partition_connection(default_has_rows=True)
+        created = ensure_partitions(months_ahead=0, connection=fake_connection)
+
+        self.assertEqual(len(created), 1)
+        statements = [sql.split(' (')[0] for sql in cursor.executed[2:]]
+        self.assertEqual(statements, [
+            f'CREATE TABLE {created[0]}',
+            'WITH moved AS',
+            f'ALTER TABLE dashboard_activityevent ATTACH PARTITION {created[0]} FOR VALUES FROM',
+        ])
+
+    def test_falha_em_um_mes_nao_impede_os_seguintes(self):
+        failing = partition_name(month_start(timezone.now()))
+        fake_connection, _ = self.partition_connection(failing=[failing])
+
+        with self.assertLogs('dashboard.partitions', level='ERROR'):
+            created = ensure_partitions(months_ahead=2, connection=fake_connection)
+
+        self.assertEqual(len(created), 2)
+        self.assertNotIn(failing, created)
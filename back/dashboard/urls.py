@@ -7,5 +7,7 @@ urlpatterns = [
     re_path(r'^stats/?$', views.dashboard_stats, name='dashboard-stats'),
     re_path(r'^charts/?$', views.dashboard_charts, name='dashboard-charts'),
     re_path(r'^recent-activity/?$', views.dashboard_recent_activity, name='dashboard-recent-activity'),
+    re_path(r'^activity/?$', views.dashboard_activity, name='dashboard-activity'),
     re_path(r'^alerts/?$', views.dashboard_alerts, name='dashboard-alerts'),
+    re_path(r'^bootstrap/?$', views.dashboard_bootstrap, name='dashboard-bootstrap'),
 ]
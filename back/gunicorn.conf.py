@@ -0,0 +1,56 @@
+"""
+Gunicorn servindo o ASGI com vários processos (HTTP e WebSockets):
+
+    gunicorn core.asgi:application -c gunicorn.conf.py
+
+- ``WEB_CONCURRENCY`` workers (padrão: um por núcleo), cada um com o próprio
+  event loop, pool de conexões do banco e executor de ``ASGI_THREADS`` threads
+  (ver ``core.workers``). Os WebSockets de todos os workers compartilham o
+  channel layer do Redis.
+- Reload sem queda: ``kill -HUP <master>`` (ou ``docker compose kill -s HUP
+  backend``) sobe workers novos com o código atual e encerra os antigos após
+  concluírem as requisições em andamento, em até ``GUNICORN_GRACEFUL_TIMEOUT``
+  segundos. Os WebSockets desses workers são fechados com o código 1012 e o
+  cliente reconecta, recebendo o que perdeu pelo replay (``last_event_id``).
+- Cada worker abre até ``DB_POOL_MAX_SIZE`` conexões: o total
+  ``WEB_CONCURRENCY x DB_POOL_MAX_SIZE`` precisa caber no ``max_connections``
+  do PostgreSQL (o valor é registrado ao iniciar).
+
+``manage.py loadtest_asgi --workers 1,2,4`` mede a vazão HTTP por número de
+workers com WebSockets conectados.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'core.workers.ASGIWorker'
+
+# Os workers assíncronos sinalizam que estão vivos pelo loop, mesmo com WebSockets abertos
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Reciclagem de workers (0 = desligada); derruba os WebSockets do worker reciclado
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Proxy (nginx) autorizado a informar X-Forwarded-For/Proto
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# O app é carregado em cada worker: pools do banco, Redis e threads não atravessam o fork
+preload_app = False
+
+
+def when_ready(server):
+    pool_size = os.getenv('DB_POOL_MAX_SIZE', '10')
+    server.log.info(
+        "%s workers ASGI, %s threads de executor e até %s conexões do banco por worker",
+        server.cfg.workers, os.getenv('ASGI_THREADS', '10'), pool_size,
+    )
+    if os.getenv('DB_POOL_ENABLED', 'True').lower() in ('true', '1', 'yes'):
+        server.log.info("Total de conexões do banco: até %d", server.cfg.workers * int(pool_size))
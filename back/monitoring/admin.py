@@ -0,0 +1,55 @@
+from django.contrib import admin
+from django.utils.html import format_html
+
+from .models import QueryExplain, QueryFingerprint
+
+
+class QueryExplainInline(admin.StackedInline):
+    model = QueryExplain
+    extra = 0
+    can_delete = False
+    fields = ['created_at', 'duration_ms', 'view', 'formatted_plan']
+    readonly_fields = fields
+
+    @admin.display(description='Plano de Execução')
+    def formatted_plan(self, obj):
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', obj.plan)
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(QueryFingerprint)
+class QueryFingerprintAdmin(admin.ModelAdmin):
+    """Consultas agregadas por fingerprint (somente leitura), das mais custosas às menos."""
+    list_display = [
+        'short_sql', 'calls', 'slow_calls', 'total_time_ms', 'average_time', 'max_time_ms',
+        'last_view', 'last_seen'
+    ]
+    list_filter = ['last_view']
+    search_fields = ['normalized_sql', 'last_view', 'fingerprint']
+    ordering = ['-total_time_ms']
+    readonly_fields = [
+        'fingerprint', 'formatted_sql', 'example_sql', 'calls', 'slow_calls', 'total_time_ms',
+        'average_time', 'max_time_ms', 'last_view', 'first_seen', 'last_seen'
+    ]
+    exclude = ['normalized_sql']
+    inlines = [QueryExplainInline]
+
+    @admin.display(description='SQL', ordering='normalized_sql')
+    def short_sql(self, obj):
+        return obj.normalized_sql[:120]
+
+    @admin.display(description='SQL Normalizado')
+    def formatted_sql(self, obj):
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', obj.normalized_sql)
+
+    @admin.display(description='Tempo Médio (ms)')
+    def average_time(self, obj):
+        return round(obj.average_time_ms, 2)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+    verbose_name = 'Monitoramento'
+
+    def ready(self):
+        """
+        Instala a captura de consultas lentas nas conexões ao banco.
+        """
+        from monitoring.slow_queries import install
+        install()
@@ -0,0 +1,128 @@
+import statistics
+import threading
+import time
+from copy import deepcopy
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+MODES = ('direct', 'persistent', 'pool')
+
+
+def _percentile(samples, percent):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark of the database connection lifecycle of a request: each iteration '
+        'acquires a connection, runs a query and releases it as request_finished does. '
+        'Compares a new connection per request (direct), CONN_MAX_AGE (persistent) and '
+        'the psycopg pool, reporting acquisitions per second, p50/p95 and new server connections'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--modes', default=','.join(MODES),
+                            help=f'Comma-separated subset of {", ".join(MODES)}')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Concurrent workers (sync view threads)')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Simulated requests per mode')
+        parser.add_argument('--pool-size', type=int, default=4,
+                            help='max_size of the pool in the pool mode')
+        parser.add_argument('--query', default='SELECT 1')
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown mode(s): {", ".join(sorted(unknown))}')
+        base = connections.settings[options['database']]
+        if 'pool' in modes and base['ENGINE'] != 'django.db.backends.postgresql':
+            raise CommandError('The pool mode requires PostgreSQL with psycopg 3')
+
+        self.stdout.write(
+            f'{"mode":<11} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"new conns":>10}'
+        )
+        for mode in modes:
+            result = self._run(mode, base, options)
+            self.stdout.write(
+                f'{mode:<11} {result["rate"]:>9.0f} {result["p50"]:>8.2f} {result["p95"]:>8.2f} '
+                f'{result["p99"]:>8.2f} {result["opened"]:>10}'
+            )
+
+    def _settings_for(self, mode, base, options):
+        settings_dict = deepcopy({key: value for key, value in base.items() if key != 'OPTIONS'})
+        options_dict = {key: value for key, value in base['OPTIONS'].items() if key != 'pool'}
+        settings_dict['CONN_MAX_AGE'] = None if mode == 'persistent' else 0
+        settings_dict['CONN_HEALTH_CHECKS'] = mode == 'persistent'
+        if mode == 'pool':
+            configured = base['OPTIONS'].get('pool')
+            pool = dict(configured) if isinstance(configured, dict) else {}
+            pool.update({'min_size': options['pool_size'], 'max_size': options['pool_size']})
+            options_dict['pool'] = pool
+        settings_dict['OPTIONS'] = options_dict
+        return settings_dict
+
+    def _run(self, mode, base, options):
+        backend = load_backend(base['ENGINE'])
+        settings_dict = self._settings_for(mode, base, options)
+        alias = f'benchmark_{mode}'
+        total = options['requests']
+        per_thread = [total // options['threads'] + (index < total % options['threads'])
+                      for index in range(options['threads'])]
+        latencies = []
+        lock = threading.Lock()
+        opened = [0]
+
+        def count_new_connection(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    opened[0] += 1
+
+        def worker(iterations):
+            conn = backend.DatabaseWrapper(deepcopy(settings_dict), alias)
+            samples = []
+            try:
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    conn.close_if_unusable_or_obsolete()  # request_started
+                    with conn.cursor() as cursor:
+                        cursor.execute(options['query'])
+                        cursor.fetchall()
+                    conn.close_if_unusable_or_obsolete()  # request_finished
+                    samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                conn.close()
+            with lock:
+                latencies.extend(samples)
+
+        connection_created.connect(count_new_connection)
+        threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread if count]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            elapsed = time.perf_counter() - started
+            connection_created.disconnect(count_new_connection)
+            if mode == 'pool':
+                # connection_created também é enviado a cada conexão emprestada do pool
+                wrapper = backend.DatabaseWrapper(settings_dict, alias)
+                opened[0] = wrapper.pool.get_stats().get('connections_num', 0)
+                wrapper.close_pool()
+
+        return {
+            'rate': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'opened': opened[0],
+        }
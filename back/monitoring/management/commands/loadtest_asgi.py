@@ -0,0 +1,338 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile(samples, percent):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+async def read_response(reader):
+    """Lê uma resposta HTTP/1.1 (Content-Length ou chunked); retorna (status, keep_alive)."""
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    lines = head.split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _http_load(host, port, request, connections, duration):
+    deadline = time.perf_counter() + duration
+    latencies = []
+    statuses = Counter()
+    errors = 0
+
+    async def connection():
+        nonlocal errors
+        writer = None
+        while time.perf_counter() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                started = time.perf_counter()
+                writer.write(request)
+                status, keep_alive = await read_response(reader)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] += 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                errors += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+                await asyncio.sleep(0.05)
+        if writer is not None:
+            writer.close()
+
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    return latencies, dict(statuses), errors
+
+
+def http_client(host, port, request, connections, duration):
+    """Executado em um processo do cliente: conexões keep-alive em um event loop."""
+    return asyncio.run(_http_load(host, port, request, connections, duration))
+
+
+class _Socket:
+    """Um WebSocket do teste: mede o round trip de ``subscribe`` e conta os broadcasts."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rtts = []
+        self.broadcasts = set()
+        self._pending = None
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for frame in self.connection:
+                message = json.loads(frame)
+                if message.get('type') == 'subscriptions' and self._pending and not self._pending.done():
+                    self._pending.set_result(time.perf_counter())
+                elif message.get('type') == 'counters.update' and 'loadtest' in message.get('counters', {}):
+                    self.broadcasts.add(message['counters']['loadtest'])
+        except Exception:
+            pass
+
+    @property
+    def is_open(self):
+        return self.connection.close_code is None
+
+    async def probe(self, timeout):
+        self._pending = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        try:
+            await self.connection.send(json.dumps({'action': 'subscribe', 'topics': []}))
+            finished = await asyncio.wait_for(self._pending, timeout)
+        except Exception:
+            return False
+        self.rtts.append((finished - started) * 1000)
+        return True
+
+    async def close(self):
+        await self.connection.close()
+        self._reader.cancel()
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test of the ASGI server: HTTP keep-alive clients on several processes while '
+        'WebSockets stay connected, answering probes and receiving channel layer broadcasts. '
+        'With --workers it starts gunicorn (gunicorn.conf.py) once per worker count to show '
+        'how HTTP throughput scales with cores; the server and the load generator are pinned '
+        'to separate cores so they do not compete for the CPU'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Server under test (ignored with --workers)')
+        parser.add_argument('--workers', help='Comma-separated worker counts to start locally, e.g. 1,2,4')
+        parser.add_argument('--path', default='/api/site/configuration/current/', help='HTTP endpoint to load')
+        parser.add_argument('--username', required=True,
+                            help='Existing user: its JWT authenticates the WebSockets and HTTP '
+                                 '(the anonymous per-IP throttle would cut the load)')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of load per run')
+        parser.add_argument('--connections', type=int, default=64, help='HTTP keep-alive connections')
+        parser.add_argument('--client-processes', type=int, default=max(1, multiprocessing.cpu_count() // 2),
+                            help='Processes generating HTTP load')
+        parser.add_argument('--client-cpus', type=int,
+                            help='Cores reserved for the load generator with --workers; gunicorn gets the '
+                                 'rest (default: half of the available cores)')
+        parser.add_argument('--websockets', type=int, default=50, help='WebSockets kept open during the run')
+        parser.add_argument('--broadcasts', type=int, default=5, help='group_send probes per run')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User {options["username"]} not found')
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            raise CommandError('The websockets package is required (see requirements.txt)')
+
+        self.user = user
+        self.token = str(AccessToken.for_user(user))
+
+        if options['workers']:
+            try:
+                counts = [int(count) for count in options['workers'].split(',') if count.strip()]
+            except ValueError:
+                raise CommandError('--workers must be a comma-separated list of integers')
+            runs = [(f'{count} workers', count) for count in counts]
+            self.server_cpus = self._pin_cpus(options['client_cpus'], max(counts))
+        else:
+            runs = [(options['url'], None)]
+
+        self.stdout.write(
+            f'{"server":<24} {"req/s":>9} {"speedup":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"errors":>7} {"ws open":>9} {"ws p95 ms":>10} {"broadcasts":>11}'
+        )
+        baseline = None
+        for label, workers in runs:
+            result = self._run(workers, options)
+            baseline = baseline or result['rate'] or None
+            speedup = result['rate'] / baseline if baseline else 0.0
+            self.stdout.write(
+                f'{label:<24} {result["rate"]:>9.0f} {speedup:>7.2f}x {result["p50"]:>8.2f} '
+                f'{result["p95"]:>8.2f} {result["p99"]:>8.2f} {result["errors"]:>7} '
+                f'{result["ws_open"]:>4}/{options["websockets"]:<4} {result["ws_p95"]:>10.2f} '
+                f'{result["broadcasts"]:>11}'
+            )
+            if result['statuses']:
+                self.stdout.write(f'{"":<24} status: {result["statuses"]}')
+
+    def _pin_cpus(self, client_cpus, max_workers):
+        """
+        Fixa este processo (e os clientes que ele cria) nos primeiros núcleos e
+        retorna os demais para o gunicorn; None se não há núcleos para separar.
+        """
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_setaffinity') else []
+        if len(cpus) < 2:
+            self.stderr.write(
+                'Warning: fewer than 2 cores available, the server and the load generator share the '
+                'CPU and the results do not show how throughput scales with cores'
+            )
+            return None
+
+        count = min(max(client_cpus or len(cpus) // 2, 1), len(cpus) - 1)
+        client, server = set(cpus[:count]), set(cpus[count:])
+        os.sched_setaffinity(0, client)
+        self.stdout.write(f'load generator cores: {sorted(client)}, server cores: {sorted(server)}')
+        if max_workers > len(server):
+            self.stderr.write(f'Warning: {max_workers} workers on {len(server)} server cores')
+        return server
+
+    def _run(self, workers, options):
+        if workers is None:
+            return asyncio.run(self._load(options['url'], options))
+
+        port = _free_port()
+        server = self._start_server(workers, port, options)
+        try:
+            return asyncio.run(self._load(f'http://127.0.0.1:{port}', options))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=40)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    def _start_server(self, workers, port, options):
+        output = None if options['verbosity'] > 1 else subprocess.DEVNULL
+        server_cpus = self.server_cpus
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'core.asgi:application', '-c', 'gunicorn.conf.py',
+             '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), stdout=output, stderr=output,
+            preexec_fn=(lambda: os.sched_setaffinity(0, server_cpus)) if server_cpus else None,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with code {server.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.kill()
+        raise CommandError(f'gunicorn did not start on port {port}')
+
+    async def _load(self, url, options):
+        from channels.layers import get_channel_layer
+        from websockets.asyncio.client import connect
+
+        from core.realtime import user_group
+
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise CommandError('Point --url at the ASGI server itself (plain HTTP), not at the TLS proxy')
+        host, port = parts.hostname, parts.port or 80
+        request = (
+            f'GET {options["path"]} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+            f'Cookie: access={self.token}\r\nConnection: keep-alive\r\n\r\n'
+        ).encode()
+
+        sockets = []
+        for _ in range(options['websockets']):
+            try:
+                connection = await connect(
+                    f'ws://{parts.netloc}/ws/requests/',
+                    origin=f'http://{parts.netloc}',
+                    additional_headers={'Cookie': f'access={self.token}'},
+                )
+            except Exception:
+                continue
+            sockets.append(_Socket(connection))
+
+        processes = max(1, options['client_processes'])
+        per_process = [options['connections'] // processes + (index < options['connections'] % processes)
+                       for index in range(processes)]
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as executor:
+            clients = [
+                loop.run_in_executor(executor, http_client, host, port, request, count, options['duration'])
+                for count in per_process if count
+            ]
+            sent = await self._probe_websockets(sockets, get_channel_layer(), user_group(self.user.id), options)
+            results = await asyncio.gather(*clients)
+
+        await asyncio.sleep(1)
+        latencies, statuses, errors = [], Counter(), 0
+        for client_latencies, client_statuses, client_errors in results:
+            latencies.extend(client_latencies)
+            statuses.update(client_statuses)
+            errors += client_errors
+        rtts = [rtt for sock in sockets for rtt in sock.rtts]
+        ws_open = sum(sock.is_open for sock in sockets)
+        delivered = sum(len(sock.broadcasts & sent) for sock in sockets)
+        for sock in sockets:
+            await sock.close()
+
+        return {
+            'rate': len(latencies) / options['duration'],
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'errors': errors + sum(count for status, count in statuses.items() if status >= 500),
+            'statuses': dict(sorted(statuses.items())),
+            'ws_open': ws_open,
+            'ws_p95': _percentile(rtts, 95),
+            'broadcasts': f'{delivered}/{len(sent) * len(sockets)}',
+        }
+
+    async def _probe_websockets(self, sockets, channel_layer, group, options):
+        """Durante a carga: um probe por socket a cada segundo e ``--broadcasts`` group_send."""
+        deadline = time.perf_counter() + options['duration']
+        interval = options['duration'] / (options['broadcasts'] + 1)
+        next_broadcast = time.perf_counter() + interval
+        sent = set()
+        while time.perf_counter() < deadline:
+            await asyncio.gather(*(sock.probe(timeout=5) for sock in sockets if sock.is_open))
+            if len(sent) < options['broadcasts'] and time.perf_counter() >= next_broadcast:
+                sequence = len(sent) + 1
+                await channel_layer.group_send(group, {'type': 'counters.update', 'counters': {'loadtest': sequence}})
+                sent.add(sequence)
+                next_broadcast += interval
+            await asyncio.sleep(1)
+        return sent
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,70 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def load_spans(path):
+    spans = defaultdict(list)
+    with open(path, encoding='utf-8') as stream:
+        for line in stream:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            spans[span['trace_id']].append(span)
+    return spans
+
+
+class Command(BaseCommand):
+    help = (
+        'Inspect the spans written by the file trace exporter: lists the latest traces, '
+        'or prints the span tree of one trace with --trace-id'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trace-id', help='Trace to print as a tree')
+        parser.add_argument('--file', help='Span file (defaults to TRACING_FILE)')
+        parser.add_argument('--limit', type=int, default=20, help='Traces listed without --trace-id')
+
+    def handle(self, *args, **options):
+        path = options['file'] or getattr(settings, 'TRACING_FILE', None)
+        try:
+            traces = load_spans(path)
+        except (OSError, TypeError) as exc:
+            raise CommandError(f'Cannot read spans from {path}: {exc}')
+
+        if options['trace_id']:
+            spans = traces.get(options['trace_id'])
+            if not spans:
+                raise CommandError(f'Trace {options["trace_id"]} not found in {path}')
+            self._print_tree(spans)
+            return
+
+        latest = sorted(traces.values(), key=lambda spans: min(span['start'] for span in spans), reverse=True)
+        for spans in latest[:options['limit']]:
+            root = self._root(spans)
+            self.stdout.write(
+                f'{root["trace_id"]}  {root["start"]}  {root["duration_ms"]:>10.2f}ms  '
+                f'{len(spans):>3} spans  {root["name"]}'
+            )
+
+    def _root(self, spans):
+        ids = {span['span_id'] for span in spans}
+        orphans = [span for span in spans if span['parent_id'] not in ids]
+        return min(orphans or spans, key=lambda span: span['start'])
+
+    def _print_tree(self, spans):
+        ids = {span['span_id'] for span in spans}
+        children = defaultdict(list)
+        for span in spans:
+            children[span['parent_id'] if span['parent_id'] in ids else None].append(span)
+
+        def walk(parent_id, depth):
+            for span in sorted(children[parent_id], key=lambda span: span['start']):
+                status = '' if span['status'] == 'ok' else f'  [{span["status"]}]'
+                self.stdout.write(f'{"  " * depth}{span["name"]}  {span["duration_ms"]:.2f}ms  ({span["kind"]}){status}')
+                walk(span['span_id'], depth + 1)
+
+        walk(None, 0)
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-18 23:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True, verbose_name='Fingerprint')),
+                ('normalized_sql', models.TextField(verbose_name='SQL Normalizado')),
+                ('example_sql', models.TextField(help_text='Texto da consulta com os parâmetros como placeholders', verbose_name='Exemplo de SQL')),
+                ('calls', models.BigIntegerField(default=0, verbose_name='Execuções')),
+                ('slow_calls', models.BigIntegerField(default=0, verbose_name='Execuções Lentas')),
+                ('total_time_ms', models.FloatField(default=0, verbose_name='Tempo Total (ms)')),
+                ('max_time_ms', models.FloatField(default=0, verbose_name='Maior Tempo (ms)')),
+                ('last_view', models.CharField(blank=True, default='', max_length=200, verbose_name='Última View')),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Primeira Ocorrência')),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Última Ocorrência')),
+            ],
+            options={
+                'verbose_name': 'Consulta SQL',
+                'verbose_name_plural': 'Consultas SQL',
+                'db_table': 'query_fingerprints',
+                'ordering': ['-total_time_ms'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QueryExplain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration_ms', models.FloatField(verbose_name='Duração Observada (ms)')),
+                ('plan', models.TextField(verbose_name='Plano de Execução')),
+                ('view', models.CharField(blank=True, default='', max_length=200, verbose_name='View')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data da Amostra')),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='explains', to='monitoring.queryfingerprint', verbose_name='Consulta')),
+            ],
+            options={
+                'verbose_name': 'Plano de Execução',
+                'verbose_name_plural': 'Planos de Execução',
+                'db_table': 'query_explains',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
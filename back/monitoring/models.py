@@ -0,0 +1,109 @@
+from django.db import models
+from django.utils import timezone
+
+
+class QueryFingerprint(models.Model):
+    """
+    Agregado de tempo por formato de consulta SQL.
+
+    Consultas que diferem apenas nos valores (literais, parâmetros, listas de
+    ``IN``) compartilham o mesmo ``fingerprint``. Os números são acumulados em
+    memória por ``monitoring.slow_queries`` e somados aqui periodicamente.
+    """
+
+    fingerprint = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name='Fingerprint'
+    )
+    normalized_sql = models.TextField(
+        verbose_name='SQL Normalizado'
+    )
+    example_sql = models.TextField(
+        verbose_name='Exemplo de SQL',
+        help_text='Texto da consulta com os parâmetros como placeholders'
+    )
+    calls = models.BigIntegerField(
+        default=0,
+        verbose_name='Execuções'
+    )
+    slow_calls = models.BigIntegerField(
+        default=0,
+        verbose_name='Execuções Lentas'
+    )
+    total_time_ms = models.FloatField(
+        default=0,
+        verbose_name='Tempo Total (ms)'
+    )
+    max_time_ms = models.FloatField(
+        default=0,
+        verbose_name='Maior Tempo (ms)'
+    )
+    last_view = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        verbose_name='Última View'
+    )
+    first_seen = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Primeira Ocorrência'
+    )
+    last_seen = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Última Ocorrência'
+    )
+
+    class Meta:
+        db_table = 'query_fingerprints'
+        verbose_name = 'Consulta SQL'
+        verbose_name_plural = 'Consultas SQL'
+        ordering = ['-total_time_ms']
+
+    def __str__(self):
+        return self.normalized_sql[:80]
+
+    @property
+    def average_time_ms(self):
+        return self.total_time_ms / self.calls if self.calls else 0
+
+
+class QueryExplain(models.Model):
+    """
+    Plano de execução amostrado de uma execução lenta.
+
+    Os parâmetros da consulta não são gravados (podem conter dados pessoais);
+    apenas o plano e a duração observada.
+    """
+
+    fingerprint = models.ForeignKey(
+        QueryFingerprint,
+        on_delete=models.CASCADE,
+        related_name='explains',
+        verbose_name='Consulta'
+    )
+    duration_ms = models.FloatField(
+        verbose_name='Duração Observada (ms)'
+    )
+    plan = models.TextField(
+        verbose_name='Plano de Execução'
+    )
+    view = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        verbose_name='View'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Data da Amostra'
+    )
+
+    class Meta:
+        db_table = 'query_explains'
+        verbose_name = 'Plano de Execução'
+        verbose_name_plural = 'Planos de Execução'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.fingerprint_id} ({self.duration_ms:.1f} ms)'
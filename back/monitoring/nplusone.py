@@ -0,0 +1,154 @@
+"""
+Detector de N+1: a mesma consulta (mesmo fingerprint) repetida dentro de uma
+requisição.
+
+``NPlusOneMiddleware`` observa os ``SELECT`` de cada requisição conforme
+``N_PLUS_ONE_DETECTION``:
+- ``'off'``: nada é medido (padrão em produção);
+- ``'log'``: registra um aviso (padrão com ``DEBUG``);
+- ``'raise'``: levanta ``NPlusOneError`` ao fim da requisição (testes, ver
+  ``monitoring.testing.NPlusOneTestCase``).
+
+Um fingerprint repetido ``N_PLUS_ONE_THRESHOLD`` vezes é uma violação. No
+momento em que isso acontece a pilha é inspecionada para apontar o serializer e
+o campo que dispararam a consulta (ou a linha do código do projeto).
+"""
+import logging
+import sys
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .slow_queries import fingerprint_sql
+
+logger = logging.getLogger(__name__)
+
+_detector = ContextVar('nplusone_detector', default=None)
+
+_LIBRARY_PATHS = ('/django/', '/rest_framework/', '/asgiref/', '/site-packages/', '/monitoring/', '/core/metrics')
+
+
+class NPlusOneError(AssertionError):
+    """Consultas repetidas detectadas no modo ``'raise'``."""
+
+
+def detection_mode():
+    return getattr(settings, 'N_PLUS_ONE_DETECTION', 'log' if settings.DEBUG else 'off')
+
+
+def _query_origin():
+    """Serializer/campo (ou linha do projeto) que está executando a consulta."""
+    from rest_framework.serializers import BaseSerializer
+
+    frame = sys._getframe(2)
+    project_line = None
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'to_representation' and 'field' in frame.f_locals:
+            serializer = frame.f_locals.get('self')
+            if isinstance(serializer, BaseSerializer):
+                return f'{type(serializer).__name__}.{frame.f_locals["field"].field_name}'
+        if project_line is None and not any(path in code.co_filename for path in _LIBRARY_PATHS):
+            project_line = f'{code.co_filename}:{frame.f_lineno} ({code.co_name})'
+        frame = frame.f_back
+    return project_line or 'desconhecida'
+
+
+class NPlusOneDetector:
+    """Conta os ``SELECT`` por fingerprint enquanto está ativo (context manager)."""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, 'N_PLUS_ONE_THRESHOLD', 3)
+        self.counts = Counter()
+        self.violations = {}
+        self._token = None
+
+    def __enter__(self):
+        install()
+        self._token = _detector.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _detector.reset(self._token)
+        return False
+
+    def record(self, sql):
+        if not sql.lstrip()[:6].upper() == 'SELECT':
+            return
+        fingerprint, normalized = fingerprint_sql(sql)
+        self.counts[fingerprint] += 1
+        if self.counts[fingerprint] == self.threshold:
+            self.violations[fingerprint] = {'sql': normalized, 'origin': _query_origin()}
+
+    def report(self):
+        """Descrição das violações, uma por linha (vazia se não houver)."""
+        return '\n'.join(
+            f'{self.counts[fingerprint]}x em {violation["origin"]}: {violation["sql"][:300]}'
+            for fingerprint, violation in self.violations.items()
+        )
+
+
+def _detect(execute, sql, params, many, context):
+    detector = _detector.get()
+    if detector is not None and not many:
+        detector.record(sql)
+    return execute(sql, params, many, context)
+
+
+def _install_on(conn):
+    if _detect not in conn.execute_wrappers:
+        conn.execute_wrappers.append(_detect)
+
+
+def _install_on_new_connection(sender, connection, **kwargs):
+    _install_on(connection)
+
+
+def install():
+    connection_created.connect(_install_on_new_connection, dispatch_uid='monitoring.nplusone')
+    for conn in connections.all(initialized_only=True):
+        _install_on(conn)
+
+
+class NPlusOneMiddleware:
+    """Aplica o detector a cada requisição conforme ``N_PLUS_ONE_DETECTION``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = detection_mode()
+        if mode == 'off':
+            return self.get_response(request)
+        with NPlusOneDetector() as detector:
+            response = self.get_response(request)
+        self._handle(request, detector, mode)
+        return response
+
+    async def __acall__(self, request):
+        mode = detection_mode()
+        if mode == 'off':
+            return await self.get_response(request)
+        with NPlusOneDetector() as detector:
+            response = await self.get_response(request)
+        self._handle(request, detector, mode)
+        return response
+
+    def _handle(self, request, detector, mode):
+        if not detector.violations:
+            return
+        report = detector.report()
+        if mode == 'raise':
+            raise NPlusOneError(f'Consultas N+1 em {request.method} {request.path}:\n{report}')
+        logger.warning("Consultas N+1 em %s %s:\n%s", request.method, request.path, report)
@@ -0,0 +1,286 @@
+"""
+Captura de consultas SQL por fingerprint, com amostragem de EXPLAIN das lentas.
+
+Um ``execute_wrapper`` instalado em todas as conexões mede cada consulta e
+acumula, em memória, execuções e tempos por fingerprint (o SQL com literais,
+parâmetros e listas de ``IN``/``VALUES`` normalizados). Uma thread por processo
+soma esses agregados em ``QueryFingerprint`` a cada ``SLOW_QUERY_FLUSH_SECONDS``.
+
+Quando um ``SELECT`` passa de ``SLOW_QUERY_THRESHOLD_MS``, o plano é amostrado
+em segundo plano (``EXPLAIN (ANALYZE, BUFFERS)`` no PostgreSQL, dentro de uma
+transação desfeita) no máximo uma vez por fingerprint a cada
+``SLOW_QUERY_EXPLAIN_INTERVAL`` segundos, e gravado em ``QueryExplain``.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from core.structured_logging import request_context
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_LOCK_KEY = 'slowquery:explain:{fingerprint}'
+
+_STRING = re.compile(r"'(?:''|[^'])*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUES = re.compile(r'(VALUES\s*)\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))*', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+# Threads da captura (flush e EXPLAIN) não medem as próprias consultas
+_local = threading.local()
+
+
+@lru_cache(maxsize=4096)
+def fingerprint_sql(sql):
+    """Retorna ``(fingerprint, sql_normalizado)`` de uma consulta."""
+    normalized = _STRING.sub('?', sql)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _LIST.sub('(...)', normalized)
+    normalized = _VALUES.sub(r'\1(...)', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    return hashlib.md5(normalized.encode()).hexdigest(), normalized
+
+
+def _current_view():
+    context = request_context.get()
+    return (context or {}).get('view') or ''
+
+
+def _as_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def _explainable(sql):
+    head = sql.lstrip()[:6].upper()
+    return head == 'SELECT' and 'FOR UPDATE' not in sql.upper()
+
+
+class QueryStatsCollector:
+    """Agregados por fingerprint ainda não gravados no banco."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pid = None
+        self._explain_executor = None
+
+    def record(self, sql, params, many, duration_ms, alias):
+        fingerprint, normalized = fingerprint_sql(sql)
+        threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200)
+        slow = duration_ms >= threshold
+        view = _current_view()
+        now = time.time()
+
+        self._ensure_flusher()
+        with self._lock:
+            entry = self._pending.get(fingerprint)
+            if entry is None:
+                entry = self._pending[fingerprint] = {
+                    'normalized_sql': normalized,
+                    'example_sql': sql,
+                    'calls': 0,
+                    'slow_calls': 0,
+                    'total_time_ms': 0.0,
+                    'max_time_ms': 0.0,
+                    'first_seen': now,
+                }
+            entry['calls'] += 1
+            entry['slow_calls'] += slow
+            entry['total_time_ms'] += duration_ms
+            entry['max_time_ms'] = max(entry['max_time_ms'], duration_ms)
+            entry['last_seen'] = now
+            if view:
+                entry['last_view'] = view
+
+        if slow and not many and _explainable(sql):
+            self._maybe_explain(fingerprint, normalized, sql, params, alias, duration_ms, view)
+
+    def _maybe_explain(self, fingerprint, normalized, sql, params, alias, duration_ms, view):
+        interval = getattr(settings, 'SLOW_QUERY_EXPLAIN_INTERVAL', 600)
+        if interval <= 0 or not cache.add(EXPLAIN_LOCK_KEY.format(fingerprint=fingerprint), 1, interval):
+            return
+        self._explain_executor.submit(
+            _explain_in_background, fingerprint, normalized, sql, params, alias, duration_ms, view
+        )
+
+    def _ensure_flusher(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Após um fork, os agregados herdados pertencem ao processo pai
+            self._pending = {}
+            self._pid = os.getpid()
+            self._explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+            interval = getattr(settings, 'SLOW_QUERY_FLUSH_SECONDS', 30)
+            if interval > 0:
+                threading.Thread(
+                    target=self._flush_loop, args=(interval,), name='slow-query-flush', daemon=True
+                ).start()
+
+    def _flush_loop(self, interval):
+        pid = os.getpid()
+        _local.disabled = True
+        while self._pid == pid:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.warning("Falha ao gravar os agregados de consultas", exc_info=True)
+            finally:
+                connection.close()
+
+    def flush(self):
+        """Soma os agregados pendentes em ``QueryFingerprint``; retorna quantos foram gravados."""
+        from .models import QueryFingerprint
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for fingerprint, entry in pending.items():
+            changes = {
+                'calls': F('calls') + entry['calls'],
+                'slow_calls': F('slow_calls') + entry['slow_calls'],
+                'total_time_ms': F('total_time_ms') + entry['total_time_ms'],
+                'max_time_ms': Greatest(F('max_time_ms'), Value(entry['max_time_ms'])),
+                'last_seen': _as_datetime(entry['last_seen']),
+            }
+            if entry.get('last_view'):
+                changes['last_view'] = entry['last_view']
+
+            if QueryFingerprint.objects.filter(fingerprint=fingerprint).update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    QueryFingerprint.objects.create(
+                        fingerprint=fingerprint,
+                        normalized_sql=entry['normalized_sql'],
+                        example_sql=entry['example_sql'],
+                        calls=entry['calls'],
+                        slow_calls=entry['slow_calls'],
+                        total_time_ms=entry['total_time_ms'],
+                        max_time_ms=entry['max_time_ms'],
+                        last_view=entry.get('last_view', ''),
+                        first_seen=_as_datetime(entry['first_seen']),
+                        last_seen=_as_datetime(entry['last_seen']),
+                    )
+            except IntegrityError:
+                # Outro processo criou o registro entre o update e o create
+                QueryFingerprint.objects.filter(fingerprint=fingerprint).update(**changes)
+        return len(pending)
+
+
+_collector = QueryStatsCollector()
+
+
+def get_collector():
+    return _collector
+
+
+def _explain_prefix(vendor):
+    if vendor == 'postgresql':
+        return 'EXPLAIN (ANALYZE, BUFFERS) '
+    if vendor == 'sqlite':
+        return 'EXPLAIN QUERY PLAN '
+    return 'EXPLAIN '
+
+
+def run_explain(fingerprint, normalized, sql, params, alias, duration_ms, view=''):
+    """Executa o EXPLAIN da consulta e grava o plano (roda fora da requisição)."""
+    from .models import QueryExplain, QueryFingerprint
+
+    _local.disabled = True
+    conn = connections[alias]
+    try:
+        with transaction.atomic(using=alias):
+            with conn.cursor() as cursor:
+                if conn.vendor == 'postgresql':
+                    cursor.execute(
+                        'SET LOCAL statement_timeout = %s',
+                        [getattr(settings, 'SLOW_QUERY_EXPLAIN_TIMEOUT_MS', 5000)]
+                    )
+                cursor.execute(_explain_prefix(conn.vendor) + sql, params)
+                rows = cursor.fetchall()
+            # ANALYZE executa a consulta: nada do que ela fizer é mantido
+            transaction.set_rollback(True, using=alias)
+
+        plan = '\n'.join(str(row[-1]) for row in rows)
+        query, _ = QueryFingerprint.objects.get_or_create(
+            fingerprint=fingerprint,
+            defaults={'normalized_sql': normalized, 'example_sql': sql}
+        )
+        QueryExplain.objects.create(fingerprint=query, duration_ms=duration_ms, plan=plan, view=view)
+
+        keep = getattr(settings, 'SLOW_QUERY_EXPLAINS_PER_QUERY', 5)
+        stale = query.explains.order_by('-created_at').values_list('pk', flat=True)[keep:]
+        QueryExplain.objects.filter(pk__in=list(stale)).delete()
+    except Exception:
+        logger.warning("Falha ao obter o EXPLAIN da consulta %s", fingerprint, exc_info=True)
+    finally:
+        _local.disabled = False
+
+
+def _explain_in_background(*args):
+    try:
+        run_explain(*args)
+    finally:
+        # Thread do executor: não manter conexão aberta entre amostras esporádicas
+        connections[args[4]].close()
+
+
+def capture_query(execute, sql, params, many, context):
+    if getattr(_local, 'disabled', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        try:
+            _collector.record(
+                sql, params, many, (time.perf_counter() - started) * 1000, context['connection'].alias
+            )
+        except Exception:
+            logger.debug("Falha ao registrar a consulta", exc_info=True)
+
+
+def install_on(conn):
+    if capture_query not in conn.execute_wrappers:
+        conn.execute_wrappers.append(capture_query)
+
+
+def _install_on_new_connection(sender, connection, **kwargs):
+    install_on(connection)
+
+
+def install():
+    """Ativa a captura nas conexões atuais e nas criadas depois (``SLOW_QUERY_CAPTURE_ENABLED``)."""
+    if not getattr(settings, 'SLOW_QUERY_CAPTURE_ENABLED', True):
+        return
+    connection_created.connect(_install_on_new_connection, dispatch_uid='monitoring.slow_queries')
+    for conn in connections.all(initialized_only=True):
+        install_on(conn)
+
+
+def uninstall():
+    """Desativa a captura (ex.: nos testes, ver ``monitoring.testing``)."""
+    connection_created.disconnect(dispatch_uid='monitoring.slow_queries')
+    for conn in connections.all(initialized_only=True):
+        if capture_query in conn.execute_wrappers:
+            conn.execute_wrappers.remove(capture_query)
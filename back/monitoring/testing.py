@@ -0,0 +1,49 @@
+"""
+Apoio aos testes do projeto.
+
+``MonitoringTestRunner`` desativa a captura global de consultas lentas: a thread
+de flush gravaria ``QueryFingerprint`` na própria conexão, fora da transação dos
+testes. Os testes da captura a instalam com um coletor próprio.
+
+``NPlusOneTestCase`` falha com consultas N+1 (ver ``monitoring.nplusone``): toda
+requisição feita pelo cliente de teste passa pelo ``NPlusOneMiddleware`` no modo
+``'raise'``; código chamado diretamente (ex.: um serializer) pode ser
+verificado com ``assertNoNPlusOne``.
+"""
+from contextlib import contextmanager
+
+from django.test import TestCase, override_settings
+from django.test.runner import DiscoverRunner
+
+from .nplusone import NPlusOneDetector, NPlusOneError
+from .slow_queries import uninstall as uninstall_query_capture
+
+
+class MonitoringTestRunner(DiscoverRunner):
+    """Runner padrão sem a captura global de consultas (``TEST_RUNNER``)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        uninstall_query_capture()
+
+
+class NPlusOneTestMixin:
+    """Ativa a detecção de N+1 no modo ``'raise'`` para a classe de teste."""
+
+    @classmethod
+    def setUpClass(cls):
+        override = override_settings(N_PLUS_ONE_DETECTION='raise')
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        super().setUpClass()
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None):
+        with NPlusOneDetector(threshold) as detector:
+            yield detector
+        if detector.violations:
+            raise NPlusOneError(f'Consultas N+1:\n{detector.report()}')
+
+
+class NPlusOneTestCase(NPlusOneTestMixin, TestCase):
+    pass
@@ -0,0 +1,335 @@
+"""
+Testes do app monitoring: fingerprint de consultas, agregados, EXPLAIN amostrado
+detecção de N+1 e leitura dos traces exportados.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from requests.models import DriverRequest
+from requests.serializers import DriverRequestListSerializer
+
+from .models import QueryExplain, QueryFingerprint
+from .nplusone import NPlusOneError, NPlusOneMiddleware, _detector
+from .slow_queries import QueryStatsCollector, capture_query, fingerprint_sql, install_on, run_explain
+from .testing import NPlusOneTestCase
+
+
+class FingerprintTests(TestCase):
+    def test_consultas_que_diferem_nos_valores_compartilham_fingerprint(self):
+        a, normalized = fingerprint_sql(
+            "SELECT * FROM conductors WHERE name LIKE '%ana%' AND id IN (%s, %s, %s) LIMIT 21"
+        )
+        b, _ = fingerprint_sql(
+            "SELECT *  FROM conductors\nWHERE name LIKE '%jo''ao%' AND id IN (%s) LIMIT 5"
+        )
+        self.assertEqual(a, b)
+        self.assertEqual(normalized, 'SELECT * FROM conductors WHERE name LIKE ? AND id IN (...) LIMIT ?')
+
+    def test_identificadores_com_digitos_sao_preservados(self):
+        _, normalized = fingerprint_sql('SELECT "t1"."id" FROM "table2" "t1" WHERE "t1"."n" = 10')
+        self.assertEqual(normalized, 'SELECT "t1"."id" FROM "table2" "t1" WHERE "t1"."n" = ?')
+
+    def test_insert_em_lote_agrupa_values(self):
+        a, _ = fingerprint_sql('INSERT INTO x (a, b) VALUES (%s, %s), (%s, %s)')
+        b, _ = fingerprint_sql('INSERT INTO x (a, b) VALUES (%s, %s)')
+        self.assertEqual(a, b)
+
+
+@override_settings(SLOW_QUERY_FLUSH_SECONDS=0)
+class SlowQueryCaptureTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Coletor próprio, instalado só nesta conexão (o runner desativa a captura global)
+        self.collector = QueryStatsCollector()
+        self.collector._ensure_flusher()
+        patcher = mock.patch('monitoring.slow_queries._collector', self.collector)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        install_on(connection)
+        self.addCleanup(connection.execute_wrappers.remove, capture_query)
+
+    def _fingerprint(self, queryset):
+        sql, _ = queryset.query.sql_with_params()
+        return fingerprint_sql(sql)[0]
+
+    def test_agregados_sao_somados_por_fingerprint(self):
+        list(User.objects.filter(username='ana'))
+        list(User.objects.filter(username='joao'))
+        self.assertEqual(self.collector.flush(), 1)
+
+        query = QueryFingerprint.objects.get(fingerprint=self._fingerprint(User.objects.filter(username='ana')))
+        self.assertEqual(query.calls, 2)
+        self.assertEqual(query.slow_calls, 0)
+        self.assertGreaterEqual(query.max_time_ms, 0)
+
+        list(User.objects.filter(username='maria'))
+        self.collector.flush()
+        query.refresh_from_db()
+        self.assertEqual(query.calls, 3)
+
+    def test_consulta_lenta_amostra_explain_uma_vez(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0), mock.patch.object(
+            self.collector._explain_executor, 'submit', side_effect=lambda func, *args: run_explain(*args)
+        ):
+            list(User.objects.filter(email='a@example.com'))
+            list(User.objects.filter(email='b@example.com'))
+
+        explains = QueryExplain.objects.filter(
+            fingerprint__fingerprint=self._fingerprint(User.objects.filter(email='a@example.com'))
+        )
+        self.assertEqual(explains.count(), 1)
+        self.assertTrue(explains.get().plan)
+        self.assertEqual(explains.get().fingerprint.slow_calls, 0)  # agregados só no flush
+
+    def test_apenas_select_e_explicado(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0), \
+                mock.patch.object(self.collector._explain_executor, 'submit') as submit:
+            User.objects.filter(username='ninguem').update(first_name='x')
+        submit.assert_not_called()
+
+
+@override_settings(SLOW_QUERY_FLUSH_SECONDS=0)
+class QueryFingerprintAdminTests(TestCase):
+    def setUp(self):
+        collector = QueryStatsCollector()
+        install_on(connection)
+        try:
+            with mock.patch('monitoring.slow_queries._collector', collector):
+                list(User.objects.filter(username='ana'))
+        finally:
+            connection.execute_wrappers.remove(capture_query)
+        collector.flush()
+        sql, _ = User.objects.filter(username='ana').query.sql_with_params()
+        self.fingerprint = fingerprint_sql(sql)[0]
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'RootPass123!')
+        self.client.force_login(self.admin)
+
+    def test_lista_e_detalhe_renderizam(self):
+        response = self.client.get('/admin/monitoring/queryfingerprint/')
+        self.assertEqual(response.status_code, 200)
+        query = QueryFingerprint.objects.get(fingerprint=self.fingerprint)
+        response = self.client.get(f'/admin/monitoring/queryfingerprint/{query.pk}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'SQL Normalizado')
+
+
+class NPlusOneDetectionTests(NPlusOneTestCase):
+    def setUp(self):
+        for index in range(3):
+            reviewer = User.objects.create_user(username=f'revisor{index}', password='RevisorPass123!')
+            DriverRequest.objects.create(
+                name=f'Motorista {index}', cpf=f'0000000000{index}', email=f'm{index}@example.com',
+                phone='(11) 90000-0000', license_number=f'1234567890{index}', license_category='B',
+                birth_date='1990-01-01', license_expiry_date='2030-01-01', status='aprovado',
+                reviewed_by=reviewer
+            )
+
+    def serialize(self, queryset):
+        return DriverRequestListSerializer(queryset, many=True).data
+
+    def test_campo_do_serializer_e_apontado_como_origem(self):
+        with self.assertRaises(NPlusOneError) as raised:
+            with self.assertNoNPlusOne():
+                self.serialize(DriverRequest.objects.all())
+        self.assertIn('3x em DriverRequestListSerializer.reviewed_by', str(raised.exception))
+
+    def test_select_related_elimina_a_violacao(self):
+        with self.assertNoNPlusOne() as detector:
+            self.serialize(DriverRequest.objects.select_related('reviewed_by', 'conductor'))
+        self.assertEqual(detector.violations, {})
+
+    def test_limite_configuravel(self):
+        with self.assertNoNPlusOne(threshold=4) as detector:
+            self.serialize(DriverRequest.objects.all())
+        self.assertEqual(detector.counts.most_common(1)[0][1], 3)
+
+    @override_settings(N_PLUS_ONE_DETECTION='log')
+    def test_middleware_no_modo_log_registra_aviso(self):
+        def view(request):
+            self.serialize(DriverRequest.objects.all())
+            return HttpResponse()
+
+        middleware = NPlusOneMiddleware(view)
+        with self.assertLogs('monitoring.nplusone', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/api/requests/drivers/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('GET /api/requests/drivers/', logs.output[0])
+        self.assertIn('DriverRequestListSerializer.reviewed_by', logs.output[0])
+
+    @override_settings(N_PLUS_ONE_DETECTION='off')
+    def test_middleware_desligado_nao_mede(self):
+        def view(request):
+            self.assertIsNone(_detector.get())
+            return HttpResponse()
+
+        NPlusOneMiddleware(view)(RequestFactory().get('/'))
+
+
+class TracesCommandTests(TestCase):
+    def setUp(self):
+        spans = [
+            {'trace_id': 'a' * 32, 'span_id': '1' * 16, 'parent_id': 'f' * 16, 'name': 'HTTP POST driver-request-list',
+             'kind': 'server', 'start': '2026-01-01T10:00:00+00:00', 'duration_ms': 42.5, 'status': 'ok', 'attributes': {}},
+            {'trace_id': 'a' * 32, 'span_id': '2' * 16, 'parent_id': '1' * 16, 'name': 'channels group_send',
+             'kind': 'producer', 'start': '2026-01-01T10:00:00.010000+00:00', 'duration_ms': 3.1, 'status': 'ok', 'attributes': {}},
+            {'trace_id': 'a' * 32, 'span_id': '3' * 16, 'parent_id': '2' * 16, 'name': 'channels new_request',
+             'kind': 'consumer', 'start': '2026-01-01T10:00:00.020000+00:00', 'duration_ms': 1.2, 'status': 'error', 'attributes': {}},
+            {'trace_id': 'b' * 32, 'span_id': '4' * 16, 'parent_id': None, 'name': 'HTTP GET',
+             'kind': 'server', 'start': '2026-01-01T11:00:00+00:00', 'duration_ms': 5.0, 'status': 'ok', 'attributes': {}},
+        ]
+        self.file = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+        self.file.write('\n'.join(json.dumps(span) for span in spans) + '\nlinha truncada')
+        self.file.close()
+        self.addCleanup(os.remove, self.file.name)
+
+    def run_command(self, *args):
+        output = StringIO()
+        call_command('traces', '--file', self.file.name, *args, stdout=output)
+        return output.getvalue()
+
+    def test_lista_traces_mais_recentes_primeiro(self):
+        lines = self.run_command().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('b' * 32))
+        self.assertIn('3 spans', lines[1])
+        self.assertIn('HTTP POST driver-request-list', lines[1])
+
+    def test_arvore_de_um_trace(self):
+        lines = self.run_command('--trace-id', 'a' * 32).splitlines()
+        self.assertEqual(lines, [
+            'HTTP POST driver-request-list  42.50ms  (server)',
+            '  channels group_send  3.10ms  (producer)',
+            '    channels new_request  1.20ms  (consumer)  [error]',
+        ])
+
+
+class BenchmarkDbConnectionsCommandTests(TestCase):
+    def test_compara_modos_de_conexao(self):
+        output = StringIO()
+        call_command(
+            'benchmark_db_connections', '--modes', 'direct,persistent', '--threads', '2', '--requests', '20',
+            stdout=output
+        )
+        lines = output.getvalue().splitlines()
+        self.assertIn('p95 ms', lines[0])
+        self.assertEqual([line.split()[0] for line in lines[1:]], ['direct', 'persistent'])
+
+    def test_modo_desconhecido_e_rejeitado(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_db_connections', '--modes', 'pgbouncer', stdout=StringIO())
+
+
+class LoadtestAsgiCommandTests(TestCase):
+    def _read(self, raw):
+        from .management.commands.loadtest_asgi import read_response
+
+        async def read():
+            reader = asyncio.StreamReader()
+            reader.feed_data(raw)
+            reader.feed_eof()
+            return await read_response(reader), await reader.read()
+
+        return asyncio.run(read())
+
+    def test_le_resposta_com_content_length_e_mantem_o_restante(self):
+        raw = b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}HTTP/1.1 429'
+        self.assertEqual(self._read(raw), ((200, True), b'HTTP/1.1 429'))
+
+    def test_le_resposta_chunked_com_connection_close(self):
+        raw = b'HTTP/1.1 404 Not Found\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n3\r\nabc\r\n0\r\n\r\n'
+        self.assertEqual(self._read(raw), ((404, False), b''))
+
+    def test_usuario_inexistente_e_rejeitado(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest_asgi', '--username', 'ninguem', stdout=StringIO())
+
+    def _pin(self, cpus, client_cpus=None, max_workers=4):
+        from .management.commands.loadtest_asgi import Command
+
+        command = Command(stdout=StringIO(), stderr=StringIO())
+        with mock.patch('os.sched_getaffinity', return_value=set(cpus), create=True), \
+                mock.patch('os.sched_setaffinity', create=True) as setaffinity:
+            server = command._pin_cpus(client_cpus, max_workers)
+        return server, setaffinity, command.stderr.getvalue()
+
+    def test_servidor_e_gerador_de_carga_em_nucleos_separados(self):
+        server, setaffinity, warnings = self._pin(range(8))
+        setaffinity.assert_called_once_with(0, {0, 1, 2, 3})
+        self.assertEqual(server, {4, 5, 6, 7})
+        self.assertEqual(warnings, '')
+
+    def test_um_nucleo_nao_fixa_e_avisa(self):
+        server, setaffinity, warnings = self._pin([0])
+        self.assertIsNone(server)
+        setaffinity.assert_not_called()
+        self.assertIn('do not show how throughput scales', warnings)
+
+
+class DatabasePoolSettingsTests(TestCase):
+    """Monta o pool do Django a partir de core/settings.py (psycopg_pool substituído por um registro)."""
+
+    def setUp(self):
+        import types
+
+        self.created = []
+        created = self.created
+
+        class ConnectionPool:
+            def __init__(self, **kwargs):
+                created.append(kwargs)
+
+            @staticmethod
+            def check_connection(connection):
+                pass
+
+        self.pool_module = types.ModuleType('psycopg_pool')
+        self.pool_module.ConnectionPool = ConnectionPool
+
+    def load_settings(self, **env):
+        import importlib.util
+        import sys
+
+        from django.conf import settings
+
+        spec = importlib.util.spec_from_file_location('pool_settings', settings.BASE_DIR / 'core' / 'settings.py')
+        module = importlib.util.module_from_spec(spec)
+        environ = {'DJANGO_SECRET_KEY': 'x', 'DB_POOL_ENABLED': 'True', **env}
+        with mock.patch.dict(sys.modules, {'psycopg_pool': self.pool_module}), mock.patch.dict(os.environ, environ):
+            spec.loader.exec_module(module)
+        return module
+
+    def build_pool(self, databases, alias):
+        import sys
+
+        from django.db.backends.postgresql.base import DatabaseWrapper
+        from django.db.utils import ConnectionHandler
+
+        wrapper = DatabaseWrapper(ConnectionHandler(databases).settings[alias], alias=f'pool_test_{alias}')
+        with mock.patch.dict(sys.modules, {'psycopg_pool': self.pool_module}), \
+                mock.patch.object(wrapper, 'get_connection_params', return_value={}):
+            try:
+                return wrapper.pool
+            finally:
+                wrapper._connection_pools.pop(wrapper.alias, None)
+
+    def test_pool_do_primario_e_das_replicas_com_verificacao_de_saude(self):
+        settings_module = self.load_settings(DB_REPLICA_HOSTS='replica1:5433')
+
+        for alias in ('default', 'replica_1'):
+            self.assertIsNotNone(self.build_pool(settings_module.DATABASES, alias))
+
+        self.assertEqual(len(self.created), 2)
+        for kwargs in self.created:
+            self.assertIs(kwargs['check'], self.pool_module.ConnectionPool.check_connection)
+            self.assertEqual(kwargs['max_size'], settings_module.DB_POOL_MAX_SIZE)
@@ -1,23 +1,34 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationReadMarker, NotificationReceipt
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['id', 'notification_type', 'request_id', 'title', 'is_read', 'created_at']
-    list_filter = ['notification_type', 'is_read', 'created_at']
+    list_display = ['id', 'notification_type', 'request_id', 'title', 'created_at']
+    list_filter = ['notification_type', 'created_at']
     search_fields = ['title', 'message']
-    readonly_fields = ['created_at', 'read_at']
+    readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
 
     fieldsets = (
         ('Informações da Notificação', {
             'fields': ('notification_type', 'request_id', 'title', 'message')
         }),
-        ('Status', {
-            'fields': ('is_read', 'read_by', 'read_at')
-        }),
         ('Datas', {
             'fields': ('created_at',)
         }),
     )
+
+
+@admin.register(NotificationReadMarker)
+class NotificationReadMarkerAdmin(admin.ModelAdmin):
+    list_display = ['user', 'last_read_id', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(NotificationReceipt)
+class NotificationReceiptAdmin(admin.ModelAdmin):
+    list_display = ['user', 'notification', 'read_at']
+    search_fields = ['user__username']
+    readonly_fields = ['read_at']
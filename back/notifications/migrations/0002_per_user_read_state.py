@@ -0,0 +1,130 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def copy_legacy_reads(apps, schema_editor):
+    """
+    Converte a leitura global antiga no estado por usuário, sem mudar o que os
+    usuários ativos viam antes da migração.
+
+    Antes a leitura valia para todos. O prefixo de notificações já lidas (até a
+    primeira não lida, ou ``MAX(id)`` se todas estavam lidas) vira a marca
+    d'água de cada usuário ativo; as lidas depois desse prefixo viram recibos
+    desses usuários e de quem as leu. As não lidas continuam não lidas para
+    todos. A data de leitura vem de ``Notification.read_at``: os recibos são
+    atualizados após o ``bulk_create`` (``auto_now_add`` grava a data da
+    migração) e a marca recebe a leitura mais recente do prefixo.
+    """
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationReadMarker = apps.get_model('notifications', 'NotificationReadMarker')
+    NotificationReceipt = apps.get_model('notifications', 'NotificationReceipt')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    first_unread_id = Notification.objects.filter(is_read=False).aggregate(Min('id'))['id__min']
+    if first_unread_id is None:
+        last_read_id = Notification.objects.aggregate(Max('id'))['id__max'] or 0
+    else:
+        last_read_id = first_unread_id - 1
+
+    user_ids = set(User.objects.filter(is_active=True).values_list('id', flat=True))
+
+    if last_read_id:
+        NotificationReadMarker.objects.bulk_create(
+            [NotificationReadMarker(user_id=user_id, last_read_id=last_read_id) for user_id in user_ids],
+            batch_size=500
+        )
+        prefix_read_at = Notification.objects.filter(id__lte=last_read_id).aggregate(Max('read_at'))['read_at__max']
+        if prefix_read_at is not None:
+            # update() ignora o auto_now de updated_at.
+            NotificationReadMarker.objects.update(updated_at=prefix_read_at)
+
+    receipts = [
+        NotificationReceipt(user_id=user_id, notification_id=notification_id)
+        for notification_id, read_by_id in Notification.objects.filter(
+            is_read=True,
+            id__gt=last_read_id
+        ).values_list('id', 'read_by_id')
+        for user_id in user_ids | ({read_by_id} if read_by_id else set())
+    ]
+    NotificationReceipt.objects.bulk_create(receipts, batch_size=500, ignore_conflicts=True)
+    NotificationReceipt.objects.update(
+        read_at=Coalesce(
+            Subquery(Notification.objects.filter(pk=OuterRef('notification_id')).values('read_at')[:1]),
+            F('read_at')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadMarker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_id', models.BigIntegerField(default=0, help_text='Todas as notificações com ID menor ou igual a este valor estão lidas', verbose_name='Última Notificação Lida')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Marca de Leitura',
+                'verbose_name_plural': 'Marcas de Leitura',
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Leitura')),
+            ],
+            options={
+                'verbose_name': 'Recibo de Leitura',
+                'verbose_name_plural': 'Recibos de Leitura',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificationreadmarker',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_read_marker', to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+        migrations.AddField(
+            model_name='notificationreceipt',
+            name='notification',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='notifications.notification', verbose_name='Notificação'),
+        ),
+        migrations.AddField(
+            model_name='notificationreceipt',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_receipts', to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationreceipt',
+            constraint=models.UniqueConstraint(fields=('user', 'notification'), name='unique_notification_receipt_per_user'),
+        ),
+        migrations.RunPython(copy_legacy_reads, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_is_read_3a06ff_idx',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='read_at',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='read_by',
+        ),
+    ]
@@ -1,7 +1,41 @@
 from django.db import models
+from django.db.models import Case, When, Value, OuterRef, Subquery
 from django.contrib.auth.models import User
 
 
+class NotificationQuerySet(models.QuerySet):
+    """QuerySet com o estado de leitura por usuário (marca d'água + recibos)."""
+
+    def unread_for(self, user):
+        """Notificações ainda não lidas pelo usuário."""
+        last_read_id = NotificationReadMarker.get_last_read_id(user)
+        return self.filter(id__gt=last_read_id).exclude(receipts__user=user)
+
+    def with_read_state(self, user):
+        """
+        Anota ``user_read_at`` com a data de leitura pelo usuário (None se não lida).
+        Notificações até a marca d'água usam a data da marca; as demais, o recibo.
+        """
+        marker = NotificationReadMarker.objects.filter(user=user).first()
+        receipt_read_at = Subquery(
+            NotificationReceipt.objects.filter(
+                user=user,
+                notification=OuterRef('pk')
+            ).values('read_at')[:1]
+        )
+
+        if marker is None or not marker.last_read_id:
+            return self.annotate(user_read_at=receipt_read_at)
+
+        return self.annotate(
+            user_read_at=Case(
+                When(id__lte=marker.last_read_id, then=Value(marker.updated_at)),
+                default=receipt_read_at,
+                output_field=models.DateTimeField(),
+            )
+        )
+
+
 class Notification(models.Model):
     """
     Model para notificações de novas solicitações no sistema.
@@ -38,45 +72,99 @@ class Notification(models.Model):
         help_text='Mensagem detalhada da notificação'
     )
 
-    is_read = models.BooleanField(
-        default=False,
-        verbose_name='Lida',
-        help_text='Indica se a notificação foi lida',
-        db_index=True
-    )
-
-    read_by = models.ForeignKey(
-        User,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name='notifications_read',
-        verbose_name='Lida por',
-        help_text='Usuário que marcou a notificação como lida'
-    )
-
-    read_at = models.DateTimeField(
-        null=True,
-        blank=True,
-        verbose_name='Data de Leitura',
-        help_text='Data e hora em que foi marcada como lida'
-    )
-
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Data de Criação',
         help_text='Data e hora em que a notificação foi criada'
     )
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Notificação'
         verbose_name_plural = 'Notificações'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['is_read', 'created_at']),
             models.Index(fields=['notification_type', 'request_id']),
+            models.Index(fields=['created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_notification_type_display()} #{self.request_id}"
+
+
+class NotificationReadMarker(models.Model):
+    """
+    Marca d'água de leitura por usuário.
+
+    Todas as notificações com ``id <= last_read_id`` são consideradas lidas pelo
+    usuário; leituras individuais acima da marca ficam em ``NotificationReceipt``.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_read_marker',
+        verbose_name='Usuário'
+    )
+
+    last_read_id = models.BigIntegerField(
+        default=0,
+        verbose_name='Última Notificação Lida',
+        help_text='Todas as notificações com ID menor ou igual a este valor estão lidas'
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Atualizado em'
+    )
+
+    class Meta:
+        verbose_name = 'Marca de Leitura'
+        verbose_name_plural = 'Marcas de Leitura'
+
+    def __str__(self):
+        return f"{self.user.username} - até #{self.last_read_id}"
+
+    @classmethod
+    def get_last_read_id(cls, user):
+        """Retorna a marca d'água do usuário (0 se ainda não leu nada)."""
+        return cls.objects.filter(user=user).values_list('last_read_id', flat=True).first() or 0
+
+
+class NotificationReceipt(models.Model):
+    """
+    Recibo de leitura individual de uma notificação acima da marca d'água do usuário.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_receipts',
+        verbose_name='Usuário'
+    )
+
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='receipts',
+        verbose_name='Notificação'
+    )
+
+    read_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Leitura'
+    )
+
+    class Meta:
+        verbose_name = 'Recibo de Leitura'
+        verbose_name_plural = 'Recibos de Leitura'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'notification'],
+                name='unique_notification_receipt_per_user'
+            )
         ]
 
     def __str__(self):
-        status = 'Lida' if self.is_read else 'Não lida'
-        return f"{self.get_notification_type_display()} #{self.request_id} - {status}"
+        return f"{self.user.username} leu #{self.notification_id}"
@@ -12,10 +12,14 @@ class NotificationSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
-    read_by_username = serializers.CharField(
-        source='read_by.username',
+    is_read = serializers.SerializerMethodField()
+    read_by = serializers.SerializerMethodField()
+    read_by_username = serializers.SerializerMethodField()
+    read_at = serializers.DateTimeField(
+        source='user_read_at',
         read_only=True,
-        allow_null=True
+        allow_null=True,
+        default=None
     )
 
     class Meta:
@@ -42,12 +46,23 @@ class NotificationSerializer(serializers.ModelSerializer):
             'created_at',
         ]
 
+    # O estado de leitura é do usuário autenticado e vem da anotação
+    # ``user_read_at`` de ``Notification.objects.with_read_state(user)``.
 
-class NotificationUpdateSerializer(serializers.ModelSerializer):
-    """
-    Serializer para marcar notificações como lidas.
-    """
+    def _is_read(self, obj):
+        return getattr(obj, 'user_read_at', None) is not None
 
-    class Meta:
-        model = Notification
-        fields = ['is_read']
+    def _request_user(self):
+        request = self.context.get('request')
+        return getattr(request, 'user', None)
+
+    def get_is_read(self, obj):
+        return self._is_read(obj)
+
+    def get_read_by(self, obj):
+        user = self._request_user()
+        return user.id if user and self._is_read(obj) else None
+
+    def get_read_by_username(self, obj):
+        user = self._request_user()
+        return user.username if user and self._is_read(obj) else None
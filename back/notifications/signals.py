@@ -1,10 +1,15 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from requests.models import DriverRequest, VehicleRequest
+from core.realtime import group_send_on_commit, topic_group
+from core.tracing import traced
 from .models import Notification
+from .utils import increment_unread_counts, invalidate_unread_counts_on_commit
 
 
 @receiver(post_save, sender=DriverRequest)
+@traced()
 def create_driver_request_notification(sender, instance, created, **kwargs):
     """
     Cria uma notificação quando uma nova solicitação de motorista é criada.
@@ -19,6 +24,7 @@ def create_driver_request_notification(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=VehicleRequest)
+@traced()
 def create_vehicle_request_notification(sender, instance, created, **kwargs):
     """
     Cria uma notificação quando uma nova solicitação de veículo é criada.
@@ -30,3 +36,35 @@ def create_vehicle_request_notification(sender, instance, created, **kwargs):
             title=f'Nova Solicitação de Veículo #{instance.id}',
             message=f'Solicitação de {instance.brand} {instance.model} (Placa: {instance.plate}) aguardando análise.'
         )
+
+
+@receiver(post_save, sender=Notification)
+@traced()
+def increment_unread_counters(sender, instance, created, **kwargs):
+    """
+    Incrementa o total de notificações em cache após o commit da notificação
+    e publica ``notification.created`` para os clientes conectados.
+    """
+    if created:
+        transaction.on_commit(increment_unread_counts)
+        group_send_on_commit(topic_group('notifications'), {
+            'type': 'notification.created',
+            'notification': {
+                'id': instance.id,
+                'notification_type': instance.notification_type,
+                'notification_type_display': instance.get_notification_type_display(),
+                'request_id': instance.request_id,
+                'title': instance.title,
+                'message': instance.message,
+                'created_at': instance.created_at.isoformat(),
+            },
+        })
+
+
+@receiver(post_delete, sender=Notification)
+def invalidate_unread_counters(sender, instance, **kwargs):
+    """
+    Invalida os contadores de não lidas quando uma notificação é removida
+    (uma vez por transação, mesmo em exclusões em lote).
+    """
+    invalidate_unread_counts_on_commit()
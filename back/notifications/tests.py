@@ -2,28 +2,48 @@
 Testes abrangentes para o app notifications.
 
 Cobre endpoints do ViewSet: list, unread, unread_count,
-mark_as_read e mark_all_as_read.
+mark_as_read e mark_all_as_read, além do estado de leitura por usuário
+e do stream SSE.
 """
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 
-from .models import Notification
+from .models import Notification, NotificationReceipt
+from .utils import (
+    GENERATION_CACHE_KEY, get_unread_count, mark_all_notifications_as_read, mark_notification_as_read,
+)
 from authentication.models import UserProfile
+from core.event_log import get_event_log
+from core.realtime import get_coalescer, group_send, topic_group, user_group
 
 def make_user(username='notifuser', password='NotifPass123!', email='notif@example.com'):
     user = User.objects.create_user(username=username, password=password, email=email)
     return user
 
-def make_notification(notification_type='driver_request', request_id=1, is_read=False):
-    return Notification.objects.create(
+def make_notification(notification_type='driver_request', request_id=1, read_by=None):
+    notification = Notification.objects.create(
         notification_type=notification_type,
         request_id=request_id,
         title=f'Notificação de teste #{request_id}',
-        message='Mensagem de teste da notificação.',
-        is_read=is_read
+        message='Mensagem de teste da notificação.'
     )
+    if read_by is not None:
+        mark_notification_as_read(read_by, notification)
+    return notification
 
 class NotificationListTests(TestCase):
     def setUp(self):
@@ -51,8 +71,8 @@ class NotificationUnreadTests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = make_user(username='notifuser2', email='notif2@example.com')
-        make_notification(request_id=1, is_read=False)
-        make_notification(request_id=2, is_read=True)
+        make_notification(request_id=1)
+        make_notification(request_id=2, read_by=self.user)
 
     def test_listar_nao_lidas_autenticado_retorna_200(self):
         self.client.force_authenticate(user=self.user)
@@ -60,6 +80,7 @@ class NotificationUnreadTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsInstance(response.data, list)
         # Apenas as não lidas
+        self.assertEqual(len(response.data), 1)
         for item in response.data:
             self.assertFalse(item['is_read'])
 
@@ -71,9 +92,10 @@ class NotificationUnreadCountTests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = make_user(username='notifuser3', email='notif3@example.com')
-        make_notification(request_id=1, is_read=False)
-        make_notification(request_id=2, is_read=False)
-        make_notification(request_id=3, is_read=True)
+        cache.clear()
+        make_notification(request_id=1)
+        make_notification(request_id=2)
+        make_notification(request_id=3, read_by=self.user)
 
     def test_contagem_nao_lidas_retorna_200(self):
         self.client.force_authenticate(user=self.user)
@@ -86,18 +108,72 @@ class NotificationUnreadCountTests(TestCase):
         response = self.client.get('/api/notifications/unread_count/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_contagem_nao_lidas_servida_do_cache(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/notifications/unread_count/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(response.data['unread_count'], 2)
+
+    def test_contagem_incrementada_ao_criar_notificacao(self):
+        self.assertEqual(get_unread_count(self.user), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_notification(request_id=4)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 3)
+
+    def test_contagem_decrementada_ao_marcar_como_lida(self):
+        notification = make_notification(request_id=5)
+        cache.clear()
+        self.assertEqual(get_unread_count(self.user), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_notification_as_read(self.user, notification)
+        self.assertEqual(get_unread_count(self.user), 2)
+
+    def test_criar_notificacao_nao_consulta_usuarios(self):
+        for index in range(5):
+            make_user(username=f'extra{index}', email=f'extra{index}@example.com')
+        self.assertEqual(get_unread_count(self.user), 2)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_notification(request_id=6)
+        with self.assertNumQueries(0):
+            for callback in callbacks:
+                callback()
+            self.assertEqual(get_unread_count(self.user), 3)
+
+    def test_exclusao_em_lote_invalida_uma_vez(self):
+        self.assertEqual(get_unread_count(self.user), 2)
+        make_notification(request_id=7)
+
+        with mock.patch('notifications.utils.cache.delete', wraps=cache.delete) as delete:
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.all().delete()
+
+        self.assertEqual(
+            [call for call in delete.call_args_list if call.args == (GENERATION_CACHE_KEY,)],
+            [mock.call(GENERATION_CACHE_KEY)]
+        )
+        self.assertEqual(get_unread_count(self.user), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_notification(request_id=8)
+        self.assertEqual(get_unread_count(self.user), 1)
+
 class NotificationMarkAsReadTests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = make_user(username='notifuser4', email='notif4@example.com')
-        self.notification = make_notification(request_id=10, is_read=False)
+        self.notification = make_notification(request_id=10)
 
     def test_marcar_como_lida_autenticado_retorna_200(self):
         self.client.force_authenticate(user=self.user)
         response = self.client.patch(f'/api/notifications/{self.notification.pk}/mark_as_read/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.notification.refresh_from_db()
-        self.assertTrue(self.notification.is_read)
+        self.assertTrue(response.data['is_read'])
+        self.assertEqual(response.data['read_by'], self.user.id)
+        self.assertTrue(
+            NotificationReceipt.objects.filter(user=self.user, notification=self.notification).exists()
+        )
 
     def test_marcar_como_lida_sem_autenticacao_retorna_401(self):
         response = self.client.patch(f'/api/notifications/{self.notification.pk}/mark_as_read/')
@@ -112,9 +188,9 @@ class NotificationMarkAllAsReadTests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = make_user(username='notifuser5', email='notif5@example.com')
-        make_notification(request_id=20, is_read=False)
-        make_notification(request_id=21, is_read=False)
-        make_notification(request_id=22, is_read=True)
+        make_notification(request_id=20)
+        make_notification(request_id=21)
+        make_notification(request_id=22, read_by=self.user)
 
     def test_marcar_todas_como_lidas_autenticado_retorna_200(self):
         self.client.force_authenticate(user=self.user)
@@ -127,6 +203,196 @@ class NotificationMarkAllAsReadTests(TestCase):
         response = self.client.post('/api/notifications/mark_all_as_read/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_marcar_todas_como_lidas_zera_contagem_e_recibos(self):
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/mark_all_as_read/')
+        self.assertEqual(get_unread_count(self.user), 0)
+        self.assertFalse(NotificationReceipt.objects.filter(user=self.user).exists())
+
+        response = self.client.post('/api/notifications/mark_all_as_read/')
+        self.assertEqual(response.data['updated_count'], 0)
+
+    def test_notificacao_nova_apos_marcar_todas_fica_nao_lida(self):
+        mark_all_notifications_as_read(self.user)
+        make_notification(request_id=23)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/notifications/unread/')
+        self.assertEqual([item['request_id'] for item in response.data], [23])
+
+
+class NotificationPerUserReadStateTests(TestCase):
+    """
+    A leitura de um usuário não deve afetar o estado dos demais.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.alice = make_user(username='alice', email='alice@example.com')
+        self.bob = make_user(username='bob', email='bob@example.com')
+        self.notification = make_notification(request_id=30)
+
+    def test_leitura_individual_nao_afeta_outro_usuario(self):
+        self.client.force_authenticate(user=self.alice)
+        self.client.patch(f'/api/notifications/{self.notification.pk}/mark_as_read/')
+
+        self.client.force_authenticate(user=self.bob)
+        response = self.client.get(f'/api/notifications/{self.notification.pk}/')
+        self.assertFalse(response.data['is_read'])
+        self.assertIsNone(response.data['read_by'])
+        self.assertEqual(get_unread_count(self.bob), 1)
+        self.assertEqual(get_unread_count(self.alice), 0)
+
+    def test_marcar_todas_nao_afeta_outro_usuario(self):
+        mark_all_notifications_as_read(self.alice)
+        self.assertEqual(Notification.objects.unread_for(self.alice).count(), 0)
+        self.assertEqual(Notification.objects.unread_for(self.bob).count(), 1)
+
+    def test_marcar_como_lida_duas_vezes_e_idempotente(self):
+        self.assertTrue(mark_notification_as_read(self.alice, self.notification))
+        self.assertFalse(mark_notification_as_read(self.alice, self.notification))
+        mark_all_notifications_as_read(self.alice)
+        self.assertFalse(mark_notification_as_read(self.alice, self.notification))
+
+@override_settings(NOTIFICATION_SYNC_OVERLAP_SECONDS=0)
+class NotificationSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = make_user(username='syncuser', email='sync@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.first = make_notification(request_id=40)
+        self.second = make_notification(request_id=41)
+
+    def test_sync_inicial_retorna_recentes_e_token(self):
+        response = self.client.get('/api/notifications/sync/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([n['id'] for n in response.data['notifications']], [self.first.id, self.second.id])
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual(response.data['unread_count'], 2)
+        self.assertIn('sync_token', response.data)
+
+    def test_sync_com_token_retorna_apenas_novas(self):
+        token = self.client.get('/api/notifications/sync/').data['sync_token']
+        third = make_notification(request_id=42)
+
+        response = self.client.get('/api/notifications/sync/', {'sync_token': token})
+        self.assertEqual([n['id'] for n in response.data['notifications']], [third.id])
+
+        response = self.client.get('/api/notifications/sync/', {'sync_token': response.data['sync_token']})
+        self.assertEqual(response.data['notifications'], [])
+
+    def test_sync_retorna_leituras_desde_o_ultimo_token(self):
+        token = self.client.get('/api/notifications/sync/').data['sync_token']
+        mark_notification_as_read(self.user, self.first)
+
+        response = self.client.get('/api/notifications/sync/', {'sync_token': token})
+        self.assertEqual(response.data['read_ids'], [self.first.id])
+        self.assertEqual(response.data['notifications'], [])
+
+    def test_sync_retorna_marca_dagua_apos_marcar_todas(self):
+        mark_all_notifications_as_read(self.user)
+        response = self.client.get('/api/notifications/sync/', {'since_id': self.second.id})
+        self.assertEqual(response.data['read_up_to'], self.second.id)
+        self.assertEqual(response.data['notifications'], [])
+
+    def test_sync_since_id_pagina_com_has_more(self):
+        response = self.client.get('/api/notifications/sync/', {'since_id': 0, 'limit': 1})
+        self.assertEqual([n['id'] for n in response.data['notifications']], [self.first.id])
+        self.assertTrue(response.data['has_more'])
+
+        response = self.client.get(
+            '/api/notifications/sync/',
+            {'sync_token': response.data['sync_token'], 'limit': 1}
+        )
+        self.assertEqual([n['id'] for n in response.data['notifications']], [self.second.id])
+        self.assertFalse(response.data['has_more'])
+
+    def test_sync_pagina_leituras_alem_do_limite_ate_o_fim(self):
+        token = self.client.get('/api/notifications/sync/').data['sync_token']
+        read = [self.first, self.second] + [make_notification(request_id=50 + index) for index in range(3)]
+        for notification in read:
+            mark_notification_as_read(self.user, notification)
+        # Recibos com o mesmo read_at: o keyset desempata pelo id
+        NotificationReceipt.objects.filter(notification__in=read[1:4]).update(
+            read_at=NotificationReceipt.objects.get(notification=read[1]).read_at
+        )
+
+        read_ids, pages = [], 0
+        has_more = True
+        while has_more:
+            pages += 1
+            self.assertLessEqual(pages, 5)
+            response = self.client.get('/api/notifications/sync/', {'sync_token': token, 'limit': 2})
+            read_ids += response.data['read_ids']
+            token, has_more = response.data['sync_token'], response.data['has_more']
+
+        self.assertEqual(sorted(read_ids), sorted(notification.id for notification in read))
+        self.assertEqual(len(read_ids), len(set(read_ids)))
+
+    def test_sync_since_data_iso(self):
+        response = self.client.get('/api/notifications/sync/', {'since': '2000-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['notifications']), 2)
+
+    def test_sync_token_invalido_retorna_400(self):
+        response = self.client.get('/api/notifications/sync/', {'sync_token': 'adulterado'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_since_invalido_retorna_400(self):
+        response = self.client.get('/api/notifications/sync/', {'since': 'ontem'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_sem_autenticacao_retorna_401(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/notifications/sync/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class NotificationSyncOverlapTests(TestCase):
+    """A última página recua a janela de sobreposição para pegar commits atrasados."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = make_user(username='overlapuser', email='overlap@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.first = make_notification(request_id=60)
+
+    def test_notificacao_commitada_apos_o_cursor_nao_se_perde(self):
+        token = self.client.get('/api/notifications/sync/').data['sync_token']
+        # Criada antes do cursor, mas visível só depois da sincronização
+        late = make_notification(request_id=61)
+        Notification.objects.filter(pk=late.pk).update(created_at=self.first.created_at - timedelta(seconds=1))
+
+        response = self.client.get('/api/notifications/sync/', {'sync_token': token})
+        self.assertEqual([n['id'] for n in response.data['notifications']], [late.id, self.first.id])
+
+    def test_recibo_com_read_at_anterior_ao_cursor_nao_se_perde(self):
+        token = self.client.get('/api/notifications/sync/').data['sync_token']
+        mark_notification_as_read(self.user, self.first)
+        NotificationReceipt.objects.filter(user=self.user).update(read_at=timezone.now() - timedelta(seconds=2))
+
+        response = self.client.get('/api/notifications/sync/', {'sync_token': token})
+        self.assertEqual(response.data['read_ids'], [self.first.id])
+
+    def test_paginacao_avanca_com_mais_linhas_que_o_limite_na_janela(self):
+        created = [self.first] + [make_notification(request_id=62 + index) for index in range(4)]
+        response = self.client.get('/api/notifications/sync/', {'since_id': 0, 'limit': 2})
+        ids, pages = [n['id'] for n in response.data['notifications']], 1
+        while response.data['has_more']:
+            pages += 1
+            self.assertLessEqual(pages, 3)
+            response = self.client.get(
+                '/api/notifications/sync/',
+                {'sync_token': response.data['sync_token'], 'limit': 2}
+            )
+            ids += [n['id'] for n in response.data['notifications']]
+
+        self.assertEqual(ids, [notification.id for notification in created])
+
+
 class NotificationModelTest(TestCase):
     """
     Testes para o modelo Notification
@@ -149,8 +415,7 @@ class NotificationModelTest(TestCase):
 
         self.assertEqual(notification.notification_type, 'driver_request')
         self.assertEqual(notification.request_id, 1)
-        self.assertFalse(notification.is_read)
-        self.assertIsNone(notification.read_by)
+        self.assertIn(notification, Notification.objects.unread_for(self.user))
 
     def test_create_vehicle_notification(self):
         """Testa criação de notificação de veículo"""
@@ -163,12 +428,10 @@ class NotificationModelTest(TestCase):
 
         self.assertEqual(notification.notification_type, 'vehicle_request')
         self.assertEqual(notification.request_id, 2)
-        self.assertFalse(notification.is_read)
+        self.assertIn(notification, Notification.objects.unread_for(self.user))
 
     def test_mark_notification_as_read(self):
-        """Testa marcação de notificação como lida"""
-        from django.utils import timezone
-
+        """Testa marcação de notificação como lida pelo usuário"""
         notification = Notification.objects.create(
             notification_type='driver_request',
             request_id=1,
@@ -176,14 +439,11 @@ class NotificationModelTest(TestCase):
             message='Solicitação aguardando análise.'
         )
 
-        notification.is_read = True
-        notification.read_by = self.user
-        notification.read_at = timezone.now()
-        notification.save()
+        mark_notification_as_read(self.user, notification)
 
-        self.assertTrue(notification.is_read)
-        self.assertEqual(notification.read_by, self.user)
-        self.assertIsNotNone(notification.read_at)
+        annotated = Notification.objects.with_read_state(self.user).get(pk=notification.pk)
+        self.assertIsNotNone(annotated.user_read_at)
+        self.assertNotIn(notification, Notification.objects.unread_for(self.user))
 
     def test_notification_ordering(self):
         """Testa ordenação de notificações por data"""
@@ -208,3 +468,184 @@ class NotificationModelTest(TestCase):
         notifications = list(Notification.objects.all())
         self.assertEqual(notifications[0], notif2)  # Mais recente primeiro
         self.assertEqual(notifications[1], notif1)
+
+
+def parse_sse(chunk):
+    """Converte um trecho do stream SSE em lista de ``(id, frame)``."""
+    events = []
+    for block in chunk.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if ': ' in line and not line.startswith(':'))
+        if 'data' in fields:
+            events.append((fields.get('id'), json.loads(fields['data'])))
+    return events
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    WEBSOCKET_COALESCE_WINDOW_MS=0,
+    SSE_HEARTBEAT_SECONDS=0.05,
+)
+class NotificationStreamTests(TestCase):
+    """
+    Stream SSE: autenticação pelo cookie JWT, eventos dos grupos, heartbeat e retomada.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # Lotes pendentes de outros testes não devem chegar aos grupos deste
+        get_coalescer().flush_all()
+        get_event_log().clear()
+        self.user = make_user()
+        UserProfile.objects.filter(user=self.user).update(role='approver')
+        self.client = AsyncClient()
+        self.client.cookies['access'] = str(AccessToken.for_user(self.user))
+
+    async def _open(self, url='/api/notifications/stream/', headers=None):
+        response = await self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).decode().startswith('retry:'))
+        return stream
+
+    async def _next(self, stream):
+        return (await asyncio.wait_for(anext(stream), timeout=2)).decode()
+
+    def test_sem_autenticacao_retorna_401(self):
+        async def scenario():
+            return await AsyncClient().get('/api/notifications/stream/')
+
+        response = async_to_sync(scenario)()
+        self.assertEqual(response.status_code, 401)
+
+    def test_conexao_e_evento_do_grupo(self):
+        async def scenario():
+            stream = await self._open()
+            established = parse_sse(await self._next(stream))[0][1]
+            initial = parse_sse(await self._next(stream))[0][1]
+            await asyncio.sleep(0)
+            await get_channel_layer().group_send(
+                user_group(self.user.id),
+                {'type': 'notification.read', 'notification_ids': [7], 'read_up_to': None,
+                 'unread_count': 0, 'event_id': '5-0'}
+            )
+            event = parse_sse(await self._next(stream))
+            await stream.aclose()
+            return established, initial, event
+
+        established, initial, event = async_to_sync(scenario)()
+        self.assertEqual(established['type'], 'connection_established')
+        self.assertIn('requests.driver', established['topics'])
+        self.assertEqual(initial['type'], 'counters.update')
+        self.assertEqual(event[0][0], '5-0')
+        self.assertEqual(event[0][1]['type'], 'notification.read')
+        self.assertEqual(event[0][1]['notification_ids'], [7])
+
+    def test_topicos_filtrados_e_heartbeat(self):
+        async def scenario():
+            stream = await self._open('/api/notifications/stream/?topics=notifications,inexistente')
+            established = parse_sse(await self._next(stream))[0][1]
+            await self._next(stream)
+            heartbeat = await self._next(stream)
+            await stream.aclose()
+            return established, heartbeat
+
+        established, heartbeat = async_to_sync(scenario)()
+        self.assertEqual(established['topics'], ['notifications'])
+        self.assertEqual(heartbeat, ': heartbeat\n\n')
+
+    def test_last_event_id_reenvia_eventos_perdidos(self):
+        group = topic_group('notifications')
+        first = get_event_log().append(group, {'type': 'counters.update', 'counters': {'a': 1}})
+        get_event_log().append(group, {'type': 'counters.update', 'counters': {'a': 2}})
+
+        async def scenario():
+            stream = await self._open('/api/notifications/stream/?topics=notifications', headers={'Last-Event-ID': first})
+            await self._next(stream)
+            await self._next(stream)
+            replay = parse_sse(await self._next(stream))
+            await stream.aclose()
+            return replay
+
+        replay = async_to_sync(scenario)()
+        self.assertEqual(len(replay), 2)
+        self.assertEqual(replay[0][1]['counters'], {'a': 2})
+        self.assertEqual(replay[1][1]['type'], 'replay.complete')
+        self.assertFalse(replay[1][1]['truncated'])
+
+    def test_evento_enviado_pelo_group_send(self):
+        async def scenario():
+            stream = await self._open('/api/notifications/stream/?topics=dashboard')
+            await self._next(stream)
+            await self._next(stream)
+            await asyncio.get_running_loop().run_in_executor(
+                None, group_send, topic_group('dashboard'), {'type': 'counters.update', 'counters': {'x': 3}}
+            )
+            event = parse_sse(await self._next(stream))
+            await stream.aclose()
+            return event
+
+        event = async_to_sync(scenario)()
+        self.assertIsNotNone(event[0][0])
+        self.assertEqual(event[0][1]['counters'], {'x': 3})
+
+
+class NotificationReadStateMigrationTests(TransactionTestCase):
+    """Conversão da leitura global (0001) para o estado por usuário (0002)."""
+
+    migrate_from = [('notifications', '0001_initial')]
+    migrate_to = [('notifications', '0002_per_user_read_state')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.addCleanup(self._migrate, executor.loader.graph.leaf_nodes())
+        self._migrate(self.migrate_from)
+        self.apps = MigrationExecutor(connection).loader.project_state(self.migrate_from).apps
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+
+    def _create(self, Notification, **kwargs):
+        return Notification.objects.create(
+            notification_type='driver_request',
+            request_id=1,
+            title='Notificação legada',
+            message='Mensagem legada.',
+            **kwargs
+        )
+
+    def test_preserva_leituras_e_datas_legadas(self):
+        Notification = self.apps.get_model('notifications', 'Notification')
+        reader = make_user()
+        other = make_user(username='other', email='other@example.com')
+        inactive = make_user(username='inactive', email='inactive@example.com')
+        inactive.is_active = False
+        inactive.save(update_fields=['is_active'])
+
+        first_read_at = timezone.now() - timedelta(days=3)
+        last_read_at = timezone.now() - timedelta(days=2)
+        late_read_at = timezone.now() - timedelta(days=1)
+        read_1 = self._create(Notification, is_read=True, read_at=first_read_at, read_by_id=reader.id)
+        read_2 = self._create(Notification, is_read=True, read_at=last_read_at, read_by_id=reader.id)
+        unread = self._create(Notification)
+        read_late = self._create(Notification, is_read=True, read_at=late_read_at, read_by_id=reader.id)
+
+        self._migrate(self.migrate_to)
+        apps = MigrationExecutor(connection).loader.project_state(self.migrate_to).apps
+        NotificationReadMarker = apps.get_model('notifications', 'NotificationReadMarker')
+        NotificationReceipt = apps.get_model('notifications', 'NotificationReceipt')
+
+        markers = NotificationReadMarker.objects.order_by('user_id')
+        self.assertEqual([marker.user_id for marker in markers], [reader.id, other.id])
+        for marker in markers:
+            self.assertEqual(marker.last_read_id, read_2.id)
+            self.assertEqual(marker.updated_at, last_read_at)
+
+        receipts = NotificationReceipt.objects.order_by('user_id')
+        self.assertEqual(
+            [(receipt.user_id, receipt.notification_id) for receipt in receipts],
+            [(reader.id, read_late.id), (other.id, read_late.id)]
+        )
+        self.assertTrue(all(receipt.read_at == late_read_at for receipt in receipts))
+        self.assertFalse(NotificationReceipt.objects.filter(notification_id__in=[read_1.id, unread.id]).exists())
@@ -0,0 +1,334 @@
+"""
+Estado de leitura por usuário e contadores de não lidas em cache.
+
+A contagem de não lidas de um usuário é ``total - lidas``: o total de
+notificações é um contador global (``notifications:total:<geração>``),
+incrementado uma vez por notificação criada, e cada usuário tem apenas o número
+de notificações que já leu (``notifications:read:<geração>:<user_id>``). Criar
+uma notificação custa um ``incr``, independente do número de usuários.
+
+Excluir notificações muda a geração (um ``delete`` por transação) e todas as
+chaves antigas deixam de ser usadas. Valores ausentes são recalculados no banco
+com ``cache.add``; como um ``incr`` concorrente ao recálculo pode se perder, o
+TTL é curto (``NOTIFICATION_UNREAD_COUNT_CACHE_TIMEOUT``).
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.realtime import group_send, user_group
+from core.transactions import on_commit_once
+from .models import Notification, NotificationReadMarker, NotificationReceipt
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CACHE_KEY = 'notifications:generation'
+TOTAL_COUNT_CACHE_KEY = 'notifications:total:{generation}'
+READ_COUNT_CACHE_KEY = 'notifications:read:{generation}:{user_id}'
+SYNC_TOKEN_SALT = 'notifications.sync'
+
+
+def _generation():
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, uuid.uuid4().hex[:12], None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def _total_count_key(generation):
+    return TOTAL_COUNT_CACHE_KEY.format(generation=generation)
+
+
+def _read_count_key(generation, user_id):
+    return READ_COUNT_CACHE_KEY.format(generation=generation, user_id=user_id)
+
+
+def _unread_count_timeout():
+    return getattr(settings, 'NOTIFICATION_UNREAD_COUNT_CACHE_TIMEOUT', 60)
+
+
+def _sync_overlap_seconds():
+    return getattr(settings, 'NOTIFICATION_SYNC_OVERLAP_SECONDS', 5)
+
+
+def _read_count(user):
+    """Notificações existentes lidas pelo usuário: até a marca d'água mais os recibos."""
+    last_read_id = NotificationReadMarker.get_last_read_id(user)
+    return (
+        Notification.objects.filter(id__lte=last_read_id).count()
+        + NotificationReceipt.objects.filter(user=user, notification_id__gt=last_read_id).count()
+    )
+
+
+def get_unread_count(user):
+    """
+    Retorna o número de notificações não lidas pelo usuário.
+
+    Lê o total e as lidas do usuário em cache; o que faltar é recalculado no
+    banco e gravado com ``cache.add`` para não sobrescrever incrementos concorrentes.
+    """
+    generation = _generation()
+    total_key, read_key = _total_count_key(generation), _read_count_key(generation, user.id)
+    cached = cache.get_many([total_key, read_key])
+
+    total = cached.get(total_key)
+    if total is None:
+        total = Notification.objects.count()
+        cache.add(total_key, total, _unread_count_timeout())
+    read = cached.get(read_key)
+    if read is None:
+        read = _read_count(user)
+        cache.add(read_key, read, _unread_count_timeout())
+    return max(total - read, 0)
+
+
+def increment_unread_counts():
+    """
+    Incrementa o total de notificações (e com ele a contagem de todos os usuários).
+
+    Sem total em cache nada é feito: o valor será recalculado na próxima leitura.
+    """
+    try:
+        cache.incr(_total_count_key(_generation()))
+    except ValueError:
+        pass
+
+
+def invalidate_unread_counts():
+    """Descarta todos os contadores trocando a geração (ex.: após exclusão de notificações)."""
+    cache.delete(GENERATION_CACHE_KEY)
+
+
+def invalidate_unread_counts_on_commit():
+    """
+    Agenda ``invalidate_unread_counts`` uma única vez por transação: a exclusão
+    em lote dispara ``post_delete`` para cada notificação.
+    """
+    on_commit_once(invalidate_unread_counts)
+
+
+def _increment_read_count(user):
+    try:
+        cache.incr(_read_count_key(_generation(), user.id))
+    except ValueError:
+        pass
+
+
+def _reset_read_count(user):
+    cache.delete(_read_count_key(_generation(), user.id))
+
+
+def _push_read_event(user, notification_ids=None, read_up_to=None):
+    """Publica ``notification.read`` para todas as conexões do usuário."""
+    group_send(user_group(user.id), {
+        'type': 'notification.read',
+        'notification_ids': notification_ids or [],
+        'read_up_to': read_up_to,
+        'unread_count': get_unread_count(user),
+    })
+
+
+def mark_notification_as_read(user, notification):
+    """
+    Marca uma notificação como lida pelo usuário.
+
+    Retorna True se a leitura foi registrada agora, False se já estava lida.
+    """
+    if notification.id <= NotificationReadMarker.get_last_read_id(user):
+        return False
+
+    try:
+        with transaction.atomic():
+            _, created = NotificationReceipt.objects.get_or_create(
+                user=user,
+                notification=notification
+            )
+    except IntegrityError:
+        created = False
+
+    if created:
+        transaction.on_commit(lambda: _increment_read_count(user))
+        transaction.on_commit(lambda: _push_read_event(user, notification_ids=[notification.id]))
+    return created
+
+
+def mark_all_notifications_as_read(user):
+    """
+    Marca todas as notificações existentes como lidas pelo usuário.
+
+    Avança a marca d'água até a última notificação e descarta os recibos que ela
+    passa a cobrir. Retorna a quantidade de notificações que estavam não lidas.
+    """
+    with transaction.atomic():
+        marker, _ = NotificationReadMarker.objects.select_for_update().get_or_create(user=user)
+        # Lida após o bloqueio, na mesma transação da marca d'água
+        max_id = Notification.objects.aggregate(max_id=Max('id'))['max_id']
+        if max_id is None or max_id <= marker.last_read_id:
+            return 0
+
+        updated_count = (
+            Notification.objects.unread_for(user)
+            .filter(id__lte=max_id)
+            .count()
+        )
+
+        marker.last_read_id = max_id
+        marker.save(update_fields=['last_read_id', 'updated_at'])
+        NotificationReceipt.objects.filter(user=user, notification_id__lte=max_id).delete()
+
+    transaction.on_commit(lambda: _reset_read_count(user))
+    transaction.on_commit(lambda: _push_read_event(user, read_up_to=max_id))
+    logger.info("Usuário %s marcou %s notificação(ões) como lida(s)", user.username, updated_count)
+    return updated_count
+
+
+class InvalidSyncCursor(ValueError):
+    """Cursor de sincronização inválido (token adulterado ou parâmetro malformado)."""
+
+
+def _parse_datetime_param(value):
+    parsed = parse_datetime(value) if value else None
+    if parsed is None:
+        raise InvalidSyncCursor('Data inválida para sincronização.')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def build_sync_token(created_at, last_id, synced_at, receipt_id=0):
+    """
+    Gera o token opaco (assinado) que identifica o ponto da última sincronização.
+
+    ``synced_at``/``receipt_id`` formam o keyset dos recibos de leitura já enviados.
+    """
+    return signing.dumps(
+        {
+            'c': created_at.isoformat() if created_at else None,
+            'i': last_id,
+            's': synced_at.isoformat() if synced_at else None,
+            'r': receipt_id,
+        },
+        salt=SYNC_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def parse_sync_cursor(params):
+    """
+    Resolve o cursor de sincronização a partir de ``sync_token``, ``since_id`` ou ``since``.
+
+    Retorna um dict com ``created_at``, ``id``, ``synced_at`` e ``receipt_id`` ou None quando o
+    cliente não informou cursor (sincronização inicial).
+    """
+    token = params.get('sync_token')
+    if token:
+        try:
+            data = signing.loads(token, salt=SYNC_TOKEN_SALT)
+            return {
+                'created_at': _parse_datetime_param(data['c']) if data.get('c') else None,
+                'id': int(data.get('i') or 0),
+                'synced_at': _parse_datetime_param(data['s']) if data.get('s') else None,
+                'receipt_id': int(data.get('r') or 0),
+            }
+        except (signing.BadSignature, KeyError, TypeError, ValueError) as exc:
+            raise InvalidSyncCursor('Token de sincronização inválido.') from exc
+
+    since_id = params.get('since_id')
+    if since_id:
+        try:
+            since_id = int(since_id)
+        except ValueError as exc:
+            raise InvalidSyncCursor('since_id deve ser um número inteiro.') from exc
+        return {'created_at': None, 'id': since_id, 'synced_at': None, 'receipt_id': 0}
+
+    since = params.get('since')
+    if since:
+        since = _parse_datetime_param(since)
+        return {'created_at': since, 'id': 0, 'synced_at': since, 'receipt_id': 0}
+
+    return None
+
+
+def get_sync_delta(user, cursor, limit):
+    """
+    Calcula o delta de notificações para o usuário a partir do cursor.
+
+    Retorna novas notificações (keyset em ``(created_at, id)``, no máximo ``limit``),
+    IDs lidos individualmente desde a última sincronização e a marca d'água atual,
+    de forma que o custo por consulta não depende do tamanho da tabela.
+
+    ``created_at`` e ``read_at`` são gravados antes do commit: uma linha com data
+    anterior ao cursor pode ficar visível só depois da sincronização. Por isso o
+    token da última página recua ``NOTIFICATION_SYNC_OVERLAP_SECONDS`` e a próxima
+    sincronização relê essa janela; o cliente descarta os IDs repetidos. Entre
+    páginas (``has_more``) o keyset é estrito, então a paginação sempre avança.
+    """
+    synced_at = timezone.now()
+    queryset = Notification.objects.with_read_state(user)
+
+    if cursor is None:
+        # Sincronização inicial: apenas as mais recentes, em ordem cronológica.
+        notifications = list(queryset.order_by('-created_at', '-id')[:limit])[::-1]
+        has_more_notifications = False
+    else:
+        if cursor['created_at'] is not None:
+            queryset = queryset.filter(
+                Q(created_at__gt=cursor['created_at'])
+                | Q(created_at=cursor['created_at'], id__gt=cursor['id'])
+            )
+        else:
+            queryset = queryset.filter(id__gt=cursor['id'])
+        notifications = list(queryset.order_by('created_at', 'id')[:limit + 1])
+        has_more_notifications = len(notifications) > limit
+        notifications = notifications[:limit]
+
+    receipts = []
+    has_more_reads = False
+    if cursor is not None and cursor['synced_at'] is not None:
+        # Keyset em (read_at, id): cada página continua após o último recibo enviado
+        receipts = list(
+            NotificationReceipt.objects.filter(user=user)
+            .filter(
+                Q(read_at__gt=cursor['synced_at'])
+                | Q(read_at=cursor['synced_at'], id__gt=cursor['receipt_id'])
+            )
+            .order_by('read_at', 'id')
+            .values_list('read_at', 'id', 'notification_id')[:limit + 1]
+        )
+        has_more_reads = len(receipts) > limit
+        receipts = receipts[:limit]
+    read_ids = [notification_id for _, _, notification_id in receipts]
+
+    overlap = timedelta(seconds=_sync_overlap_seconds())
+    if notifications:
+        last = notifications[-1]
+        last_created_at, last_id = last.created_at, last.id
+        if overlap and not has_more_notifications:
+            last_created_at, last_id = last_created_at - overlap, 0
+    elif cursor is not None:
+        last_created_at, last_id = cursor['created_at'], cursor['id']
+    else:
+        last_created_at, last_id = None, 0
+
+    if has_more_reads:
+        next_synced_at, next_receipt_id, _ = receipts[-1]
+    else:
+        next_synced_at, next_receipt_id = synced_at - overlap, 0
+
+    return {
+        'notifications': notifications,
+        'has_more': has_more_notifications or has_more_reads,
+        'read_ids': read_ids,
+        'read_up_to': NotificationReadMarker.get_last_read_id(user),
+        'unread_count': get_unread_count(user),
+        'sync_token': build_sync_token(last_created_at, last_id, next_synced_at, next_receipt_id),
+    }
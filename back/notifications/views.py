@@ -1,22 +1,48 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from authentication.websocket_auth import aget_request_user
+from core.event_log import get_event_log, parse_event_id
+from core.realtime import allowed_topics, get_pending_counters, topic_group, user_group
+from requests.consumers import parse_topics_param, render_frame, resolve_topics
 from .models import Notification
-from .serializers import NotificationSerializer, NotificationUpdateSerializer
+from .serializers import NotificationSerializer
+from .utils import (
+    InvalidSyncCursor,
+    get_sync_delta,
+    get_unread_count,
+    mark_all_notifications_as_read,
+    mark_notification_as_read,
+    parse_sync_cursor,
+)
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para gerenciar notificações.
 
+    O estado de leitura é individual: cada usuário tem sua própria marca d'água
+    e recibos de leitura, e o contador de não lidas é servido do cache.
+
     Endpoints:
     - GET /api/notifications/ - Lista todas as notificações
     - GET /api/notifications/unread/ - Lista notificações não lidas
     - GET /api/notifications/unread_count/ - Conta notificações não lidas
+    - GET /api/notifications/sync/ - Delta incremental desde o último sync
     - PATCH /api/notifications/{id}/mark_as_read/ - Marca notificação como lida
     - POST /api/notifications/mark_all_as_read/ - Marca todas como lidas
+
+    O stream SSE (``GET /api/notifications/stream/``) é servido por ``notification_stream``.
     """
 
     queryset = Notification.objects.all()
@@ -25,39 +51,63 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         """
-        Retorna notificações ordenadas por data de criação.
+        Retorna notificações ordenadas por data de criação, anotadas com o
+        estado de leitura do usuário autenticado.
         """
-        return Notification.objects.all().order_by('-created_at')
+        return Notification.objects.with_read_state(self.request.user).order_by('-created_at')
 
     @action(detail=False, methods=['get'])
     def unread(self, request):
         """
-        Lista todas as notificações não lidas.
+        Lista todas as notificações não lidas pelo usuário.
         """
-        unread_notifications = self.get_queryset().filter(is_read=False)
+        unread_notifications = self.get_queryset().filter(user_read_at__isnull=True)
         serializer = self.get_serializer(unread_notifications, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """
-        Retorna o número de notificações não lidas.
+        Retorna o número de notificações não lidas pelo usuário (via cache).
+        """
+        return Response({'unread_count': get_unread_count(request.user)})
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
         """
-        count = self.get_queryset().filter(is_read=False).count()
-        return Response({'unread_count': count})
+        Retorna apenas o que mudou desde a última sincronização.
+
+        Aceita ``?sync_token=`` (devolvido pela chamada anterior), ``?since_id=``
+        ou ``?since=`` (ISO 8601). Sem cursor, retorna as notificações mais recentes.
+        O tamanho da resposta é limitado por ``?limit=``; ``has_more`` indica que
+        há mais dados e o cliente deve repetir a chamada com o novo token.
+        """
+        default_limit = getattr(settings, 'NOTIFICATION_SYNC_DEFAULT_LIMIT', 50)
+        max_limit = getattr(settings, 'NOTIFICATION_SYNC_MAX_LIMIT', 100)
+        try:
+            limit = int(request.query_params.get('limit', default_limit))
+        except ValueError:
+            limit = default_limit
+        limit = max(1, min(limit, max_limit))
+
+        try:
+            cursor = parse_sync_cursor(request.query_params)
+        except InvalidSyncCursor as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        delta = get_sync_delta(request.user, cursor, limit)
+        delta['notifications'] = self.get_serializer(delta['notifications'], many=True).data
+        return Response(delta)
 
     @action(detail=True, methods=['patch'])
     def mark_as_read(self, request, pk=None):
         """
-        Marca uma notificação específica como lida.
+        Marca uma notificação específica como lida pelo usuário.
         """
         notification = self.get_object()
 
-        if not notification.is_read:
-            notification.is_read = True
-            notification.read_by = request.user
-            notification.read_at = timezone.now()
-            notification.save()
+        if mark_notification_as_read(request.user, notification):
+            notification = self.get_object()
 
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
@@ -65,15 +115,148 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """
-        Marca todas as notificações não lidas como lidas.
+        Marca todas as notificações como lidas pelo usuário.
         """
-        updated_count = Notification.objects.filter(is_read=False).update(
-            is_read=True,
-            read_by=request.user,
-            read_at=timezone.now()
-        )
+        updated_count = mark_all_notifications_as_read(request.user)
 
         return Response({
             'message': f'{updated_count} notificação(ões) marcada(s) como lida(s)',
             'updated_count': updated_count
         })
+
+
+def _sse_message(frame, event_id=None):
+    """Formata um frame no protocolo SSE (``id``/``event``/``data``)."""
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f"event: {frame['type']}")
+    lines.append(f'data: {json.dumps(frame)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _render_message(message, user):
+    """Frames de uma mensagem do channel layer, expandindo os lotes agrupados."""
+    messages = message['events'] if message.get('type') == 'event.batch' else [message]
+    rendered = []
+    for item in messages:
+        frame = await render_frame(item, user)
+        if frame is not None:
+            if item.get('event_id'):
+                frame['event_id'] = item['event_id']
+            rendered.append((item.get('event_id'), frame))
+    return rendered
+
+
+async def _event_stream(user, topics, last_event_id):
+    """
+    Assina os mesmos grupos do ``RequestNotificationConsumer`` e repassa os
+    eventos como SSE até o cliente desconectar.
+    """
+    channel_layer = get_channel_layer()
+    channel_name = await channel_layer.new_channel()
+    groups = {topic_group(topic) for topic in topics} | {user_group(user.id)}
+    heartbeat = getattr(settings, 'SSE_HEARTBEAT_SECONDS', 15)
+
+    for group in groups:
+        await channel_layer.group_add(group, channel_name)
+
+    try:
+        yield f"retry: {getattr(settings, 'SSE_RETRY_MS', 3000)}\n\n"
+        yield _sse_message({
+            'type': 'connection_established',
+            'message': 'Conectado ao stream de notificações',
+            'topics': sorted(topics),
+        })
+
+        counters = {}
+        if 'dashboard' in topics:
+            counters = await sync_to_async(get_pending_counters)()
+        yield _sse_message({
+            'type': 'counters.update',
+            'counters': counters,
+            'unread_count': await sync_to_async(get_unread_count)(user),
+        })
+
+        replayed_up_to = None
+        if last_event_id:
+            try:
+                events, complete = await sync_to_async(get_event_log().read_after)(
+                    groups,
+                    last_event_id,
+                    getattr(settings, 'REALTIME_REPLAY_MAX_EVENTS', 500)
+                )
+            except Exception:
+                events, complete = [], False
+
+            chunk = []
+            for event_id, message in events:
+                for frame_id, frame in await _render_message({**message, 'event_id': event_id}, user):
+                    chunk.append(_sse_message(frame, frame_id))
+            replayed_up_to = events[-1][0] if events else last_event_id
+            chunk.append(_sse_message({
+                'type': 'replay.complete',
+                'replayed': len(events),
+                'truncated': not complete,
+                'last_event_id': replayed_up_to,
+            }))
+            yield ''.join(chunk)
+
+        while True:
+            try:
+                message = await asyncio.wait_for(channel_layer.receive(channel_name), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Comentário SSE: mantém proxies e balanceadores com a conexão aberta
+                yield ': heartbeat\n\n'
+                continue
+
+            chunk = [
+                _sse_message(frame, event_id)
+                for event_id, frame in await _render_message(message, user)
+                if not (
+                    event_id and replayed_up_to
+                    and parse_event_id(event_id) <= parse_event_id(replayed_up_to)
+                )
+            ]
+            if chunk:
+                yield ''.join(chunk)
+    finally:
+        for group in groups:
+            await channel_layer.group_discard(group, channel_name)
+
+
+@require_GET
+async def notification_stream(request):
+    """
+    GET /api/notifications/stream/ - Eventos em tempo real via Server-Sent Events.
+
+    Alternativa ao WebSocket para redes que bloqueiam o upgrade: entrega os
+    mesmos frames, com ``id`` em cada evento. O navegador reenvia o último ID
+    recebido em ``Last-Event-ID`` ao reconectar (também aceito em
+    ``?last_event_id=``) e recebe apenas o que perdeu. ``?topics=a,b`` restringe
+    os tópicos, como no WebSocket. Um comentário de heartbeat é enviado a cada
+    ``SSE_HEARTBEAT_SECONDS`` sem eventos.
+    """
+    user = await aget_request_user(request)
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Autenticação necessária.'}, status=401)
+
+    if get_channel_layer() is None:
+        return JsonResponse({'error': 'Eventos em tempo real indisponíveis.'}, status=503)
+
+    topics = resolve_topics(
+        await sync_to_async(allowed_topics)(user),
+        parse_topics_param(request.GET.get('topics'))
+    )
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if not parse_event_id(last_event_id):
+        last_event_id = None
+
+    response = StreamingHttpResponse(
+        _event_stream(user, topics, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # evita buffer no nginx
+    return response
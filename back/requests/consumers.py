@@ -1,19 +1,123 @@
 """
 WebSocket consumers para notificações em tempo real de solicitações.
+
+Mensagens enviadas ao cliente (campo ``type``):
+- ``connection_established``: confirmação da conexão
+- ``new_request``: nova solicitação de motorista ou veículo
+- ``notification.created``: nova notificação, com o contador de não lidas do usuário
+- ``notification.read``: notificações lidas pelo usuário (em qualquer aba/dispositivo)
+- ``counters.update``: contadores de pendências e de não lidas
+- ``complaint.created`` / ``complaint.updated``: denúncia nova ou com status alterado
+- ``batch``: rajada de eventos agrupados (``events`` com os frames acima e ``count``)
+- ``subscriptions``: tópicos assinados após uma ação ``subscribe``/``unsubscribe``
+- ``replay.complete``: fim do replay dos eventos perdidos (ver ``last_event_id``)
+
+Os eventos são separados por tópico (``requests.driver``, ``requests.vehicle``,
+``complaints``, ``dashboard`` e ``notifications``) e cada papel só pode assinar
+os tópicos definidos em ``core.realtime.TOPIC_ROLES``. Sem ``?topics=a,b`` na
+URL a conexão assina todos os tópicos permitidos. O cliente pode alterar as
+assinaturas enviando ``{"action": "subscribe" | "unsubscribe", "topics": [...]}``.
+
+Eventos de grupo carregam ``event_id``; ao reconectar com
+``ws/requests/?last_event_id=<id>`` o consumer reenvia apenas os eventos
+posteriores. ``truncated: true`` indica que parte deles já foi descartada e o
+cliente deve recarregar as listas.
 """
 import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
+
+from core.metrics import InstrumentedConsumerMixin
+from core.tracing import TracedConsumerMixin
+from core.event_log import get_event_log, parse_event_id
+from core.realtime import allowed_topics, get_pending_counters, topic_group, user_group
+from notifications.utils import get_unread_count
+
+
+def resolve_topics(user_topics, requested):
+    """
+    Tópicos a assinar: os pedidos (``requested``) que o papel permite, ou todos
+    os permitidos quando o cliente não informou tópicos.
+    """
+    if requested is None:
+        return set(user_topics)
+    return set(requested) & set(user_topics)
+
+
+def parse_topics_param(value):
+    """Converte ``'a,b'`` em conjunto de tópicos; None quando ausente."""
+    if value is None:
+        return None
+    return {topic.strip() for topic in value.split(',') if topic.strip()}
 
 
-class RequestNotificationConsumer(AsyncWebsocketConsumer):
+async def render_frame(event, user):
     """
-    Consumer para notificações de novas solicitações (motoristas e veículos).
+    Converte uma mensagem do channel layer no frame enviado ao cliente.
+
+    Compartilhado entre o WebSocket e o stream SSE para que os dois transportes
+    entreguem exatamente o mesmo conteúdo.
+    """
+    event_type = event['type']
+
+    if event_type == 'new_request':
+        return {
+            'type': 'new_request',
+            'request_type': event['request_type'],  # 'driver' ou 'vehicle'
+            'request_id': event['request_id'],
+            'message': event['message'],
+            'data': event.get('data', {})
+        }
+
+    if event_type == 'notification.created':
+        notification = dict(event['notification'])
+        notification.update({
+            'is_read': False,
+            'read_by': None,
+            'read_by_username': None,
+            'read_at': None,
+        })
+        return {
+            'type': 'notification.created',
+            'notification': notification,
+            'unread_count': await database_sync_to_async(get_unread_count)(user),
+        }
+
+    if event_type == 'notification.read':
+        return {
+            'type': 'notification.read',
+            'notification_ids': event.get('notification_ids', []),
+            'read_up_to': event.get('read_up_to'),
+            'unread_count': event['unread_count'],
+        }
+
+    if event_type in ('complaint.created', 'complaint.updated'):
+        return {
+            'type': event_type,
+            'complaint': event['complaint'],
+        }
+
+    if event_type == 'counters.update':
+        return {
+            'type': 'counters.update',
+            'counters': event['counters'],
+        }
+
+    return None
+
+
+class RequestNotificationConsumer(InstrumentedConsumerMixin, TracedConsumerMixin, AsyncWebsocketConsumer):
+    """
+    Consumer para notificações de solicitações, denúncias e painel, por tópico.
     """
 
     async def connect(self):
         """
-        Conecta o WebSocket e adiciona à sala de notificações de solicitações.
+        Conecta o WebSocket e assina os tópicos pedidos e permitidos ao papel.
         Rejeita conexões de usuários não autenticados.
         """
         user = self.scope.get('user')
@@ -21,40 +125,203 @@ class RequestNotificationConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        self.room_group_name = 'requests_notifications'
+        self.user = user
+        self.replayed_up_to = None
+        self.pending_batch = None
+        self.topics = set()
+        self.allowed_topics = set(await database_sync_to_async(allowed_topics)(user))
+        self.user_group_name = user_group(user.id)
 
         await self.channel_layer.group_add(
-            self.room_group_name,
+            self.user_group_name,
             self.channel_name
         )
 
+        await self._subscribe(resolve_topics(self.allowed_topics, parse_topics_param(self._query_param('topics'))))
+
         await self.accept()
 
         await self.send(text_data=json.dumps({
             'type': 'connection_established',
-            'message': 'Conectado ao sistema de notificações de solicitações'
+            'message': 'Conectado ao sistema de notificações de solicitações',
+            'topics': sorted(self.topics),
         }))
 
+        # Estado inicial para que o cliente não precise consultar os endpoints de contagem
+        counters = {}
+        if 'dashboard' in self.topics:
+            counters = await database_sync_to_async(get_pending_counters)()
+        await self.send(text_data=json.dumps({
+            'type': 'counters.update',
+            'counters': counters,
+            'unread_count': await database_sync_to_async(get_unread_count)(self.user),
+        }))
+
+        last_event_id = self._requested_last_event_id()
+        if last_event_id:
+            await self._replay(last_event_id)
+
+    def _query_param(self, name):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        return (query.get(name) or [None])[0]
+
+    def _requested_last_event_id(self):
+        last_event_id = self._query_param('last_event_id')
+        return last_event_id if parse_event_id(last_event_id) else None
+
+    async def _subscribe(self, topics):
+        """Assina os tópicos permitidos; retorna os negados."""
+        topics = set(topics)
+        denied = topics - self.allowed_topics
+        for topic in (topics & self.allowed_topics) - self.topics:
+            await self.channel_layer.group_add(topic_group(topic), self.channel_name)
+            self.topics.add(topic)
+        return denied
+
+    async def _unsubscribe(self, topics):
+        for topic in set(topics) & self.topics:
+            await self.channel_layer.group_discard(topic_group(topic), self.channel_name)
+            self.topics.discard(topic)
+
+    async def _replay(self, last_event_id):
+        """
+        Reenvia os eventos dos grupos desta conexão posteriores a ``last_event_id``.
+
+        Eventos ao vivo com ID até o último reenviado são duplicatas do replay e
+        são descartados; os registrados depois da leitura têm IDs maiores.
+        """
+        max_events = getattr(settings, 'REALTIME_REPLAY_MAX_EVENTS', 500)
+        try:
+            events, complete = await sync_to_async(get_event_log().read_after)(
+                {topic_group(topic) for topic in self.topics} | {self.user_group_name},
+                last_event_id,
+                max_events
+            )
+        except Exception:
+            events, complete = [], False
+
+        for event_id, message in events:
+            await self.dispatch({**message, 'event_id': event_id, 'replay': True})
+        self.replayed_up_to = events[-1][0] if events else last_event_id
+
+        await self.send(text_data=json.dumps({
+            'type': 'replay.complete',
+            'replayed': len(events),
+            'truncated': not complete,
+            'last_event_id': self.replayed_up_to,
+        }))
+
+    async def _send_event(self, event, frame):
+        """Envia um evento de grupo, ignorando os já entregues pelo replay."""
+        if frame is None:
+            return
+        event_id = event.get('event_id')
+        if event_id:
+            if (
+                not event.get('replay')
+                and self.replayed_up_to
+                and parse_event_id(event_id) <= parse_event_id(self.replayed_up_to)
+            ):
+                return
+            frame['event_id'] = event_id
+
+        if self.pending_batch is not None:
+            self.pending_batch.append(frame)
+            return
+        await self.send(text_data=json.dumps(frame))
+
     async def disconnect(self, close_code):
         """
-        Desconecta o WebSocket e remove da sala.
+        Desconecta o WebSocket e remove dos grupos.
         """
+        if not hasattr(self, 'user_group_name'):
+            return
+
+        await self._unsubscribe(set(self.topics))
         await self.channel_layer.group_discard(
-            self.room_group_name,
+            self.user_group_name,
             self.channel_name
         )
 
     async def receive(self, text_data):
-        pass
+        """
+        Ações do cliente: ``subscribe``/``unsubscribe`` com a lista de tópicos.
+        """
+        try:
+            payload = json.loads(text_data or '{}')
+        except ValueError:
+            return
+
+        action = payload.get('action') if isinstance(payload, dict) else None
+        topics = payload.get('topics') if isinstance(payload, dict) else None
+        if action not in ('subscribe', 'unsubscribe') or not isinstance(topics, list):
+            return
+
+        denied = set()
+        if action == 'subscribe':
+            denied = await self._subscribe(str(topic) for topic in topics)
+        else:
+            await self._unsubscribe(str(topic) for topic in topics)
+
+        await self.send(text_data=json.dumps({
+            'type': 'subscriptions',
+            'topics': sorted(self.topics),
+            'denied': sorted(denied),
+        }))
+
+    async def event_batch(self, event):
+        """
+        Lote de eventos agrupados pelo servidor: entregue como um único frame.
+        """
+        self.pending_batch = []
+        try:
+            for message in event['events']:
+                await self.dispatch(message)
+            frames = self.pending_batch
+        finally:
+            self.pending_batch = None
+
+        if len(frames) == 1:
+            await self.send(text_data=json.dumps(frames[0]))
+        elif frames:
+            await self.send(text_data=json.dumps({
+                'type': 'batch',
+                'count': len(frames),
+                'events': frames,
+            }))
 
     async def new_request(self, event):
         """
         Recebe notificação de nova solicitação e envia para o WebSocket.
         """
-        await self.send(text_data=json.dumps({
-            'type': 'new_request',
-            'request_type': event['request_type'],  # 'driver' ou 'vehicle'
-            'request_id': event['request_id'],
-            'message': event['message'],
-            'data': event.get('data', {})
-        }))
+        await self._send_event(event, await render_frame(event, self.user))
+
+    async def notification_created(self, event):
+        """
+        Nova notificação, com o estado de leitura e o contador do usuário desta conexão.
+        """
+        await self._send_event(event, await render_frame(event, self.user))
+
+    async def notification_read(self, event):
+        """
+        Notificações marcadas como lidas pelo usuário (enviado ao grupo do usuário).
+        """
+        await self._send_event(event, await render_frame(event, self.user))
+
+    async def complaint_created(self, event):
+        """
+        Nova denúncia registrada (tópico ``complaints``).
+        """
+        await self._send_event(event, await render_frame(event, self.user))
+
+    async def complaint_updated(self, event):
+        """
+        Status de uma denúncia alterado (tópico ``complaints``).
+        """
+        await self._send_event(event, await render_frame(event, self.user))
+
+    async def counters_update(self, event):
+        """
+        Contadores de pendências do painel mudaram.
+        """
+        await self._send_event(event, await render_frame(event, self.user))
@@ -0,0 +1,131 @@
+import asyncio
+import statistics
+import time
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.realtime import topic_group
+from requests.consumers import RequestNotificationConsumer
+
+
+def _percentiles(samples):
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test for the requests WebSocket: opens N concurrent sockets against the '
+        'configured channel layer and measures fan-out latency of server pushes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000)
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Sockets opened concurrently per batch')
+        parser.add_argument('--events', type=int, default=10,
+                            help='counters.update events broadcast to the group')
+        parser.add_argument('--timeout', type=float, default=30.0,
+                            help='Seconds to wait for each frame')
+        parser.add_argument('--username', help='Existing user the sockets authenticate as')
+
+    def handle(self, *args, **options):
+        backend = settings.CHANNEL_LAYERS['default']['BACKEND']
+        if 'redis' not in backend.lower():
+            self.stdout.write(self.style.WARNING(
+                f'Channel layer is {backend}; results do not reflect Redis fan-out.'
+            ))
+
+        User = get_user_model()
+        users = User.objects.filter(is_active=True)
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError('No active user found to authenticate the sockets.')
+
+        asyncio.run(self._run(user, options))
+
+    async def _open(self, user, timeout):
+        communicator = WebsocketCommunicator(RequestNotificationConsumer.as_asgi(), '/ws/requests/')
+        communicator.scope['user'] = user
+        started = time.perf_counter()
+        connected, _ = await communicator.connect(timeout=timeout)
+        if not connected:
+            return None, None
+        # connection_established + counters.update iniciais
+        await communicator.receive_json_from(timeout=timeout)
+        await communicator.receive_json_from(timeout=timeout)
+        return communicator, time.perf_counter() - started
+
+    async def _run(self, user, options):
+        total = options['connections']
+        batch_size = max(1, options['batch_size'])
+        timeout = options['timeout']
+
+        communicators, connect_times, failures = [], [], 0
+        started = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            size = min(batch_size, total - offset)
+            results = await asyncio.gather(
+                *(self._open(user, timeout) for _ in range(size)),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException) or result[0] is None:
+                    failures += 1
+                    continue
+                communicators.append(result[0])
+                connect_times.append(result[1])
+        connect_elapsed = time.perf_counter() - started
+
+        p50, p95, p99 = _percentiles(connect_times)
+        self.stdout.write(
+            f'Connected {len(communicators)}/{total} sockets in {connect_elapsed:.2f}s '
+            f'({failures} failed) | connect p50={p50 * 1000:.1f}ms p95={p95 * 1000:.1f}ms p99={p99 * 1000:.1f}ms'
+        )
+        if not communicators:
+            raise CommandError('No socket connected.')
+
+        channel_layer = get_channel_layer()
+        delivery_times, missed = [], 0
+
+        async def receive(communicator, sent_at):
+            await communicator.receive_json_from(timeout=timeout)
+            return time.perf_counter() - sent_at
+
+        for sequence in range(options['events']):
+            sent_at = time.perf_counter()
+            await channel_layer.group_send(topic_group('dashboard'), {
+                'type': 'counters.update',
+                'counters': {'loadtest_sequence': sequence},
+            })
+            results = await asyncio.gather(
+                *(receive(communicator, sent_at) for communicator in communicators),
+                return_exceptions=True
+            )
+            event_times = [r for r in results if not isinstance(r, BaseException)]
+            missed += len(results) - len(event_times)
+            delivery_times.extend(event_times)
+            self.stdout.write(
+                f'Event {sequence}: delivered {len(event_times)}/{len(communicators)} '
+                f'in {max(event_times, default=0) * 1000:.1f}ms'
+            )
+
+        p50, p95, p99 = _percentiles(delivery_times)
+        self.stdout.write(self.style.SUCCESS(
+            f'Fan-out latency p50={p50 * 1000:.1f}ms p95={p95 * 1000:.1f}ms p99={p99 * 1000:.1f}ms '
+            f'| {len(delivery_times)} frames delivered, {missed} missed'
+        ))
+
+        await asyncio.gather(
+            *(communicator.disconnect() for communicator in communicators),
+            return_exceptions=True
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:12
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_updated_at(apps, schema_editor):
+    """
+    Usa a data mais recente já registrada (revisão, visualização ou criação).
+
+    ``Greatest`` retorna NULL se algum argumento for NULL (PostgreSQL ignora,
+    SQLite não); cada data opcional cai para ``created_at``.
+    """
+    for model_name in ('DriverRequest', 'VehicleRequest'):
+        model = apps.get_model('requests', model_name)
+        model.objects.filter(updated_at__isnull=True).update(
+            updated_at=Greatest(
+                Coalesce('reviewed_at', 'created_at'),
+                Coalesce('viewed_at', 'created_at'),
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0007_vehiclerequest_crlv_pdf_vehiclerequest_insurance_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverrequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração da solicitação', null=True, verbose_name='Data de Atualização'),
+        ),
+        migrations.AddField(
+            model_name='vehiclerequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Data e hora da última alteração da solicitação', null=True, verbose_name='Data de Atualização'),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
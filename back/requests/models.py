@@ -186,6 +186,12 @@ class DriverRequest(models.Model):
         verbose_name='Data de Criação',
         help_text='Data e hora em que a solicitação foi criada'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        null=True,
+        verbose_name='Data de Atualização',
+        help_text='Data e hora da última alteração da solicitação'
+    )
     viewed_at = models.DateTimeField(
         null=True,
         blank=True,
@@ -454,6 +460,12 @@ class VehicleRequest(models.Model):
         verbose_name='Data de Criação',
         help_text='Data e hora em que a solicitação foi criada'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        null=True,
+        verbose_name='Data de Atualização',
+        help_text='Data e hora da última alteração da solicitação'
+    )
     viewed_at = models.DateTimeField(
         null=True,
         blank=True,
@@ -1,15 +1,18 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import logging
 
+from core.protocol_lookup import invalidate_protocol
+from core.realtime import broadcast_counters, group_send_on_commit, topic_group
+from core.tracing import traced
+from dashboard.signals import status_changed
 from .models import DriverRequest, VehicleRequest
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=DriverRequest)
+@traced()
 def notify_new_driver_request(sender, instance, created, **kwargs):
     """
     Envia notificação WebSocket quando uma nova solicitação de motorista é criada.
@@ -17,13 +20,12 @@ def notify_new_driver_request(sender, instance, created, **kwargs):
     """
     if created and instance.status == 'em_analise':
         try:
-            channel_layer = get_channel_layer()
             logger.info(f'Enviando notificação WebSocket para nova solicitação de motorista: {instance.id}')
 
             protocol = f'#{instance.id:05d}'
 
-            async_to_sync(channel_layer.group_send)(
-                'requests_notifications',
+            group_send_on_commit(
+                topic_group('requests.driver'),
                 {
                     'type': 'new_request',
                     'request_type': 'driver',
@@ -45,6 +47,7 @@ def notify_new_driver_request(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=VehicleRequest)
+@traced()
 def notify_new_vehicle_request(sender, instance, created, **kwargs):
     """
     Envia notificação WebSocket quando uma nova solicitação de veículo é criada.
@@ -52,13 +55,12 @@ def notify_new_vehicle_request(sender, instance, created, **kwargs):
     """
     if created and instance.status == 'em_analise':
         try:
-            channel_layer = get_channel_layer()
             logger.info(f'Enviando notificação WebSocket para nova solicitação de veículo: {instance.id}')
 
             protocol = f'#{instance.id:05d}'
 
-            async_to_sync(channel_layer.group_send)(
-                'requests_notifications',
+            group_send_on_commit(
+                topic_group('requests.vehicle'),
                 {
                     'type': 'new_request',
                     'request_type': 'vehicle',
@@ -82,3 +84,31 @@ def notify_new_vehicle_request(sender, instance, created, **kwargs):
             )
         except Exception as e:
             logger.error(f'Erro ao enviar notificação WebSocket: {e}')
+
+
+@receiver(post_save, sender=DriverRequest)
+@receiver(post_delete, sender=DriverRequest)
+@receiver(post_save, sender=VehicleRequest)
+@receiver(post_delete, sender=VehicleRequest)
+@traced()
+def invalidate_request_protocol_cache(sender, instance, **kwargs):
+    """
+    Invalida a projeção pública do protocolo quando a solicitação muda de status
+    (aprovação, reprovação) ou é removida.
+    """
+    invalidate_protocol(instance.protocol)
+
+
+@receiver(post_save, sender=DriverRequest)
+@receiver(post_delete, sender=DriverRequest)
+@receiver(post_save, sender=VehicleRequest)
+@receiver(post_delete, sender=VehicleRequest)
+@traced()
+def push_request_counters(sender, instance, **kwargs):
+    """
+    Publica os contadores de pendências via WebSocket quando uma solicitação
+    é criada, muda de status ou é removida.
+    """
+    if kwargs.get('signal') is post_save and not kwargs['created'] and not status_changed(instance):
+        return
+    broadcast_counters()
@@ -4,15 +4,32 @@ Testes abrangentes para o app requests.
 Cobre todos os endpoints de solicitações de motoristas e veículos:
 criação (público), listagem, aprovação, reprovação e mark_as_viewed.
 """
-from django.test import TestCase
-from django.contrib.auth.models import User
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from .consumers import RequestNotificationConsumer
+from core.event_log import get_event_log, parse_event_id
+from core.flusher import run_shutdown_hooks
+from core.realtime import QUEUED, SENT, EventCoalescer, get_coalescer, group_send, topic_group, user_group
+from complaints.models import Complaint
 from .models import DriverRequest, VehicleRequest
+from notifications.models import Notification
+from notifications.utils import mark_notification_as_read
 from conductors.models import Conductor
 from vehicles.models import Vehicle
 from authentication.models import UserProfile
+from monitoring.testing import NPlusOneTestCase
 
 def make_user(username='testuser', password='TestPass123!', email='test@example.com', role='viewer'):
     user = User.objects.create_user(username=username, password=password, email=email)
@@ -130,7 +147,7 @@ class DriverRequestCreateTests(TestCase):
         response = self.client.post('/api/requests/drivers/', data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-class DriverRequestListTests(TestCase):
+class DriverRequestListTests(NPlusOneTestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = make_user()
@@ -145,6 +162,23 @@ class DriverRequestListTests(TestCase):
         response = self.client.get('/api/requests/drivers/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_listar_solicitacoes_revisadas_sem_consultas_por_item(self):
+        approver = make_approver()
+        for index in range(3):
+            conductor = Conductor.objects.create(
+                name=f'Condutor {index}', cpf=f'0000000000{index}', email=f'c{index}@example.com',
+                phone='(11) 90000-0000', birth_date='1990-01-01', license_number=f'1234567890{index}',
+                license_category='B', license_expiry_date='2030-01-01'
+            )
+            make_driver_request(
+                cpf=f'1111111111{index}', email=f'r{index}@example.com', status='aprovado',
+                reviewed_by=approver, conductor=conductor
+            )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/requests/drivers/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+
 class DriverRequestMarkViewedTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -229,6 +263,56 @@ class DriverRequestRejectTests(TestCase):
         response = self.client.post(f'/api/requests/drivers/{self.req.pk}/reject/', {'status': 'reprovado'})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+class RequestConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=make_user())
+        self.driver_request = make_driver_request()
+        self.vehicle_request = make_vehicle_request()
+
+    def test_solicitacoes_registram_updated_at(self):
+        self.assertIsNotNone(self.driver_request.updated_at)
+        self.assertIsNotNone(self.vehicle_request.updated_at)
+
+    def test_listagens_com_etag_atual_retornam_304(self):
+        for url in ('/api/requests/drivers/', '/api/requests/vehicles/'):
+            etag = self.client.get(url)['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+    def test_marcar_visualizado_muda_o_etag(self):
+        cases = [
+            ('/api/requests/drivers/', self.driver_request),
+            ('/api/requests/vehicles/', self.vehicle_request),
+        ]
+        for url, instance in cases:
+            list_etag = self.client.get(url)['ETag']
+            detail_etag = self.client.get(f'{url}{instance.pk}/')['ETag']
+
+            self.client.post(f'{url}{instance.pk}/mark_as_viewed/')
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=list_etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            response = self.client.get(f'{url}{instance.pk}/', HTTP_IF_NONE_MATCH=detail_etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertIsNotNone(response.data['viewed_at'])
+
+    def test_reprovacao_muda_o_etag(self):
+        self.client.force_authenticate(user=make_approver())
+        etag = self.client.get('/api/requests/drivers/')['ETag']
+
+        response = self.client.post(f'/api/requests/drivers/{self.driver_request.pk}/reject/', {
+            'status': 'reprovado',
+            'rejection_reason': 'Documentação inválida'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/requests/drivers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['status'], 'reprovado')
+
 class VehicleRequestCreateTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -259,7 +343,7 @@ class VehicleRequestCreateTests(TestCase):
         response = self.client.post('/api/requests/vehicles/', {'brand': 'Honda'})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-class VehicleRequestListTests(TestCase):
+class VehicleRequestListTests(NPlusOneTestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = make_user()
@@ -274,6 +358,19 @@ class VehicleRequestListTests(TestCase):
         response = self.client.get('/api/requests/vehicles/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_listar_solicitacoes_revisadas_sem_consultas_por_item(self):
+        approver = make_approver()
+        for index in range(3):
+            vehicle = Vehicle.objects.create(
+                plate=f'NPO000{index}', brand='Fiat', model='Uno', year=2020, color='Branco',
+                chassis_number=f'CHASSISNPO000{index}', renavam=f'RENAVAMNPO{index}', fuel_type='flex', category='Carro'
+            )
+            make_vehicle_request(plate=f'NPO000{index}', status='aprovado', reviewed_by=approver, vehicle=vehicle)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/requests/vehicles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+
 class VehicleRequestMarkViewedTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -363,3 +460,452 @@ class VehicleRequestRejectTests(TestCase):
             'status': 'reprovado'
         })
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class RequestProtocolLookupTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+
+    def test_consulta_protocolo_motorista_nao_expoe_dados_pessoais(self):
+        req = make_driver_request()
+        response = self.client.get(f'/api/protocols/{req.protocol}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['protocol_type'], 'driver_request')
+        self.assertEqual(response.data['status'], 'em_analise')
+        self.assertNotIn('cpf', response.data)
+        self.assertNotIn('name', response.data)
+
+    def test_consulta_protocolo_veiculo_retorna_200(self):
+        req = make_vehicle_request()
+        response = self.client.get(f'/api/protocols/{req.protocol.replace("-", "")}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['protocol_type'], 'vehicle_request')
+        self.assertEqual(response.data['plate'], 'JKL7890')
+
+    def test_reprovacao_invalida_cache_do_protocolo(self):
+        req = make_vehicle_request()
+        self.client.get(f'/api/protocols/{req.protocol}/')
+
+        approver = make_approver()
+        self.client.force_authenticate(user=approver)
+        self.client.post(f'/api/requests/vehicles/{req.pk}/reject/', {
+            'status': 'reprovado',
+            'rejection_reason': 'Documentação inválida'
+        })
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(f'/api/protocols/{req.protocol}/')
+        self.assertEqual(response.data['status'], 'reprovado')
+        self.assertEqual(response.data['rejection_reason'], 'Documentação inválida')
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    WEBSOCKET_COALESCE_WINDOW_MS=0,
+)
+class RequestNotificationConsumerTests(TransactionTestCase):
+    """
+    Protocolo do WebSocket: estado inicial na conexão e eventos enviados pelo servidor.
+
+    Os consumers usam ``database_sync_to_async``, que fecha conexões antigas:
+    dentro da transação de um TestCase fecharia a conexão do teste.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_approver()
+
+    async def _connect(self, user):
+        communicator = WebsocketCommunicator(RequestNotificationConsumer.as_asgi(), '/ws/requests/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['type'], 'connection_established')
+        return communicator
+
+    def test_conexao_envia_contadores_iniciais(self):
+        make_driver_request()
+
+        async def scenario():
+            communicator = await self._connect(self.user)
+            frame = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return frame
+
+        frame = async_to_sync(scenario)()
+        self.assertEqual(frame['type'], 'counters.update')
+        self.assertEqual(frame['counters']['pending_driver_requests'], 1)
+        self.assertEqual(frame['unread_count'], 1)
+
+    def test_conexao_anonima_rejeitada(self):
+        async def scenario():
+            communicator = WebsocketCommunicator(RequestNotificationConsumer.as_asgi(), '/ws/requests/')
+            communicator.scope['user'] = AnonymousUser()
+            connected, _ = await communicator.connect()
+            return connected
+
+        self.assertFalse(async_to_sync(scenario)())
+
+    def _commit(self, func, *args):
+        """Executa ``func`` em uma transação na thread do teste (on_commit roda no commit)."""
+        def run():
+            with transaction.atomic():
+                return func(*args)
+        return database_sync_to_async(run)()
+
+    def test_nova_notificacao_e_contadores_enviados_apos_commit(self):
+        async def scenario():
+            communicator = await self._connect(self.user)
+            await communicator.receive_json_from()
+
+            request = await self._commit(make_driver_request)
+            frames = [await communicator.receive_json_from() for _ in range(3)]
+            await communicator.disconnect()
+            return request, {frame['type']: frame for frame in frames}
+
+        request, frames = async_to_sync(scenario)()
+        self.assertEqual(frames['new_request']['request_id'], request.id)
+        self.assertEqual(frames['notification.created']['notification']['request_id'], request.id)
+        self.assertFalse(frames['notification.created']['notification']['is_read'])
+        self.assertEqual(frames['notification.created']['unread_count'], 1)
+        self.assertEqual(frames['counters.update']['counters']['pending_driver_requests'], 1)
+
+    def test_leitura_enviada_somente_ao_grupo_do_usuario(self):
+        other = make_admin()
+        notification = Notification.objects.create(
+            notification_type='driver_request',
+            request_id=1,
+            title='Nova Solicitação de Motorista #1',
+            message='Aguardando análise.'
+        )
+
+        async def scenario():
+            mine = await self._connect(self.user)
+            theirs = await self._connect(other)
+            await mine.receive_json_from()
+            await theirs.receive_json_from()
+
+            await self._commit(mark_notification_as_read, self.user, notification)
+            frame = await mine.receive_json_from()
+            nothing = await theirs.receive_nothing()
+            await mine.disconnect()
+            await theirs.disconnect()
+            return frame, nothing
+
+        frame, nothing = async_to_sync(scenario)()
+        self.assertEqual(frame['type'], 'notification.read')
+        self.assertEqual(frame['notification_ids'], [notification.id])
+        self.assertEqual(frame['unread_count'], 0)
+        self.assertTrue(nothing)
+
+    def test_reconexao_com_last_event_id_reenvia_apenas_eventos_perdidos(self):
+        get_event_log().clear()
+
+        async def scenario():
+            communicator = await self._connect(self.user)
+            await communicator.receive_json_from()
+            await self._commit(make_driver_request)
+            seen = [await communicator.receive_json_from() for _ in range(3)]
+            await communicator.disconnect()
+
+            # Eventos enquanto o cliente está desconectado
+            missed = await self._commit(make_vehicle_request)
+
+            last_event_id = max(seen, key=lambda frame: parse_event_id(frame['event_id']))['event_id']
+            communicator = WebsocketCommunicator(
+                RequestNotificationConsumer.as_asgi(),
+                f'/ws/requests/?last_event_id={last_event_id}'
+            )
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            frames = [await communicator.receive_json_from() for _ in range(6)]
+            nothing = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return missed, frames, nothing
+
+        missed, frames, nothing = async_to_sync(scenario)()
+        self.assertEqual([f['type'] for f in frames[:2]], ['connection_established', 'counters.update'])
+        replayed = frames[2:5]
+        self.assertEqual(
+            {f['type'] for f in replayed},
+            {'new_request', 'notification.created', 'counters.update'}
+        )
+        new_request = next(f for f in replayed if f['type'] == 'new_request')
+        self.assertEqual(new_request['request_id'], missed.id)
+        self.assertEqual(frames[5]['type'], 'replay.complete')
+        self.assertEqual(frames[5]['replayed'], 3)
+        self.assertFalse(frames[5]['truncated'])
+        self.assertTrue(nothing)
+
+    def test_replay_indica_truncamento_quando_eventos_foram_descartados(self):
+        get_event_log().clear()
+        with transaction.atomic():
+            make_driver_request()
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                RequestNotificationConsumer.as_asgi(),
+                '/ws/requests/?last_event_id=1-0'
+            )
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            frames = [await communicator.receive_json_from() for _ in range(6)]
+            await communicator.disconnect()
+            return frames[-1]
+
+        frame = async_to_sync(scenario)()
+        self.assertEqual(frame['type'], 'replay.complete')
+        self.assertTrue(frame['truncated'])
+
+    def test_eventos_de_outro_usuario_nao_sao_reenviados(self):
+        other = make_admin()
+        notification = Notification.objects.create(
+            notification_type='driver_request',
+            request_id=1,
+            title='Nova Solicitação de Motorista #1',
+            message='Aguardando análise.'
+        )
+        get_event_log().clear()
+        with transaction.atomic():
+            mark_notification_as_read(other, notification)
+
+        events, _ = get_event_log().read_after({topic_group('notifications'), user_group(self.user.id)}, '0-0', 100)
+        self.assertEqual(events, [])
+        events, _ = get_event_log().read_after({user_group(other.id)}, '0-0', 100)
+        self.assertEqual([message['type'] for _, message in events], ['notification.read'])
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    WEBSOCKET_COALESCE_WINDOW_MS=0,
+)
+class RequestNotificationTopicTests(TransactionTestCase):
+    """
+    Assinatura por tópicos: cada papel recebe apenas os eventos que pode consumir.
+
+    TransactionTestCase pelo mesmo motivo de ``RequestNotificationConsumerTests``.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.approver = make_approver()
+        self.viewer = make_user(username='viewer', email='viewer@example.com')
+
+    async def _connect(self, user, path='/ws/requests/'):
+        communicator = WebsocketCommunicator(RequestNotificationConsumer.as_asgi(), path)
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        established = await communicator.receive_json_from()
+        await communicator.receive_json_from()  # counters.update inicial
+        return communicator, established
+
+    def _commit(self, func, *args):
+        def run():
+            with transaction.atomic():
+                return func(*args)
+        return database_sync_to_async(run)()
+
+    def test_topicos_padrao_seguem_o_papel(self):
+        async def scenario():
+            approver, approver_info = await self._connect(self.approver)
+            viewer, viewer_info = await self._connect(self.viewer)
+            await approver.disconnect()
+            await viewer.disconnect()
+            return approver_info['topics'], viewer_info['topics']
+
+        approver_topics, viewer_topics = async_to_sync(scenario)()
+        self.assertIn('requests.driver', approver_topics)
+        self.assertIn('complaints', approver_topics)
+        self.assertEqual(viewer_topics, ['dashboard', 'notifications'])
+
+    def test_visualizador_nao_recebe_novas_solicitacoes(self):
+        async def scenario():
+            viewer, _ = await self._connect(self.viewer)
+            await self._commit(make_driver_request)
+            frames = [await viewer.receive_json_from() for _ in range(2)]
+            nothing = await viewer.receive_nothing()
+            await viewer.disconnect()
+            return frames, nothing
+
+        frames, nothing = async_to_sync(scenario)()
+        self.assertEqual({f['type'] for f in frames}, {'notification.created', 'counters.update'})
+        self.assertTrue(nothing)
+
+    def test_topicos_na_url_restringem_eventos(self):
+        async def scenario():
+            communicator, info = await self._connect(self.approver, '/ws/requests/?topics=complaints')
+            await self._commit(make_driver_request)
+            await self._commit(lambda: Complaint.objects.create(
+                vehicle_plate='TST1234',
+                complaint_type='excesso_velocidade',
+                description='Teste de denúncia com descrição de pelo menos 20 caracteres'
+            ))
+            frame = await communicator.receive_json_from()
+            nothing = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return info, frame, nothing
+
+        info, frame, nothing = async_to_sync(scenario)()
+        self.assertEqual(info['topics'], ['complaints'])
+        self.assertEqual(frame['type'], 'complaint.created')
+        self.assertEqual(frame['complaint']['vehicle_plate'], 'TST1234')
+        self.assertNotIn('complainant_email', frame['complaint'])
+        self.assertTrue(nothing)
+
+    def test_assinatura_negada_para_topico_nao_permitido(self):
+        async def scenario():
+            viewer, _ = await self._connect(self.viewer)
+            await viewer.send_json_to({'action': 'subscribe', 'topics': ['requests.driver']})
+            response = await viewer.receive_json_from()
+            await viewer.disconnect()
+            return response
+
+        response = async_to_sync(scenario)()
+        self.assertEqual(response['type'], 'subscriptions')
+        self.assertEqual(response['denied'], ['requests.driver'])
+        self.assertNotIn('requests.driver', response['topics'])
+
+    def test_cancelar_assinatura_interrompe_entrega(self):
+        async def scenario():
+            communicator, _ = await self._connect(self.approver, '/ws/requests/?topics=requests.driver')
+            await communicator.send_json_to({'action': 'unsubscribe', 'topics': ['requests.driver']})
+            response = await communicator.receive_json_from()
+            await self._commit(make_driver_request)
+            nothing = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return response, nothing
+
+        response, nothing = async_to_sync(scenario)()
+        self.assertEqual(response['topics'], [])
+        self.assertTrue(nothing)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    WEBSOCKET_COALESCE_WINDOW_MS=60000,
+)
+class RequestNotificationCoalescingTests(TestCase):
+    """
+    Rajadas de eventos para o mesmo grupo chegam ao cliente em um único frame.
+    """
+
+    def setUp(self):
+        cache.clear()
+        get_coalescer().flush_all()  # esvazia lotes pendentes de outros testes antes de medir
+
+    def test_criacao_desfeita_nao_publica_nem_registra_evento(self):
+        with mock.patch('core.realtime._publish') as publish:
+            with self.captureOnCommitCallbacks(execute=False):
+                make_driver_request()
+                make_vehicle_request()
+        publish.assert_not_called()
+
+    def test_edicao_sem_mudanca_de_status_nao_publica_contadores(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            driver_request = make_driver_request()
+
+        with mock.patch('core.realtime._compute_pending_counters', return_value={}) as compute:
+            with self.captureOnCommitCallbacks(execute=True):
+                driver_request.name = 'Carlos Lima Souza'
+                driver_request.save()
+            compute.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                driver_request.status = 'aprovado'
+                driver_request.save()
+            compute.assert_called_once()
+
+            # O status salvo passa a ser a referência do próximo save
+            with self.captureOnCommitCallbacks(execute=True):
+                driver_request.save()
+            compute.assert_called_once()
+
+    def test_janelas_de_varios_grupos_usam_uma_unica_thread(self):
+        coalescer = EventCoalescer()
+        sent = []
+        with mock.patch('core.realtime._send_now', side_effect=lambda group, payload, run: sent.append(group) or True):
+            for index in range(20):
+                coalescer.add(f'grupo_{index}', {'type': 'evento'}, 0.05)
+            flushers = [thread for thread in threading.enumerate() if thread.name == 'flusher']
+            deadline = time.monotonic() + 5
+            while len(sent) < 20 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(len(flushers), 1)
+        self.assertEqual(sorted(sent), sorted(f'grupo_{index}' for index in range(20)))
+
+    def test_encerramento_envia_lotes_pendentes(self):
+        sent = []
+        with mock.patch('core.realtime._send_now', side_effect=lambda group, payload, run: sent.append(payload) or True):
+            get_coalescer().add('grupo_encerramento', {'type': 'evento'}, 60)
+            run_shutdown_hooks()
+
+        self.assertEqual(sent, [{'type': 'evento'}])
+
+    def test_group_send_informa_se_enviou_ou_enfileirou(self):
+        with mock.patch('core.realtime._send_now', return_value=True):
+            with override_settings(WEBSOCKET_COALESCE_WINDOW_MS=0):
+                self.assertEqual(group_send('grupo_retorno', {'type': 'evento'}), SENT)
+            with override_settings(WEBSOCKET_COALESCE_WINDOW_MS=250):
+                self.assertEqual(group_send('grupo_retorno', {'type': 'evento'}), QUEUED)
+            get_coalescer().flush_all()
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    WEBSOCKET_COALESCE_WINDOW_MS=60000,
+)
+class RequestNotificationBurstTests(TransactionTestCase):
+    """
+    Rajada entregue pelo consumer; TransactionTestCase porque o consumer usa
+    ``database_sync_to_async`` (ver ``RequestNotificationConsumerTests``).
+    """
+
+    def setUp(self):
+        cache.clear()
+        get_coalescer().flush_all()  # esvazia lotes pendentes de outros testes antes de medir
+        self.user = make_approver()
+
+    def test_rajada_de_solicitacoes_entregue_em_um_lote(self):
+        coalescer = get_coalescer()
+        before = coalescer.stats()
+
+        def burst():
+            with transaction.atomic():
+                for index in range(3):
+                    make_driver_request(cpf=f'0000000000{index}', email=f'lote{index}@example.com')
+            coalescer.flush_all()
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                RequestNotificationConsumer.as_asgi(),
+                '/ws/requests/?topics=requests.driver,dashboard'
+            )
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.receive_json_from()
+
+            await database_sync_to_async(burst)()
+            frames = [await communicator.receive_json_from() for _ in range(2)]
+            nothing = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return {frame['type']: frame for frame in frames}, nothing
+
+        frames, nothing = async_to_sync(scenario)()
+        batch = frames['batch']
+        self.assertEqual(batch['count'], 3)
+        self.assertEqual([event['type'] for event in batch['events']], ['new_request'] * 3)
+        self.assertTrue(all(event.get('event_id') for event in batch['events']))
+
+        # Contadores são estado: apenas o mais recente do lote é entregue
+        self.assertEqual(frames['counters.update']['counters']['pending_driver_requests'], 3)
+        self.assertTrue(nothing)
+
+        after = coalescer.stats()
+        # 3 new_request + 3 notification.created + 1 counters.update (um por transação) -> 3 mensagens
+        self.assertEqual(after['events'] - before['events'], 7)
+        self.assertEqual(after['messages'] - before['messages'], 3)
+        self.assertEqual(after['frames_saved'] - before['frames_saved'], 4)
@@ -11,6 +11,7 @@ import logging
 import os
 
 from authentication.permissions import IsApproverOrAdmin
+from core.conditional import ConditionalGetMixin
 from core.throttling import PublicWriteThrottle
 from .models import DriverRequest, VehicleRequest
 from .serializers import (
@@ -27,7 +28,7 @@ from vehicles.models import Vehicle
 logger = logging.getLogger(__name__)
 
 
-class DriverRequestViewSet(viewsets.ModelViewSet):
+class DriverRequestViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar solicitações de cadastro de motoristas.
 
@@ -44,7 +45,8 @@ class DriverRequestViewSet(viewsets.ModelViewSet):
     - search (name, cpf, email)
     """
 
-    queryset = DriverRequest.objects.all()
+    queryset = DriverRequest.objects.select_related('reviewed_by', 'conductor')
+    conditional_related = {'conductor': 'updated_at'}
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = {
         'status': ['exact'],
@@ -105,7 +107,7 @@ class DriverRequestViewSet(viewsets.ModelViewSet):
 
         if not driver_request.viewed_at:
             driver_request.viewed_at = timezone.now()
-            driver_request.save(update_fields=['viewed_at'])
+            driver_request.save(update_fields=['viewed_at', 'updated_at'])
 
             logger.info(
                 f"Solicitação de motorista visualizada: ID {driver_request.id}, "
@@ -299,7 +301,7 @@ class DriverRequestViewSet(viewsets.ModelViewSet):
             raise Http404("Erro ao carregar CNH digital")
 
 
-class VehicleRequestViewSet(viewsets.ModelViewSet):
+class VehicleRequestViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar solicitações de cadastro de veículos.
 
@@ -316,7 +318,8 @@ class VehicleRequestViewSet(viewsets.ModelViewSet):
     - search (plate, brand, model)
     """
 
-    queryset = VehicleRequest.objects.all()
+    queryset = VehicleRequest.objects.select_related('reviewed_by', 'vehicle')
+    conditional_related = {'vehicle': 'updated_at'}
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = {
         'status': ['exact'],
@@ -371,7 +374,7 @@ class VehicleRequestViewSet(viewsets.ModelViewSet):
 
         if not vehicle_request.viewed_at:
             vehicle_request.viewed_at = timezone.now()
-            vehicle_request.save(update_fields=['viewed_at'])
+            vehicle_request.save(update_fields=['viewed_at', 'updated_at'])
 
             logger.info(
                 f"Solicitação de veículo visualizada: ID {vehicle_request.id}, "
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
 from django.core.cache import cache
 
+SITE_CONFIGURATION_CACHE_KEY = 'site_configuration'
+# Versão dos payloads JSON prontos (ver sitehome.services)
+SITE_CONFIGURATION_VERSION_KEY = 'site_configuration:version'
+
 
 class SiteConfigurationManager(models.Manager):
     """Gerenciador customizado para SiteConfiguration com padrão singleton."""
@@ -12,10 +16,18 @@ class SiteConfigurationManager(models.Manager):
         Retorna a instância singleton da configuração do site.
         Cria uma se não existir. Utiliza cache para evitar consultas repetidas ao banco.
         """
-        config = cache.get('site_configuration')
+        config = cache.get(SITE_CONFIGURATION_CACHE_KEY)
         if config is None:
             config, created = self.get_or_create(pk=1)
-            cache.set('site_configuration', config, 3600)
+            cache.set(SITE_CONFIGURATION_CACHE_KEY, config, 3600)
+        return config
+
+    async def aget_configuration(self):
+        """Versão assíncrona de ``get_configuration`` (mesma chave de cache)."""
+        config = await cache.aget(SITE_CONFIGURATION_CACHE_KEY)
+        if config is None:
+            config, created = await self.aget_or_create(pk=1)
+            await cache.aset(SITE_CONFIGURATION_CACHE_KEY, config, 3600)
         return config
 
 
@@ -109,11 +121,17 @@ class SiteConfiguration(models.Model):
     def save(self, *args, **kwargs):
         """
         Garante o padrão singleton salvando sempre com pk=1.
-        Invalida o cache após salvar.
+        Invalida o cache do model e dos payloads JSON após salvar, e de novo após
+        o commit, para que uma leitura concorrente não recoloque o estado anterior.
         """
         self.pk = 1
         super().save(*args, **kwargs)
-        cache.delete('site_configuration')
+        self.invalidate_cache()
+        transaction.on_commit(self.invalidate_cache)
+
+    @staticmethod
+    def invalidate_cache():
+        cache.delete_many([SITE_CONFIGURATION_CACHE_KEY, SITE_CONFIGURATION_VERSION_KEY])
 
     def delete(self, *args, **kwargs):
         """Impede a exclusão da instância singleton."""
@@ -0,0 +1,92 @@
+"""
+Payload público da configuração do site, pronto para envio.
+
+O JSON final de cada endpoint (bytes do ``JSONRenderer``) e o seu ETag ficam em
+cache; a requisição com ``If-None-Match`` igual recebe 304 sem desserializar o
+model nem passar pelo serializer. A URL absoluta do logo depende do host da
+requisição, por isso a chave inclui a origem.
+
+As chaves levam a versão atual (``SITE_CONFIGURATION_VERSION_KEY``), que
+``SiteConfiguration.save`` descarta: a próxima leitura gera outra versão e os
+payloads antigos expiram sozinhos.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.renderers import JSONRenderer
+
+from .models import SITE_CONFIGURATION_VERSION_KEY, SiteConfiguration
+from .serializers import SiteConfigurationSerializer
+
+MESSAGES = {
+    'list': 'Configuração do site obtida com sucesso',
+    'current': 'Configuração atual obtida com sucesso',
+}
+
+_PAYLOAD_KEY = 'site_configuration:payload:{version}:{endpoint}:{origin}'
+
+
+def _timeout():
+    return getattr(settings, 'SITE_CONFIGURATION_CACHE_TIMEOUT', 3600)
+
+
+def _payload_key(version, request, endpoint):
+    return _PAYLOAD_KEY.format(version=version, endpoint=endpoint, origin=request.build_absolute_uri('/'))
+
+
+def _render(config, request, endpoint):
+    """Bytes da resposta e ETag (hash do conteúdo)."""
+    serializer = SiteConfigurationSerializer(config, context={'request': request})
+    body = JSONRenderer().render({'success': True, 'data': serializer.data, 'message': MESSAGES[endpoint]})
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _current_version():
+    version = cache.get(SITE_CONFIGURATION_VERSION_KEY)
+    if version is None:
+        cache.add(SITE_CONFIGURATION_VERSION_KEY, uuid.uuid4().hex[:12], None)
+        version = cache.get(SITE_CONFIGURATION_VERSION_KEY)
+    return version
+
+
+async def _acurrent_version():
+    version = await cache.aget(SITE_CONFIGURATION_VERSION_KEY)
+    if version is None:
+        await cache.aadd(SITE_CONFIGURATION_VERSION_KEY, uuid.uuid4().hex[:12], None)
+        version = await cache.aget(SITE_CONFIGURATION_VERSION_KEY)
+    return version
+
+
+def get_configuration_payload(request, endpoint):
+    """``(body, etag)`` do endpoint (``'list'`` ou ``'current'``), do cache ou renderizado."""
+    key = _payload_key(_current_version(), request, endpoint)
+    payload = cache.get(key)
+    if payload is None:
+        payload = _render(SiteConfiguration.objects.get_configuration(), request, endpoint)
+        cache.set(key, payload, _timeout())
+    return payload
+
+
+async def aget_configuration_payload(request, endpoint):
+    """Versão assíncrona de ``get_configuration_payload``."""
+    key = _payload_key(await _acurrent_version(), request, endpoint)
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = _render(await SiteConfiguration.objects.aget_configuration(), request, endpoint)
+        await cache.aset(key, payload, _timeout())
+    return payload
+
+
+def payload_response(request, body, etag):
+    """200 com o JSON pronto ou 304 se ``If-None-Match`` casar com o ETag."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # O navegador reaproveita por pouco tempo e depois revalida com o ETag
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'SITE_CONFIGURATION_MAX_AGE', 60))
+    return response
@@ -1,3 +1,114 @@
+"""
+Testes do app sitehome: configuração pública do site.
+"""
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import SiteConfiguration
+
+
+class CurrentConfigurationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_configuracao_atual_cria_singleton(self):
+        response = self.client.get('/api/site/configuration/current/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(response.json()['data']['id'], 1)
+        self.assertTrue(SiteConfiguration.objects.filter(pk=1).exists())
+
+    def test_configuracao_atual_igual_a_listagem(self):
+        SiteConfiguration.objects.create(pk=1, company_name='Transportes Teste', email='contato@example.com')
+
+        current = self.client.get('/api/site/configuration/current/')
+        listing = self.client.get('/api/site/configuration/')
+
+        self.assertEqual(current.status_code, status.HTTP_200_OK)
+        self.assertEqual(current.json()['data'], listing.json()['data'])
+        self.assertEqual(current.json()['data']['company_name'], 'Transportes Teste')
+
+    def test_configuracao_atual_servida_do_cache(self):
+        self.client.get('/api/site/configuration/current/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/site/configuration/current/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @mock.patch('core.throttling.PublicReadThrottle.THROTTLE_RATES', {'public_read': '2/hour'})
+    def test_throttle_compartilhado_com_view_sincrona(self):
+        self.assertEqual(self.client.get('/api/site/configuration/').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/api/site/configuration/current/').status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            self.client.get('/api/site/configuration/current/').status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(
+            self.client.get('/api/site/configuration/').status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+
+class SiteConfigurationETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        SiteConfiguration.objects.create(pk=1, company_name='Transportes Teste', email='contato@example.com')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_resposta_traz_etag_e_cache_control(self):
+        for url in ('/api/site/configuration/', '/api/site/configuration/current/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response['ETag'].startswith('"'))
+            self.assertIn('public', response['Cache-Control'])
+            self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_if_none_match_igual_retorna_304_sem_serializar(self):
+        for url in ('/api/site/configuration/', '/api/site/configuration/current/'):
+            etag = self.client.get(url)['ETag']
+            with mock.patch('sitehome.services.SiteConfigurationSerializer') as serializer, \
+                    self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(response.content, b'')
+            serializer.assert_not_called()
+
+    def test_etag_diferente_retorna_200(self):
+        response = self.client.get('/api/site/configuration/current/', HTTP_IF_NONE_MATCH='"outro"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['company_name'], 'Transportes Teste')
+
+    def test_salvar_invalida_payload_e_etag(self):
+        etag = self.client.get('/api/site/configuration/current/')['ETag']
+
+        config = SiteConfiguration.objects.get(pk=1)
+        config.company_name = 'Nova Empresa'
+        config.save()
+
+        response = self.client.get('/api/site/configuration/current/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data']['company_name'], 'Nova Empresa')
+
+    def test_logo_absoluto_conforme_o_host(self):
+        config = SiteConfiguration.objects.get(pk=1)
+        config.logo.name = 'site_config/logos/logo.png'
+        config.save()
+
+        first = self.client.get('/api/site/configuration/current/', HTTP_HOST='localhost')
+        second = self.client.get('/api/site/configuration/current/', HTTP_HOST='127.0.0.1')
 
-# Create your tests here.
+        self.assertEqual(first.json()['data']['logo_url'], 'http://localhost/media/site_config/logos/logo.png')
+        self.assertEqual(second.json()['data']['logo_url'], 'http://127.0.0.1/media/site_config/logos/logo.png')
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SiteConfigurationViewSet
+from .views import SiteConfigurationViewSet, current_configuration
 
 # Create router and register viewset
 router = DefaultRouter()
 router.register(r'configuration', SiteConfigurationViewSet, basename='site-configuration')
 
 urlpatterns = [
+    path('configuration/current/', current_configuration, name='site-configuration-current'),
     path('', include(router.urls)),
 ]
@@ -1,12 +1,14 @@
 from rest_framework import viewsets, status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework.decorators import action
+from django.views.decorators.http import require_safe
 
-from core.throttling import PublicReadThrottle
+from core.async_api import error_response
+from core.throttling import AsyncPublicReadThrottle, PublicReadThrottle, athrottle_classes
 from core.exceptions import safe_error_response
 from .models import SiteConfiguration
 from .serializers import SiteConfigurationSerializer
+from .services import aget_configuration_payload, get_configuration_payload, payload_response
 
 
 class SiteConfigurationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -25,14 +27,8 @@ class SiteConfigurationViewSet(viewsets.ReadOnlyModelViewSet):
 
     def list(self, request, *args, **kwargs):
         try:
-            config = SiteConfiguration.objects.get_configuration()
-            serializer = self.get_serializer(config)
-
-            return Response({
-                'success': True,
-                'data': serializer.data,
-                'message': 'Configuração do site obtida com sucesso'
-            }, status=status.HTTP_200_OK)
+            body, etag = get_configuration_payload(request, 'list')
+            return payload_response(request, body, etag)
 
         except Exception as e:
             return safe_error_response(
@@ -60,22 +56,20 @@ class SiteConfigurationViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
 
-    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
-    def current(self, request):
-        """Retorna a configuração atual (instância singleton)."""
-        try:
-            config = SiteConfiguration.objects.get_configuration()
-            serializer = self.get_serializer(config)
-
-            return Response({
-                'success': True,
-                'data': serializer.data,
-                'message': 'Configuração atual obtida com sucesso'
-            }, status=status.HTTP_200_OK)
+@require_safe
+@athrottle_classes([AsyncPublicReadThrottle])
+async def current_configuration(request):
+    """
+    Retorna a configuração atual (instância singleton).
+    O JSON vem pronto do cache; ``If-None-Match`` com o ETag atual recebe 304.
+    """
+    try:
+        body, etag = await aget_configuration_payload(request, 'current')
+        return payload_response(request, body, etag)
 
-        except Exception as e:
-            return safe_error_response(
-                message='Erro ao obter configuração do site',
-                exception=e,
-                context={'action': 'site_config_current'}
-            )
+    except Exception as e:
+        return error_response(
+            message='Erro ao obter configuração do site',
+            exception=e,
+            context={'action': 'site_config_current'}
+        )
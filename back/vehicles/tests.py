@@ -4,10 +4,14 @@ Testes abrangentes para o app vehicles.
 Cobre todos os endpoints: CRUD via ViewSet, stats,
 busca por placa e detalhe por placa específica.
 """
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.utils import timezone
 
 from .models import Vehicle
 from authentication.models import UserProfile
@@ -158,17 +162,17 @@ class SearchByPlateTests(TestCase):
     def test_busca_por_placa_retorna_200(self):
         response = self.client.get('/api/vehicles/search-by-plate/?search=TST')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIsInstance(response.data, list)
+        self.assertIsInstance(response.json(), list)
 
     def test_busca_por_placa_query_curta_retorna_lista_vazia(self):
         response = self.client.get('/api/vehicles/search-by-plate/?search=T')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, [])
+        self.assertEqual(response.json(), [])
 
     def test_busca_por_placa_sem_query_retorna_lista_vazia(self):
         response = self.client.get('/api/vehicles/search-by-plate/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, [])
+        self.assertEqual(response.json(), [])
 
 class GetVehicleByPlateTests(TestCase):
     def setUp(self):
@@ -178,7 +182,7 @@ class GetVehicleByPlateTests(TestCase):
     def test_busca_placa_existente_retorna_200(self):
         response = self.client.get('/api/vehicles/plate/DEF5678/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['plate'], 'DEF5678')
+        self.assertEqual(response.json()['plate'], 'DEF5678')
 
     def test_busca_placa_inexistente_retorna_404(self):
         response = self.client.get('/api/vehicles/plate/ZZZ9999/')
@@ -187,3 +191,148 @@ class GetVehicleByPlateTests(TestCase):
     def test_busca_placa_case_insensitive(self):
         response = self.client.get('/api/vehicles/plate/def5678/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_busca_placa_retorna_condutor_ativo(self):
+        from conductors.models import Conductor
+        conductor = Conductor.objects.create(
+            name='Maria Souza', cpf='52998224725', email='maria@example.com', phone='11987654321',
+            license_number='12345678901', license_category='D', birth_date='1985-03-10',
+            license_expiry_date=timezone.now().date().replace(year=timezone.now().year + 2),
+        )
+        conductor.vehicles.add(self.vehicle)
+        response = self.client.get('/api/vehicles/plate/DEF5678/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['current_conductor'], {'first_name': 'Maria', 'license_category': 'D'})
+        self.assertEqual(response.json()['photos'], [])
+
+    def test_busca_placa_aceita_head(self):
+        response = self.client.head('/api/vehicles/plate/DEF5678/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'')
+
+    def test_busca_placa_metodo_nao_permitido(self):
+        response = self.client.post('/api/vehicles/plate/DEF5678/')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+@mock.patch('core.throttling.PublicReadThrottle.THROTTLE_RATES', {'public_read': '2/hour'})
+class AsyncPublicReadThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        make_vehicle(plate='THR1234')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_excedido_o_limite_retorna_429_com_retry_after(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/vehicles/plate/THR1234/').status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/vehicles/search-by-plate/?search=THR')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertIn('detail', response.json())
+        self.assertIn('error_id', response.json())
+
+    def test_limite_por_ip(self):
+        for _ in range(2):
+            self.client.get('/api/vehicles/plate/THR1234/')
+
+        response = self.client.get('/api/vehicles/plate/THR1234/', REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_usuario_autenticado_nao_sofre_throttle_anonimo(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        user = make_user()
+        self.client.cookies['access'] = str(AccessToken.for_user(user))
+        for _ in range(3):
+            response = self.client.get('/api/vehicles/plate/THR1234/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_acesso_anonimo_nao_resolve_usuario(self):
+        with mock.patch('authentication.websocket_auth.resolve_user_from_token') as resolve:
+            response = self.client.get('/api/vehicles/plate/THR1234/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resolve.assert_not_called()
+
+
+class VehicleConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user()
+        self.client.force_authenticate(user=self.user)
+        self.vehicle = make_vehicle(created_by=self.user)
+
+    def test_listagem_com_etag_atual_retorna_304(self):
+        response = self.client.get('/api/vehicles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+        response = self.client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_304_nao_serializa_a_pagina(self):
+        etag = self.client.get('/api/vehicles/')['ETag']
+
+        with mock.patch('vehicles.views.VehicleSerializer.to_representation') as to_representation:
+            response = self.client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        to_representation.assert_not_called()
+
+    def test_alteracao_inclusao_e_exclusao_mudam_o_etag(self):
+        etags = [self.client.get('/api/vehicles/')['ETag']]
+
+        self.client.patch(f'/api/vehicles/{self.vehicle.pk}/', {'color': 'Preto'})
+        etags.append(self.client.get('/api/vehicles/')['ETag'])
+        make_vehicle(plate='NEW1234')
+        etags.append(self.client.get('/api/vehicles/')['ETag'])
+        self.vehicle.delete()
+        response = self.client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etags[-1])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(set(etags + [response['ETag']])), 4)
+
+    def test_etag_depende_dos_filtros_e_da_pagina(self):
+        etag = self.client.get('/api/vehicles/')['ETag']
+
+        response = self.client.get('/api/vehicles/?ordering=plate', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detalhe_envia_last_modified_e_responde_304(self):
+        response = self.client.get(f'/api/vehicles/{self.vehicle.pk}/')
+        self.assertIn('Last-Modified', response)
+
+        by_etag = self.client.get(f'/api/vehicles/{self.vehicle.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        by_date = self.client.get(
+            f'/api/vehicles/{self.vehicle.pk}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detalhe_alterado_retorna_200(self):
+        etag = self.client.get(f'/api/vehicles/{self.vehicle.pk}/')['ETag']
+        self.client.patch(f'/api/vehicles/{self.vehicle.pk}/', {'color': 'Preto'})
+
+        response = self.client.get(f'/api/vehicles/{self.vehicle.pk}/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['color'], 'Preto')
+
+    def test_etag_nao_vale_para_outro_usuario(self):
+        etag = self.client.get('/api/vehicles/')['ETag']
+        self.client.force_authenticate(user=make_user(username='outro', email='outro@example.com'))
+
+        response = self.client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
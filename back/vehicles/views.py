@@ -1,10 +1,14 @@
 from rest_framework import viewsets, permissions, status, filters
-from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.utils import timezone
+from django.views.decorators.http import require_safe
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import FilterSet, CharFilter, NumberFilter
-from core.throttling import PublicReadThrottle
+from core.async_api import error_response, json_response
+from core.conditional import ConditionalGetMixin
+from core.db_router import replica_reads
+from core.throttling import AsyncPublicReadThrottle, athrottle_classes
 from core.exceptions import safe_error_response
 from .models import Vehicle
 from .serializers import VehicleSerializer
@@ -35,7 +39,7 @@ class VehicleFilter(FilterSet):
         ]
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar veículos.
     """
@@ -57,6 +61,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@replica_reads()
 def vehicle_stats(request):
     """
     Retorna estatísticas dos veículos.
@@ -111,17 +116,16 @@ def vehicle_stats(request):
         )
 
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-@throttle_classes([PublicReadThrottle])
-def search_vehicles_by_plate(request):
+@require_safe
+@athrottle_classes([AsyncPublicReadThrottle])
+async def search_vehicles_by_plate(request):
     """
     Busca veículos por placa para autocomplete. Retorna apenas dados básicos.
     """
     search_query = request.GET.get('search', '').strip().upper()
 
     if not search_query or len(search_query) < 2:
-        return Response([], status=status.HTTP_200_OK)
+        return json_response([], status=status.HTTP_200_OK)
 
     try:
         vehicles = Vehicle.objects.filter(
@@ -129,33 +133,32 @@ def search_vehicles_by_plate(request):
             is_active=True
         ).values('plate', 'brand', 'model', 'color')[:10]
 
-        return Response(list(vehicles), status=status.HTTP_200_OK)
+        return json_response([vehicle async for vehicle in vehicles], status=status.HTTP_200_OK)
 
     except Exception as e:
-        return safe_error_response(
+        return error_response(
             message='Erro ao buscar veículos',
             exception=e,
             context={'action': 'search_vehicles_by_plate', 'query': search_query}
         )
 
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-@throttle_classes([PublicReadThrottle])
-def get_vehicle_by_plate(request, plate):
+@require_safe
+@athrottle_classes([AsyncPublicReadThrottle])
+async def get_vehicle_by_plate(request, plate):
     """
     Retorna dados completos de um veículo por placa, incluindo o condutor ativo vinculado.
     """
     try:
         plate = plate.strip().upper()
 
-        vehicle = Vehicle.objects.filter(
+        vehicle = await Vehicle.objects.filter(
             plate__iexact=plate,
             is_active=True
-        ).prefetch_related('conductors').first()
+        ).afirst()
 
         if not vehicle:
-            return Response({
+            return json_response({
                 'error': 'Veículo não encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
 
@@ -182,7 +185,7 @@ def get_vehicle_by_plate(request, plate):
                 })
         vehicle_data['photos'] = photos
 
-        current_conductor = vehicle.conductors.filter(is_active=True).first()
+        current_conductor = await vehicle.conductors.filter(is_active=True).afirst()
 
         if current_conductor:
             vehicle_data['current_conductor'] = {
@@ -192,10 +195,10 @@ def get_vehicle_by_plate(request, plate):
         else:
             vehicle_data['current_conductor'] = None
 
-        return Response(vehicle_data, status=status.HTTP_200_OK)
+        return json_response(vehicle_data, status=status.HTTP_200_OK)
 
     except Exception as e:
-        return safe_error_response(
+        return error_response(
             message='Erro ao buscar veículo por placa',
             exception=e,
             context={'action': 'get_vehicle_by_plate', 'plate': plate}
@@ -8,10 +8,7 @@ import { CategoryDistributionChart } from "@/components/dashboard/CategoryDistri
 import { AlertsList } from "@/components/dashboard/AlertsList"
 import { RecentActivityList } from "@/components/dashboard/RecentActivityList"
 import {
-  getDashboardStats,
-  getDashboardCharts,
-  getDashboardRecentActivity,
-  getDashboardAlerts,
+  getDashboardBootstrap,
   DashboardStats,
   DashboardCharts,
   RecentActivity,
@@ -31,21 +28,14 @@ export default function DashboardPage() {
     try {
       setLoading(true)
 
-      const [statsResult, chartsResult, alertsResult, activityResult] = await Promise.allSettled([
-        getDashboardStats(),
-        getDashboardCharts(),
-        getDashboardAlerts(),
-        getDashboardRecentActivity(),
-      ])
-
-      if (statsResult.status === "fulfilled") setStats(statsResult.value)
-      else toast({ title: "Erro ao carregar estatísticas", variant: "destructive" })
-
-      if (chartsResult.status === "fulfilled") setCharts(chartsResult.value)
-      else toast({ title: "Erro ao carregar gráficos", variant: "destructive" })
-
-      if (alertsResult.status === "fulfilled") setAlerts(alertsResult.value)
-      if (activityResult.status === "fulfilled") setRecentActivity(activityResult.value)
+      // Uma única requisição com as quatro seções
+      const data = await getDashboardBootstrap()
+      setStats(data.stats)
+      setCharts(data.charts)
+      setAlerts(data.alerts)
+      setRecentActivity(data.recent_activity)
+    } catch {
+      toast({ title: "Erro ao carregar dados do dashboard", variant: "destructive" })
     } finally {
       setLoading(false)
     }
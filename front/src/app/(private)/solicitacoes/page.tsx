@@ -2,7 +2,8 @@
 
 import { useEffect, useState, useCallback } from "react"
 import { useRouter } from "next/navigation"
-import { useWebSocket } from "@/hooks/useWebSocket"
+import { useWebSocket, WebSocketMessage } from "@/hooks/useWebSocket"
+import { buildWsUrl } from "@/lib/api-client"
 import {
   Card,
   CardContent,
@@ -144,38 +145,71 @@ export default function SolicitacoesPage() {
 
   const [rejectionReason, setRejectionReason] = useState('')
 
-  const { isConnected } = useWebSocket('ws://127.0.0.1:8000/ws/requests/', {
-    onMessage: (message) => {
-      if (message.type === 'new_request') {
-        const relativePath = message.request_type === 'driver'
-          ? `/solicitacoes/motoristas/${message.request_id}`
-          : `/solicitacoes/veiculos/${message.request_id}`;
-
-        const detailsUrl = `${window.location.origin}${relativePath}`;
-        const title = message.title || message.message || 'Nova solicitação recebida!';
-        const protocol = message.protocol || `#${message.request_id}`;
-
-        toast.info(title, {
-          description: `${protocol} - Clique para ver detalhes`,
-          action: {
-            label: 'Ver',
-            onClick: () => window.open(detailsUrl, '_blank'),
-          },
-          duration: 10000,
-        });
-
-        const isCorrectTab = (message.request_type === 'driver' && activeTab === 'driver') ||
-                            (message.request_type === 'vehicle' && activeTab === 'vehicle');
-
-        if (isCorrectTab) {
-          setTimeout(() => {
-            if (activeTab === 'driver') {
-              loadDriverRequests();
-            } else {
-              loadVehicleRequests();
-            }
-          }, 500);
-        }
+  const handleRealtimeMessage = (message: WebSocketMessage) => {
+    if (message.type === 'replay.complete' && message.truncated) {
+      // Eventos perdidos durante a desconexão já foram descartados: recarrega a lista
+      if (activeTab === 'driver') {
+        loadDriverRequests();
+      } else {
+        loadVehicleRequests();
+      }
+      return;
+    }
+
+    if (message.type === 'new_request') {
+      const relativePath = message.request_type === 'driver'
+        ? `/solicitacoes/motoristas/${message.request_id}`
+        : `/solicitacoes/veiculos/${message.request_id}`;
+
+      const detailsUrl = `${window.location.origin}${relativePath}`;
+      const title = message.title || message.message || 'Nova solicitação recebida!';
+      const protocol = message.protocol || `#${message.request_id}`;
+
+      toast.info(title, {
+        description: `${protocol} - Clique para ver detalhes`,
+        action: {
+          label: 'Ver',
+          onClick: () => window.open(detailsUrl, '_blank'),
+        },
+        duration: 10000,
+      });
+
+      const isCorrectTab = (message.request_type === 'driver' && activeTab === 'driver') ||
+                          (message.request_type === 'vehicle' && activeTab === 'vehicle');
+
+      if (isCorrectTab) {
+        setTimeout(() => {
+          if (activeTab === 'driver') {
+            loadDriverRequests();
+          } else {
+            loadVehicleRequests();
+          }
+        }, 500);
+      }
+    }
+  }
+
+  const { isConnected } = useWebSocket(buildWsUrl('/ws/requests/?topics=requests.driver,requests.vehicle'), {
+    onMessage: handleRealtimeMessage,
+    onBatch: (messages) => {
+      const newRequests = messages.filter((message) => message.type === 'new_request');
+      if (newRequests.length <= 1) {
+        messages.forEach(handleRealtimeMessage);
+        return;
+      }
+
+      // Rajada de solicitações: um único aviso e um único recarregamento da lista
+      toast.info(`${newRequests.length} novas solicitações recebidas`, { duration: 10000 });
+
+      const hasActiveTabRequest = newRequests.some((message) => message.request_type === activeTab);
+      if (hasActiveTabRequest) {
+        setTimeout(() => {
+          if (activeTab === 'driver') {
+            loadDriverRequests();
+          } else {
+            loadVehicleRequests();
+          }
+        }, 500);
       }
     },
     onConnect: () => {},
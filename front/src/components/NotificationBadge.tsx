@@ -1,7 +1,9 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { notificationService } from "@/services/notificationService";
+import { useWebSocket, WebSocketMessage } from "@/hooks/useWebSocket";
+import { buildApiUrl, buildWsUrl } from "@/lib/api-client";
 import { Bell } from "lucide-react";
 import {
   DropdownMenu,
@@ -21,8 +23,35 @@ export function NotificationBadge() {
   const [unreadCount, setUnreadCount] = useState(0);
   const [notifications, setNotifications] = useState<Notification[]>([]);
   const [isOpen, setIsOpen] = useState(false);
+  const syncTokenRef = useRef<string | null>(null);
   const router = useRouter();
 
+  // Aplica apenas o delta desde a última sincronização em vez de recarregar a lista
+  const syncNotifications = async () => {
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const delta = await notificationService.sync(syncTokenRef.current);
+        syncTokenRef.current = delta.sync_token;
+        hasMore = delta.has_more;
+        setUnreadCount(delta.unread_count);
+
+        const readIds = new Set(delta.read_ids);
+        setNotifications((current) => {
+          const known = new Set(current.map((n) => n.id));
+          const incoming = delta.notifications.filter(
+            (n) => !n.is_read && !known.has(n.id)
+          );
+          return [...incoming.reverse(), ...current].filter(
+            (n) => n.id > delta.read_up_to && !readIds.has(n.id)
+          );
+        });
+      }
+    } catch {
+      // Mantém o estado atual; a próxima sincronização tenta novamente
+    }
+  };
+
   const fetchUnreadCount = async () => {
     try {
       const count = await notificationService.getUnreadCount();
@@ -41,11 +70,66 @@ export function NotificationBadge() {
     }
   };
 
+  // Eventos enviados pelo servidor; o polling fica apenas como fallback sem conexão
+  const handleRealtimeMessage = (message: WebSocketMessage) => {
+    if (message.type === "notification.created" && message.notification) {
+      const created = message.notification as Notification;
+      setNotifications((current) =>
+        current.some((n) => n.id === created.id) ? current : [created, ...current]
+      );
+    } else if (message.type === "notification.read") {
+      const readIds = new Set(message.notification_ids ?? []);
+      const readUpTo = message.read_up_to ?? 0;
+      setNotifications((current) =>
+        current.filter((n) => n.id > readUpTo && !readIds.has(n.id))
+      );
+    }
+
+    if (typeof message.unread_count === "number") {
+      setUnreadCount(message.unread_count);
+    }
+  };
+
+  const { isConnected } = useWebSocket(buildWsUrl("/ws/requests/?topics=notifications"), {
+    onMessage: handleRealtimeMessage,
+    onConnect: () => {
+      syncNotifications();
+    },
+  });
+
+  // Sem WebSocket (redes que bloqueiam o upgrade), usa o stream SSE; o polling
+  // só entra em ação se o stream também falhar
   useEffect(() => {
-    fetchUnreadCount();
-    const interval = setInterval(fetchUnreadCount, 30000);
-    return () => clearInterval(interval);
-  }, []);
+    if (isConnected) {
+      return;
+    }
+    syncNotifications();
+
+    let interval: ReturnType<typeof setInterval> | undefined;
+    const source = new EventSource(
+      buildApiUrl("/api/notifications/stream/?topics=notifications"),
+      { withCredentials: true }
+    );
+    ["notification.created", "notification.read", "counters.update"].forEach((type) => {
+      source.addEventListener(type, (event) => {
+        handleRealtimeMessage(JSON.parse((event as MessageEvent).data));
+      });
+    });
+    source.onopen = () => {
+      clearInterval(interval);
+      interval = undefined;
+    };
+    source.onerror = () => {
+      if (!interval) {
+        interval = setInterval(syncNotifications, 30000);
+      }
+    };
+
+    return () => {
+      source.close();
+      clearInterval(interval);
+    };
+  }, [isConnected]);
 
   useEffect(() => {
     if (isOpen) {
@@ -1,6 +1,6 @@
 import { useEffect, useRef, useCallback, useState } from 'react';
 
-interface WebSocketMessage {
+export interface WebSocketMessage {
   type: string;
   request_type?: 'driver' | 'vehicle';
   request_id?: number;
@@ -8,10 +8,23 @@ interface WebSocketMessage {
   message?: string;
   title?: string;
   data?: unknown;
+  notification?: unknown;
+  notification_ids?: number[];
+  read_up_to?: number | null;
+  unread_count?: number;
+  counters?: Record<string, number>;
+  event_id?: string;
+  last_event_id?: string | null;
+  replayed?: number;
+  truncated?: boolean;
+  count?: number;
+  events?: WebSocketMessage[];
 }
 
 interface UseWebSocketOptions {
   onMessage?: (message: WebSocketMessage) => void;
+  // Rajadas agrupadas pelo servidor; sem este callback cada evento vai para onMessage
+  onBatch?: (messages: WebSocketMessage[]) => void;
   onConnect?: () => void;
   onDisconnect?: () => void;
   onError?: (error: Event) => void;
@@ -19,9 +32,18 @@ interface UseWebSocketOptions {
   reconnectInterval?: number;
 }
 
+// IDs de evento no formato "<ms>-<seq>"; guarda sempre o maior recebido
+const isNewerEventId = (candidate: string, current: string | null) => {
+  if (!current) return true;
+  const [candidateMs, candidateSeq = 0] = candidate.split('-').map(Number);
+  const [currentMs, currentSeq = 0] = current.split('-').map(Number);
+  return candidateMs > currentMs || (candidateMs === currentMs && candidateSeq > currentSeq);
+};
+
 export const useWebSocket = (url: string, options: UseWebSocketOptions = {}) => {
   const {
     onMessage,
+    onBatch,
     onConnect,
     onDisconnect,
     onError,
@@ -30,22 +52,26 @@ export const useWebSocket = (url: string, options: UseWebSocketOptions = {}) =>
   } = options;
 
   const ws = useRef<WebSocket | null>(null);
+  // Último evento recebido; enviado na reconexão para o servidor reenviar apenas o que foi perdido
+  const lastEventIdRef = useRef<string | null>(null);
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null);
   const [isConnected, setIsConnected] = useState(false);
   const [connectionError, setConnectionError] = useState<string | null>(null);
 
   // Refs mantêm referências estáveis aos callbacks para evitar recriar o WebSocket quando eles mudam
   const onMessageRef = useRef(onMessage);
+  const onBatchRef = useRef(onBatch);
   const onConnectRef = useRef(onConnect);
   const onDisconnectRef = useRef(onDisconnect);
   const onErrorRef = useRef(onError);
 
   useEffect(() => {
     onMessageRef.current = onMessage;
+    onBatchRef.current = onBatch;
     onConnectRef.current = onConnect;
     onDisconnectRef.current = onDisconnect;
     onErrorRef.current = onError;
-  }, [onMessage, onConnect, onDisconnect, onError]);
+  }, [onMessage, onBatch, onConnect, onDisconnect, onError]);
 
   const connect = useCallback(() => {
     try {
@@ -54,7 +80,11 @@ export const useWebSocket = (url: string, options: UseWebSocketOptions = {}) =>
         ws.current = null;
       }
 
-      ws.current = new WebSocket(url);
+      const resumeUrl = lastEventIdRef.current
+        ? `${url}${url.includes('?') ? '&' : '?'}last_event_id=${encodeURIComponent(lastEventIdRef.current)}`
+        : url;
+
+      ws.current = new WebSocket(resumeUrl);
 
       ws.current.onopen = () => {
         setIsConnected(true);
@@ -64,8 +94,21 @@ export const useWebSocket = (url: string, options: UseWebSocketOptions = {}) =>
 
       ws.current.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
-          onMessageRef.current?.(data);
+          const data: WebSocketMessage = JSON.parse(event.data);
+          const messages = data.type === 'batch' ? data.events ?? [] : [data];
+
+          for (const message of messages) {
+            const eventId = message.event_id ?? (message.type === 'replay.complete' ? message.last_event_id : null);
+            if (eventId && isNewerEventId(eventId, lastEventIdRef.current)) {
+              lastEventIdRef.current = eventId;
+            }
+          }
+
+          if (data.type === 'batch' && onBatchRef.current) {
+            onBatchRef.current(messages);
+          } else {
+            messages.forEach((message) => onMessageRef.current?.(message));
+          }
         } catch {
           // Mensagem com JSON inválido é descartada silenciosamente
         }
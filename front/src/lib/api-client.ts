@@ -11,6 +11,10 @@ export function buildApiUrl(path = ""): string {
   return `${API_BASE_URL}/${normalizedPath}`
 }
 
+export function buildWsUrl(path = ""): string {
+  return buildApiUrl(path).replace(/^http/, "ws")
+}
+
 export async function apiFetch(path: string, options: RequestInit = {}) {
   const url = path.startsWith("http://") || path.startsWith("https://") ? path : buildApiUrl(path)
   return fetch(url, options)
@@ -69,6 +69,9 @@ export interface DashboardCharts {
 export interface RecentActivity {
   type: 'request' | 'complaint'
   id: number
+  entity_type: 'driver_request' | 'vehicle_request' | 'complaint'
+  entity_id: number
+  action: 'created' | 'status_changed'
   description: string
   status: string
   date: string
@@ -82,6 +85,24 @@ export interface DashboardAlert {
   link: string
 }
 
+export interface DashboardBootstrap {
+  stats: DashboardStats
+  charts: DashboardCharts
+  recent_activity: RecentActivity[]
+  alerts: DashboardAlert[]
+}
+
+export async function getDashboardBootstrap(): Promise<DashboardBootstrap> {
+  const response = await authFetch('/api/dashboard/bootstrap/')
+
+  if (!response.ok) {
+    const errorText = await response.text().catch(() => '')
+    throw new Error(`Erro ${response.status}: ${errorText || response.statusText}`)
+  }
+
+  return response.json()
+}
+
 export async function getDashboardStats(): Promise<DashboardStats> {
   const response = await authFetch('/api/dashboard/stats/')
 
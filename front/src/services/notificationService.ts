@@ -3,6 +3,7 @@ import {
   Notification,
   NotificationCountResponse,
   MarkAllAsReadResponse,
+  NotificationSyncResponse,
 } from "@/types/notification";
 
 async function fetchWithAuth(pathOrUrl: string, options: RequestInit = {}) {
@@ -55,6 +56,15 @@ export const notificationService = {
     return data.unread_count;
   },
 
+  async sync(syncToken?: string | null): Promise<NotificationSyncResponse> {
+    const query = syncToken ? `?sync_token=${encodeURIComponent(syncToken)}` : "";
+    const response = await fetchWithAuth(`/api/notifications/sync/${query}`);
+    if (!response.ok) {
+      throw new Error("Erro ao sincronizar notificações");
+    }
+    return response.json();
+  },
+
   async markAsRead(id: number): Promise<Notification> {
     const response = await fetchWithAuth(`/api/notifications/${id}/mark_as_read/`, {
       method: "PATCH",
@@ -20,3 +20,12 @@ export interface MarkAllAsReadResponse {
   message: string;
   updated_count: number;
 }
+
+export interface NotificationSyncResponse {
+  notifications: Notification[];
+  has_more: boolean;
+  read_ids: number[];
+  read_up_to: number;
+  unread_count: number;
+  sync_token: string;
+}